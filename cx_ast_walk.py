@@ -0,0 +1,122 @@
+# cx_ast_walk.py
+# One shared, iterative pass over the AST that feeds every registered collector.
+#
+# A collector defines handlers named after AST node classes:
+#   visit_<NodeClass>(node, walker)  - called in preorder (before the node's children)
+#   leave_<NodeClass>(node, walker)  - called after all of the node's children
+#   visit_any(node, walker)          - called for nodes that have no specific visit_ handler
+# A visit handler may return SKIP, to stop receiving the node's descendants
+# (the equivalent of a NodeVisitor method that does not call generic_visit()).
+# finish(walker) is called once, after the whole tree has been walked.
+#
+# The walker keeps the state the old per-generator visitors each tracked on their own:
+#   walker.parents      - ancestors of the current node (nearest last)
+#   walker.scope_stack  - enclosing ClassDef/FunctionDef/AsyncFunctionDef nodes, including
+#                         the current node when it is one of those
+#   walker.depth, walker.seq - depth and preorder index of the current node
+# (depth, seq) order reproduces ast.walk()'s breadth-first order, for collectors that need it.
+
+import ast
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+SKIP = "skip"
+
+SCOPE_NODES = (ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)
+
+
+class AstCollector:
+    """Base class for collectors driven by AstWalker."""
+
+    def finish(self, walker: "AstWalker") -> None:
+        pass
+
+
+class AstWalker:
+    def __init__(self, collectors: List[AstCollector]):
+        self.collectors = list(collectors)
+        self.parents: List[ast.AST] = []
+        self.scope_stack: List[ast.AST] = []
+        self.current_scope = "<global>"  # scope_name() of scope_stack, kept up to date
+        self.depth = 0
+        self.seq = -1
+        # node class -> [(collector index, handler)]
+        self._visit_table: Dict[type, List[Tuple[int, Callable]]] = {}
+        self._leave_table: Dict[type, List[Tuple[int, Callable]]] = {}
+
+    # --- scope helpers, shared by all collectors ---
+
+    def scope_name(self, scope_stack: Optional[List[ast.AST]] = None) -> str:
+        """Dotted name of the scope (e.g. 'Class.method'), or '<global>' at module level."""
+        if scope_stack is None:
+            return self.current_scope
+        stack = scope_stack
+        if not stack:
+            return "<global>"
+        return ".".join(n.name for n in stack)
+
+    def parent(self) -> Optional[ast.AST]:
+        return self.parents[-1] if self.parents else None
+
+    # --- dispatch ---
+
+    def _handlers(self, table, prefix, cls):
+        handlers = table.get(cls)
+        if handlers is None:
+            handlers = []
+            for i, collector in enumerate(self.collectors):
+                fn = getattr(collector, prefix + cls.__name__, None)
+                if fn is None and prefix == "visit_":
+                    fn = getattr(collector, "visit_any", None)
+                if fn is not None:
+                    handlers.append((i, fn))
+            table[cls] = handlers
+        return handlers
+
+    def walk(self, tree: ast.AST) -> "AstWalker":
+        muted: List[Optional[ast.AST]] = [None] * len(self.collectors)
+        visit_table, leave_table = self._visit_table, self._leave_table
+        parents, scope_stack = self.parents, self.scope_stack
+        iter_child_nodes = ast.iter_child_nodes
+
+        stack: List[Tuple[ast.AST, bool]] = [(tree, False)]
+        while stack:
+            node, leaving = stack.pop()
+            cls = type(node)
+
+            if leaving:
+                parents.pop()
+                self.depth = len(parents)
+                for i, fn in self._handlers(leave_table, "leave_", cls):
+                    if muted[i] is None or muted[i] is node:
+                        fn(node, self)
+                for i in range(len(muted)):
+                    if muted[i] is node:
+                        muted[i] = None
+                if isinstance(node, SCOPE_NODES):
+                    scope_stack.pop()
+                    self.current_scope = self.scope_name(scope_stack)
+                continue
+
+            self.seq += 1
+            self.depth = len(parents)
+            if isinstance(node, SCOPE_NODES):
+                scope_stack.append(node)
+                self.current_scope = self.scope_name(scope_stack)
+            for i, fn in self._handlers(visit_table, "visit_", cls):
+                if muted[i] is None and fn(node, self) == SKIP:
+                    muted[i] = node
+
+            stack.append((node, True))
+            parents.append(node)
+            children = list(iter_child_nodes(node))
+            for child in reversed(children):
+                stack.append((child, False))
+
+        for collector in self.collectors:
+            collector.finish(self)
+        return self
+
+
+def walk_ast(tree: ast.AST, *collectors: AstCollector) -> AstWalker:
+    """Drive all collectors with one pass over the tree."""
+    return AstWalker(list(collectors)).walk(tree)
@@ -0,0 +1,310 @@
+# cx_bench.py
+# Scaling benchmarks for the generators, on synthetic programs of a given size.
+#
+# Usage:
+#   python cx_bench.py names    [--sizes 100,1000,5000,20000] [--repeat 3]
+#   python cx_bench.py pipeline [--sizes 100,1000,5000] [--repeat 1]
+#   python cx_bench.py pipeline_stages [--sizes 1000,5000] [--repeat 1] [--workers N]
+#   python cx_bench.py cfg      [--sizes 1000,5000,20000] [--repeat 3]
+#   python cx_bench.py cfg_nx   [--sizes 1000,5000,20000] [--repeat 3]
+#   python cx_bench.py cfg_parallel [--sizes 2000,10000,20000,50000] [--repeat 1] [--workers N]
+#   python cx_bench.py cfg_memory [--sizes 1000,20000,100000] [--repeat 1]
+#   python cx_bench.py cfg_deep [--sizes 50,200,1000] [--repeat 3]
+#   python cx_bench.py cfg_contract [--sizes 50,200,1000] [--repeat 3]
+#
+# Each benchmark prints one row per size: the best time over --repeat runs, the time per
+# source line, and that per-line time relative to the smallest size (near 1.0 = linear).
+# cfg / cfg_nx build every scope's CFG and walk all successor/predecessor lists, on the native
+# adjacency and on a networkx copy (needs networkx) respectively, and also print the graphs'
+# traced allocation size.
+# cfg_parallel times CFGManager(workers=N) with no size threshold and notes the serial time and
+# the speedup, to show where the pool starts to pay off (see PARALLEL_MIN_LINES in cx_cfg6.py).
+# pipeline_stages times cx_gen_src2html with its stages on N threads (see cx_stages.py) and notes
+# the in-order time and the speedup; expect ~1x with the GIL, more on a free-threaded build.
+# cfg_memory times CFGManager.load_from_ast and notes what the loaded manager holds per CFG node
+# (traced allocations, AST excluded); run it on two checkouts to compare node layouts.
+# cfg_deep builds the CFGs and all CFG-based flows of a function nested --sizes levels deep (an
+# elif chain, see make_deep_source), to check that time stays linear and nothing recurses.
+# cfg_contract does the same with CFGManager(contract_placeholders=True), notes the node counts
+# and the uncontracted time, and fails if contraction changes any CFG-based flow (for other
+# sources: python cx_gen_flows_cfg.py --check-contraction <files>).
+
+import os
+import time
+import tracemalloc
+import logging
+import argparse
+
+from cx_utils import parse_ast
+from cx_token_store import TokenStore
+from cx_ast_walk import walk_ast
+
+# One chunk of typical student code; {n} makes every definition name unique.
+CHUNK = '''\
+import os
+from math import sqrt as root_{n}
+
+LIMIT_{n} = 10
+
+class Counter_{n}:
+    def __init__(self, start):
+        self.count = start
+
+    def inc(self, step=1):
+        self.count = self.count + step
+        return self.count
+
+def classify_{n}(values, limit=LIMIT_{n}):
+    small, large = [], []
+    for v in values:
+        if v < limit:
+            small.append(v)
+        elif v == limit:
+            continue
+        else:
+            large.append(root_{n}(v))
+    return small, large
+
+def search_{n}(items, target):
+    i = 0
+    while i < len(items):
+        if items[i] == target:
+            break
+        i += 1
+    try:
+        total = sum(items) / len(items)
+    except ZeroDivisionError:
+        total = 0
+    print("found", i, "avg", total, os.sep)
+    return i
+
+c_{n} = Counter_{n}(LIMIT_{n})
+c_{n}.inc(); c_{n}.inc(2)
+print(classify_{n}([1, 5, 10, 50]), search_{n}([3, 1, 2], 2))
+
+'''
+
+
+def make_source(n_lines: int) -> str:
+    """A valid program of about n_lines lines, made of repeated CHUNKs."""
+    chunk_lines = CHUNK.count('\n')
+    parts = [CHUNK.format(n=i) for i in range(max(1, round(n_lines / chunk_lines)))]
+    return ''.join(parts)
+
+
+# One level of make_deep_source; the branch bodies cycle through the compound statements.
+DEEP_BRANCHES = (
+    "        y = {n}\n",
+    "        while y > {n}:\n            y -= 1\n",
+    "        for i in range({n}):\n            if i == y:\n                break\n",
+    "        try:\n            y = y // {n}\n        except ZeroDivisionError:\n            y = 0\n",
+)
+
+
+def make_deep_source(depth: int) -> str:
+    """A function whose body is nested depth levels deep: an if/elif chain of depth branches."""
+    # an elif is an If nested in the previous one's orelse; indentation (capped at 100 levels by
+    # the tokenizer) cannot nest deeper than that, so generated code nests through elif chains
+    parts = ["def dispatch(x, y):\n"]
+    for n in range(depth):
+        parts.append(f"    {'if' if n == 0 else 'elif'} x == {n}:\n")
+        parts.append(DEEP_BRANCHES[n % len(DEEP_BRANCHES)].format(n=n + 1))
+    parts.append("    return y\n")
+    return ''.join(parts)
+
+
+def best_of(fn, repeat: int) -> float:
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        dt = time.perf_counter() - t0
+        best = dt if best is None else min(best, dt)
+    return best
+
+
+def bench_names(source: str, repeat: int) -> float:
+    from cx_gen_tokens_name import NameClassifier, get_token_lookup, cx_gen_tokens_name
+    tree = parse_ast(source)
+    store = TokenStore(source)
+
+    def run():
+        # the tokens are not changed by classification, so every run starts from the same ones;
+        # tokenization itself is not timed
+        core = store.core
+        classifier = NameClassifier(get_token_lookup(core))
+        walk_ast(tree, classifier)
+        cx_gen_tokens_name(core, tree, classifier=classifier)
+
+    return best_of(run, repeat)
+
+
+def bench_pipeline(source: str, repeat: int) -> float:
+    from cx_gen_src2html import cx_gen_src2html
+    return best_of(lambda: cx_gen_src2html(source), repeat)
+
+
+def _walk_graph(succ, pred, node_ids) -> int:
+    n = 0
+    for node_id in node_ids:
+        n += sum(1 for _ in succ(node_id)) + sum(1 for _ in pred(node_id))
+    return n
+
+
+def _bench_cfg(source: str, repeat: int, as_networkx: bool):
+    from cx_cfg6 import CFGManager
+    tree = parse_ast(source)
+
+    def build():
+        mgr = CFGManager()
+        mgr.load_from_ast(tree, source)
+        cfgs = list(mgr.cfgs.values())
+        return [cfg.to_networkx() for cfg in cfgs] if as_networkx else cfgs
+
+    def run():
+        for graph in build():
+            if as_networkx:
+                _walk_graph(graph.successors, graph.predecessors, graph.nodes)
+            else:
+                _walk_graph(graph.successor_ids, graph.predecessor_ids, range(len(graph._succ)))
+
+    elapsed = best_of(run, repeat)
+    tracemalloc.start()
+    graphs = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return elapsed, f"{len(graphs)} graphs, {size / 1024:.0f} KiB traced"
+
+
+def bench_cfg(source: str, repeat: int):
+    return _bench_cfg(source, repeat, as_networkx=False)
+
+
+def bench_cfg_nx(source: str, repeat: int):
+    # the networkx build time includes the native build it is converted from
+    return _bench_cfg(source, repeat, as_networkx=True)
+
+
+def bench_cfg_parallel(source: str, repeat: int, workers: int = 0):
+    from cx_cfg6 import CFGManager
+    tree = parse_ast(source)
+    workers = workers or os.cpu_count() or 1
+
+    def load(**kwargs):
+        mgr = CFGManager(**kwargs)
+        mgr.load_from_ast(tree, source)
+
+    serial = best_of(load, repeat)
+    parallel = best_of(lambda: load(workers=workers, parallel_min_lines=0), repeat)
+    return parallel, f"{workers} workers, serial {serial * 1000:.1f} ms, speedup {serial / parallel:.2f}x"
+
+
+def bench_pipeline_stages(source: str, repeat: int, workers: int = 0):
+    from cx_gen_src2html import cx_gen_src2html
+    workers = workers or os.cpu_count() or 1
+    serial = best_of(lambda: cx_gen_src2html(source, workers=0), repeat)
+    parallel = best_of(lambda: cx_gen_src2html(source, workers=workers), repeat)
+    return parallel, f"{workers} workers, in order {serial * 1000:.1f} ms, speedup {serial / parallel:.2f}x"
+
+
+def bench_cfg_memory(source: str, repeat: int):
+    from cx_cfg6 import CFGManager
+    tree = parse_ast(source)
+
+    def load():
+        mgr = CFGManager()
+        mgr.load_from_ast(tree, source)
+        return mgr
+
+    elapsed = best_of(load, repeat)
+    tracemalloc.start()
+    mgr = load()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    n_nodes = sum(len(cfg._nodes_by_id) for cfg in mgr.cfgs.values())
+    return elapsed, f"{n_nodes} nodes, {size / 1024:.0f} KiB traced, {size / n_nodes:.0f} B/node"
+
+
+def bench_cfg_deep(source: str, repeat: int):
+    from cx_cfg6 import CFGManager
+    from cx_gen_flows_cfg import cx_gen_flows_cfg
+    tree = parse_ast(source)
+
+    def run():
+        mgr = CFGManager()
+        mgr.load_from_ast(tree, source)
+        return mgr, cx_gen_flows_cfg(mgr)
+
+    elapsed = best_of(run, repeat)
+    mgr, flows = run()
+    n_nodes = sum(len(cfg._nodes_by_id) for cfg in mgr.cfgs.values())
+    return elapsed, f"{n_nodes} nodes, {sum(map(len, flows.values()))} flows"
+
+
+def bench_cfg_contract(source: str, repeat: int):
+    from cx_cfg6 import CFGManager
+    from cx_gen_flows_cfg import cx_gen_flows_cfg, contraction_mismatches
+    tree = parse_ast(source)
+    kinds = contraction_mismatches(source)
+    if kinds:
+        raise AssertionError(f"flows differ with placeholder contraction: {', '.join(kinds)}")
+
+    def run(contract=True):
+        mgr = CFGManager(contract_placeholders=contract)
+        mgr.load_from_ast(tree, source)
+        cx_gen_flows_cfg(mgr)
+        return mgr
+
+    elapsed = best_of(run, repeat)
+    plain = best_of(lambda: run(False), repeat)
+    n_nodes = [sum(len(cfg._nodes_by_id) for cfg in run(contract).cfgs.values()) for contract in (False, True)]
+    return elapsed, f"{n_nodes[0]} -> {n_nodes[1]} nodes, uncontracted {plain * 1000:.1f} ms, flows unchanged"
+
+
+BENCHMARKS = {
+    'names': (bench_names, '100,1000,5000,20000', 3),
+    'pipeline': (bench_pipeline, '100,1000,5000', 1),
+    'pipeline_stages': (bench_pipeline_stages, '1000,5000', 1),
+    'cfg': (bench_cfg, '1000,5000,20000', 3),
+    'cfg_nx': (bench_cfg_nx, '1000,5000,20000', 3),
+    'cfg_parallel': (bench_cfg_parallel, '2000,10000,20000,50000', 1),
+    'cfg_memory': (bench_cfg_memory, '1000,20000,100000', 1),
+    'cfg_deep': (bench_cfg_deep, '50,200,1000', 3),
+    'cfg_contract': (bench_cfg_contract, '50,200,1000', 3),
+}
+
+# benchmarks whose --sizes are not line counts: size -> source
+SOURCE_MAKERS = {
+    'cfg_deep': make_deep_source,
+    'cfg_contract': make_deep_source,
+}
+
+
+def run_benchmark(name: str, sizes, repeat: int, **options) -> None:
+    fn = BENCHMARKS[name][0]
+    make = SOURCE_MAKERS.get(name, make_source)
+    print(f"{'lines':>8}{'ms':>12}{'us/line':>10}{'rel':>7}")
+    base = None
+    for size in sizes:
+        source = make(size)
+        n_lines = source.count('\n')
+        result = fn(source, repeat, **options)
+        elapsed, note = result if isinstance(result, tuple) else (result, '')  # optional (time, note)
+        per_line = elapsed / n_lines * 1e6
+        base = base or per_line
+        print(f"{n_lines:>8}{per_line * n_lines / 1000:>12.1f}{per_line:>10.2f}{per_line / base:>7.2f}  {note}".rstrip())
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Scaling benchmarks for the cx generators.")
+    parser.add_argument("benchmark", choices=sorted(BENCHMARKS))
+    parser.add_argument("--sizes", help="Comma-separated source sizes, in lines.")
+    parser.add_argument("--repeat", type=int, help="Runs per size; the best is reported.")
+    parser.add_argument("--workers", type=int, help="cfg_parallel, pipeline_stages: pool size (default: CPU count).")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)  # keep the generators' status lines out of the table
+    _, default_sizes, default_repeat = BENCHMARKS[args.benchmark]
+    sizes = [int(s) for s in (args.sizes or default_sizes).split(',')]
+    options = {'workers': args.workers} if args.workers else {}
+    run_benchmark(args.benchmark, sizes, args.repeat or default_repeat, **options)
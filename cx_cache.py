@@ -0,0 +1,222 @@
+# cx_cache.py
+# Content-addressed cache for src2html results.
+#
+# Key:   sha256 over (pipeline version, filename/title, source). Any change to the source,
+#        the page title or the generators (bump PIPELINE_VERSION) gives a new key.
+# Value: the final HTML and, optionally, the pickled intermediate structures.
+#
+# Memory tier: LRU, evicted down to a byte budget (size of the stored HTML + pickled extras).
+# Disk tier:   optional directory of <key>.html / <key>.pkl files; an evicted entry is still
+#              found there, and promoted back into memory on the next hit.
+#
+# Configuration (environment, read by get_default_cache()):
+#   CX_CACHE_DISABLE=1        - no caching
+#   CX_CACHE_MAX_BYTES=N      - memory budget in bytes (default 64 MB)
+#   CX_CACHE_DIR=path         - enable the disk tier in this directory
+#   CX_CACHE_INTERMEDIATES=1  - also keep the intermediate structures
+
+import os
+import sys
+import logging
+import pickle
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+# Bump whenever a generator change alters the HTML for the same input.
+PIPELINE_VERSION = "4"
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+logger = logging.getLogger(__name__)
+
+
+def make_cache_key(source_code: str, filename: str = 'CodeXplorer', version: str = PIPELINE_VERSION) -> str:
+    h = hashlib.sha256()
+    for part in (version, filename, source_code):
+        data = part.encode('utf-8', 'surrogatepass')
+        h.update(len(data).to_bytes(8, 'little'))  # length prefix keeps the fields unambiguous
+        h.update(data)
+    return h.hexdigest()
+
+
+class AnalysisCache:
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES, disk_dir: Optional[str] = None,
+                 keep_intermediates: bool = False):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.keep_intermediates = keep_intermediates
+        # key -> (html, pickled intermediates or None, size in bytes)
+        self._entries: "OrderedDict[str, Tuple[str, Optional[bytes], int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    # --- lookups ---
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached HTML for key, or None."""
+        entry = self._get_entry(key)
+        return entry[0] if entry else None
+
+    def get_intermediates(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return a fresh copy of the cached intermediate structures for key, or None."""
+        entry = self._get_entry(key)
+        if not entry or entry[1] is None:
+            return None
+        return pickle.loads(entry[1])
+
+    def _get_entry(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+        entry = self._disk_read(key)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._insert(key, entry)
+        return entry
+
+    # --- stores ---
+
+    def put(self, key: str, html: str, intermediates: Optional[Dict[str, Any]] = None) -> None:
+        blob = None
+        if intermediates is not None and self.keep_intermediates:
+            blob = pickle.dumps(intermediates, protocol=pickle.HIGHEST_PROTOCOL)
+        entry = (html, blob, len(html.encode('utf-8', 'surrogatepass')) + (len(blob) if blob else 0))
+        with self._lock:
+            self._insert(key, entry)
+        self._disk_write(key, entry)
+
+    def _insert(self, key, entry):
+        # caller holds the lock
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= old[2]
+        if entry[2] > self.max_bytes:
+            return  # larger than the whole budget: disk tier only
+        self._entries[key] = entry
+        self._bytes += entry[2]
+        while self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted[2]
+            self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    # --- disk tier ---
+
+    def _disk_paths(self, key):
+        return os.path.join(self.disk_dir, key + '.html'), os.path.join(self.disk_dir, key + '.pkl')
+
+    def _disk_read(self, key):
+        if not self.disk_dir:
+            return None
+        html_path, pkl_path = self._disk_paths(key)
+        try:
+            with open(html_path, 'r', encoding='utf-8') as f:
+                html = f.read()
+        except OSError:
+            return None
+        blob = None
+        if self.keep_intermediates:
+            try:
+                with open(pkl_path, 'rb') as f:
+                    blob = f.read()
+            except OSError:
+                pass
+        return (html, blob, len(html.encode('utf-8', 'surrogatepass')) + (len(blob) if blob else 0))
+
+    def _disk_write(self, key, entry):
+        if not self.disk_dir:
+            return
+        html_path, pkl_path = self._disk_paths(key)
+        try:
+            _atomic_write(html_path, entry[0].encode('utf-8', 'surrogatepass'))
+            if entry[1] is not None:
+                _atomic_write(pkl_path, entry[1])
+        except OSError:
+            pass  # the disk tier is best effort
+
+    # --- reporting ---
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+
+def _atomic_write(path, data: bytes):
+    # write to a temp file in the same directory, then rename, so readers never see a partial file
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+_default_cache: Optional[AnalysisCache] = None
+_default_lock = threading.Lock()
+
+
+def _env_max_bytes() -> int:
+    value = os.environ.get('CX_CACHE_MAX_BYTES')
+    if value is None:
+        return DEFAULT_MAX_BYTES
+    try:
+        return int(value)
+    except ValueError:
+        logger.warning('Ignoring CX_CACHE_MAX_BYTES=%r (not an integer); using %d', value, DEFAULT_MAX_BYTES)
+        return DEFAULT_MAX_BYTES
+
+
+def get_default_cache() -> Optional[AnalysisCache]:
+    """The process-wide cache configured from the environment, or None when disabled."""
+    global _default_cache
+    if os.environ.get('CX_CACHE_DISABLE', '').strip().lower() in ('1', 'true', 'yes', 'on'):
+        return None
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = AnalysisCache(
+                max_bytes=_env_max_bytes(),
+                disk_dir=os.environ.get('CX_CACHE_DIR') or None,
+                keep_intermediates=os.environ.get('CX_CACHE_INTERMEDIATES', '').strip().lower() in ('1', 'true', 'yes', 'on'),
+            )
+        return _default_cache
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Usage: python cx_cache.py <sourcefile.py>")
+        sys.exit(1)
+
+    with open(sys.argv[1], "r", encoding="utf-8") as f:
+        print(make_cache_key(f.read(), sys.argv[1]))
@@ -4,13 +4,22 @@ import ast
 import sys
 import os
 import json
-import networkx as nx
-from typing import List, Optional, Any, Dict, Tuple
+import hashlib
+import bisect
+import marshal
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from typing import Generator, Iterator, List, Optional, Any, Dict, Tuple
 
 # --- 1. CFGNode Class Definition ---
 class CFGNode:
     """Represents a basic block in the Control Flow Graph."""
 
+    # large modules have tens of thousands of nodes: no per-instance __dict__, and the source
+    # snippet of a node with lines is sliced from the CFG's shared lines when asked for
+    __slots__ = ('node_id', 'ast_nodes', 'start_line', 'start_col', 'end_line', 'node_type',
+                 'cfg_owner_node', '_snippet', '_line_table')
+
     def __init__(self,
                  node_id: int,
                  ast_nodes: List[ast.stmt],
@@ -18,16 +27,29 @@ class CFGNode:
                  start_line: Optional[int] = None,
                  start_col: Optional[int] = None,
                  end_line: Optional[int] = None,
-                 source_code: Optional[str] = None):
+                 source_code: Optional[str] = None,
+                 line_table: Optional[List[List[str]]] = None):
         self.node_id = node_id
         self.ast_nodes = ast_nodes
         self.start_line = start_line
         self.start_col = start_col
         self.end_line = end_line
         self.node_type = node_type
-        self.source_code = source_code
+        self._snippet = source_code  # explicit text (conceptual nodes); wins over the lines
+        self._line_table = line_table  # the owning CFG's [source_code_lines] box
         self.cfg_owner_node = None
 
+    @property
+    def source_code(self) -> Optional[str]:
+        if self._snippet is not None or self._line_table is None or \
+           self.start_line is None or self.end_line is None:
+            return self._snippet
+        return "\n".join(self._line_table[0][self.start_line - 1:self.end_line])
+
+    @source_code.setter
+    def source_code(self, value: Optional[str]) -> None:
+        self._snippet = value
+
     # return the statement # of a node, or its owner node statement #, or -1
     def getStartLine(self):
         if self.start_line is not None:
@@ -73,6 +95,8 @@ class CFGNode:
 class CFGArc:
     """Represents a control flow transition (an edge) in the CFG."""
 
+    __slots__ = ('source_id', 'target_id', 'arc_type', 'condition')
+
     def __init__(self,
                  source_id: int,
                  target_id: int,
@@ -106,20 +130,51 @@ class CFGArc:
         return (f"CFGArc(from={self.source_id}, to={self.target_id}, "
                 f"type='{self.arc_type}'{cond_str})")
 
+# The block builders (CFG._process_block and the CFG._handle_* methods) are generators run on an
+# explicit stack by CFG._run_builder: instead of calling the builder of a nested block, a builder
+# yields it and is sent back that block's fallthrough nodes. Nesting depth (long elif chains,
+# generated code) is then limited by memory rather than by the interpreter's recursion limit.
+BuildStep = Generator['BuildStep', List[CFGNode], List[CFGNode]]
+
 # --- 3. CFG Class Definition ---
 class CFG:
     """Represents a single Control Flow Graph for a function, method, or global scope."""
 
     def __init__(self, name: str, source_code_lines: List[str]):
         self.name = name
-        self.source_code_lines = source_code_lines
-        self._graph = nx.DiGraph()
+        # one-element box shared with the nodes, which slice their snippets from it; replacing
+        # source_code_lines (a reused scope gets the new file's lines) updates every node at once
+        self._line_table: List[List[str]] = [source_code_lines]
+        # Native adjacency: node ids are 0..n-1, so successor/predecessor id lists are indexed by id.
+        # Both lists keep arc insertion order; adding an existing arc again replaces its CFGArc in place.
+        self._succ: List[List[int]] = []
+        self._pred: List[List[int]] = []
+        self._arcs: Dict[Tuple[int, int], CFGArc] = {}
+        # per node: arc type -> its outgoing arcs of that type, in successor order
+        self._out_by_type: List[Dict[str, List[CFGArc]]] = []
         self._nodes_by_id: Dict[int, CFGNode] = {}
+        # node type -> nodes of that type, in id order (for the flow generators)
+        self._nodes_by_type: Dict[str, List[CFGNode]] = {}
         self._next_node_id = 0
 
         self.entry_node_id: Optional[int] = None
         self.exit_node_id: Optional[int] = None
 
+        # per-kind flow lists computed from this CFG (see cached_flows); None = don't keep them
+        self._flow_cache: Optional[Dict[str, List[Dict[str, Any]]]] = None
+        # derived per-node tables (see cached_table); dropped whenever the graph or its lines change
+        self._tables: Dict[str, Any] = {}
+        # old node id -> new node id after contract_placeholders(); None if never contracted
+        self.contracted_ids: Optional[Dict[int, int]] = None
+
+    @property
+    def source_code_lines(self) -> List[str]:
+        return self._line_table[0]
+
+    @source_code_lines.setter
+    def source_code_lines(self, lines: List[str]) -> None:
+        self._line_table[0] = lines
+
     def _get_next_node_id(self) -> int:
         """Internal helper to get a unique node ID."""
         node_id = self._next_node_id
@@ -128,9 +183,10 @@ class CFG:
 
     def add_node(self, ast_nodes: List[ast.stmt], node_type: str = 'normal', description: Optional[str] = None) -> CFGNode:
         """
-        Creates a CFGNode object, adds it to the internal networkx graph,
+        Creates a CFGNode object, adds it to the graph,
         and stores the CFGNode object for lookup.
-        Derives line numbers and source code from ast_nodes, or sets to None for conceptual nodes.
+        Derives line numbers from ast_nodes, or sets them to None for conceptual nodes; the source
+        code of a node with lines is sliced from source_code_lines when asked for.
         """
         start_line: Optional[int] = None
         start_col: Optional[int] = None
@@ -146,14 +202,6 @@ class CFG:
             except AttributeError:
                 # This can happen for some non-statement AST nodes or synthetic ones
                 pass # Keep as None, will be handled by CFGNode repr/to_dict
-
-            if start_line is not None and end_line is not None:
-                try:
-                    # Adjust for 0-based indexing for source_code_lines
-                    block_source_lines = self.source_code_lines[start_line - 1:end_line]
-                    source_code_snippet = "\n".join(block_source_lines)
-                except IndexError:
-                    source_code_snippet = "<Source code not available>"
         else:
             # For conceptual nodes (entry, exit, join, etc.), description can be useful
             if description:
@@ -169,16 +217,22 @@ class CFG:
             start_col=start_col,
             end_line=end_line,
             node_type=node_type,
-            source_code=source_code_snippet
+            source_code=source_code_snippet,
+            line_table=self._line_table if ast_nodes else None
         )
-        self._graph.add_node(node_id, data=cfg_node)
+        self._succ.append([])
+        self._pred.append([])
+        self._out_by_type.append({})
         self._nodes_by_id[node_id] = cfg_node
+        self._nodes_by_type.setdefault(node_type, []).append(cfg_node)
+        self._tables.clear()
         return cfg_node
 
     def add_arc(self, source_node: CFGNode, target_node: CFGNode, arc_type: str, condition: Optional[ast.expr] = None) -> CFGArc:
         """
-        Creates a CFGArc object and adds an edge to the internal networkx graph.
-        Takes CFGNode objects as source/target.
+        Creates a CFGArc object and adds it to the graph.
+        Takes CFGNode objects as source/target. An arc between the same two nodes replaces
+        the previous one (keeping its place in the successor/predecessor order).
         """
         cfg_arc = CFGArc(
             source_id=source_node.node_id,
@@ -186,45 +240,263 @@ class CFG:
             arc_type=arc_type,
             condition=condition
         )
-        self._graph.add_edge(source_node.node_id, target_node.node_id, data=cfg_arc)
+        key = (cfg_arc.source_id, cfg_arc.target_id)
+        old_arc = self._arcs.get(key)
+        self._arcs[key] = cfg_arc
+        by_type = self._out_by_type[cfg_arc.source_id]
+        if old_arc is None:
+            self._succ[cfg_arc.source_id].append(cfg_arc.target_id)
+            self._pred[cfg_arc.target_id].append(cfg_arc.source_id)
+            by_type.setdefault(arc_type, []).append(cfg_arc)
+        elif old_arc.arc_type == arc_type:
+            group = by_type[arc_type]
+            group[group.index(old_arc)] = cfg_arc
+        else:
+            # the arc changed type (e.g. 'normal' from _process_block, then 'true_branch'): regroup this node
+            by_type.clear()
+            for arc in self.out_arcs(cfg_arc.source_id):
+                by_type.setdefault(arc.arc_type, []).append(arc)
+        self._tables.clear()
         return cfg_arc
 
     def get_node(self, node_id: int) -> Optional[CFGNode]:
-        """Retrieves the custom CFGNode object given its networkx ID."""
+        """Retrieves the custom CFGNode object given its ID."""
         return self._nodes_by_id.get(node_id)
 
+    def nodes_of_type(self, *node_types: str) -> List[CFGNode]:
+        """The nodes of the given type(s), in id order."""
+        if len(node_types) == 1:
+            return list(self._nodes_by_type.get(node_types[0], ()))
+        nodes = [node for node_type in node_types for node in self._nodes_by_type.get(node_type, ())]
+        nodes.sort(key=lambda node: node.node_id)
+        return nodes
+
+    def successor_ids(self, node_id: int) -> List[int]:
+        """IDs of the direct successors, in arc insertion order (do not modify the list)."""
+        return self._succ[node_id]
+
+    def predecessor_ids(self, node_id: int) -> List[int]:
+        """IDs of the direct predecessors, in arc insertion order (do not modify the list)."""
+        return self._pred[node_id]
+
     def get_successors(self, node_id: int) -> List[CFGNode]:
         """Returns a list of CFGNode objects that are direct successors of the given node."""
-        successors = []
-        for successor_id in self._graph.successors(node_id):
-            node = self.get_node(successor_id)
-            if node:
-                successors.append(node)
-        return successors
+        nodes = self._nodes_by_id
+        return [nodes[succ_id] for succ_id in self._succ[node_id]]
 
     def get_predecessors(self, node_id: int) -> List[CFGNode]:
         """Returns a list of CFGNode objects that are direct predecessors of the given node."""
-        predecessors = []
-        for predecessor_id in self._graph.predecessors(node_id):
-            node = self.get_node(predecessor_id)
-            if node:
-                predecessors.append(node)
-        return predecessors
+        nodes = self._nodes_by_id
+        return [nodes[pred_id] for pred_id in self._pred[node_id]]
 
     def get_arc(self, source_id, target_id):
         """
-        Retrieve the CFGArc object between source and target IDs from the CFG's internal graph.
+        Retrieve the CFGArc object between source and target IDs, or None.
+        """
+        return self._arcs.get((source_id, target_id))
+
+    def has_arc(self, source_id: int, target_id: int) -> bool:
+        return (source_id, target_id) in self._arcs
+
+    def out_arcs(self, node_id: int) -> List[CFGArc]:
+        """The arcs leaving the given node, in successor order."""
+        arcs = self._arcs
+        return [arcs[(node_id, succ_id)] for succ_id in self._succ[node_id]]
+
+    def out_arcs_by_type(self, node_id: int) -> Dict[str, List[CFGArc]]:
+        """The arcs leaving the given node, grouped by arc type (do not modify)."""
+        return self._out_by_type[node_id]
+
+    def out_arcs_of_type(self, node_id: int, *arc_types: str) -> List[CFGArc]:
+        """The arcs of the given type(s) leaving the given node, in successor order."""
+        by_type = self._out_by_type[node_id]
+        if len(arc_types) == 1:
+            return list(by_type.get(arc_types[0], ()))
+        if not any(arc_type in by_type for arc_type in arc_types):
+            return []
+        return [arc for arc in self.out_arcs(node_id) if arc.arc_type in arc_types]
+
+    def arcs(self) -> Iterator[CFGArc]:
+        """All arcs, grouped by source node (in node order), each group in successor order."""
+        arcs = self._arcs
+        for source_id, succ_ids in enumerate(self._succ):
+            for succ_id in succ_ids:
+                yield arcs[(source_id, succ_id)]
+
+    def arc_count(self) -> int:
+        return len(self._arcs)
+
+    def to_networkx(self):
+        """The graph as a networkx DiGraph (node attr 'data' = CFGNode, edge attr 'data' = CFGArc), for debugging."""
+        import networkx as nx  # optional dependency, only needed here
+        graph = nx.DiGraph()
+        for node_id, node in self._nodes_by_id.items():
+            graph.add_node(node_id, data=node)
+        for arc in self.arcs():
+            graph.add_edge(arc.source_id, arc.target_id, data=arc)
+        return graph
+
+    def cached_flows(self, kind: str, compute) -> List[Dict[str, Any]]:
         """
-        if self._graph.has_edge(source_id, target_id):
-            data = self._graph.get_edge_data(source_id, target_id)
-            if 'data' in data:
-                return data['data']
-        return None
+        Returns compute(self), the flow list of the given kind for this CFG.
+        When the CFG keeps flows (incremental CFGManager), the list is computed once
+        and copies are handed out, so a reused CFG does not recompute its flows.
+        """
+        if self._flow_cache is None:
+            return compute(self)
+        flows = self._flow_cache.get(kind)
+        if flows is None:
+            flows = self._flow_cache[kind] = compute(self)
+        return [dict(f) for f in flows]
+
+    def cached_table(self, name: str, compute) -> Any:
+        """
+        Returns compute(self), a table derived from the graph (e.g. node id -> line), computed
+        once and kept until the next add_node/add_arc/shift_lines. Callers must not modify it.
+        """
+        table = self._tables.get(name)
+        if table is None:
+            table = self._tables[name] = compute(self)
+        return table
+
+    def shift_lines(self, line_map) -> None:
+        """
+        Renumbers the lines of this CFG (nodes and kept flow lists) with line_map(old_line) -> new_line.
+        Used when an unchanged scope moved because code above it was edited.
+        """
+        for node in self._nodes_by_id.values():
+            if node.start_line is not None:
+                node.start_line = line_map(node.start_line)
+            if node.end_line is not None:
+                node.end_line = line_map(node.end_line)
+        self._tables.clear()
+        if self._flow_cache:
+            # new flow dicts: the old ones went out with an earlier request's results
+            for kind, flows in self._flow_cache.items():
+                self._flow_cache[kind] = [
+                    {key: line_map(value) if key in FLOW_LINE_KEYS and value != -1 else value
+                     for key, value in flow.items()}
+                    for flow in flows]
+
+    def rebind_ast(self, node_map: Dict[int, ast.AST]) -> None:
+        """
+        Points the nodes' AST statements and the arcs' conditions at other AST nodes, given as
+        id(old AST node) -> new AST node (nodes not in the map are kept). Used with shift_lines()
+        when a scope is reused for an identical scope of a new tree, which is left as it is.
+        """
+        for node in self._nodes_by_id.values():
+            if node.ast_nodes:
+                node.ast_nodes = [node_map.get(id(n), n) for n in node.ast_nodes]
+        for arc in self._arcs.values():
+            if arc.condition is not None:
+                arc.condition = node_map.get(id(arc.condition), arc.condition)
+
+    def contract_placeholders(self) -> Dict[int, int]:
+        """
+        Contracts chains of placeholder nodes (PLACEHOLDER_NODE_TYPES): a placeholder whose single
+        successor is another placeholder is removed, and the arcs into it go to the end of its chain
+        instead, keeping their types and conditions and their place in the successor/predecessor
+        orders. An if_join followed by anything other than an if_join is kept, since it marks the
+        end of an if (an end_if flow); so is a placeholder whose removal would merge two arcs, or
+        would leave such an if_join right before another if_join.
+        Node ids are renumbered densely in their old order. Returns old id -> new id, where a
+        removed node maps to the node that now stands for it; also kept as self.contracted_ids.
+        """
+        nodes = self._nodes_by_id
+        succ, pred = self._succ, self._pred
+
+        def contractible(node_id: int) -> bool:
+            node = nodes[node_id]
+            if node.node_type not in PLACEHOLDER_NODE_TYPES or node.ast_nodes or len(succ[node_id]) != 1 \
+               or node_id in (self.entry_node_id, self.exit_node_id):
+                return False
+            target_type = nodes[succ[node_id][0]].node_type
+            return target_type in PLACEHOLDER_NODE_TYPES and (node.node_type != 'if_join' or target_type == 'if_join')
+
+        removed = {node_id for node_id in nodes if contractible(node_id)}
+        while True:
+            # the end of each chain (the builder makes no placeholder cycles: every cycle passes a
+            # loop condition)
+            rep: Dict[int, int] = {}
+            for node_id in removed:
+                chain = []
+                current = node_id
+                while current in removed and current not in rep:
+                    chain.append(current)
+                    current = succ[current][0]
+                end = rep.get(current, current)
+                for chained_id in chain:
+                    rep[chained_id] = end
+            # arcs u -> a and u -> b with a, b ending at the same node would collapse into one
+            clashes = set()
+            for node_id in nodes:
+                if node_id in removed:
+                    continue
+                targets = [rep.get(v, v) for v in succ[node_id]]
+                if len(set(targets)) != len(targets):
+                    clashes.update(v for v in succ[node_id] if v in removed)
+                # a kept if_join would end up right before another if_join, which reads as an
+                # intermediate elif join (no end_if flows): keep the placeholder after it
+                if nodes[node_id].node_type == 'if_join' and succ[node_id] and succ[node_id][0] in removed \
+                   and nodes[rep[succ[node_id][0]]].node_type == 'if_join':
+                    clashes.add(succ[node_id][0])
+            if not clashes:
+                break
+            removed -= clashes
+
+        kept = [node_id for node_id in range(self._next_node_id) if node_id not in removed]
+        new_ids = {old_id: new_id for new_id, old_id in enumerate(kept)}
+        id_map = {old_id: new_ids[rep.get(old_id, old_id)] for old_id in range(self._next_node_id)}
+
+        new_succ: List[List[int]] = []
+        new_pred: List[List[int]] = []
+        new_out_by_type: List[Dict[str, List[CFGArc]]] = []
+        new_arcs: Dict[Tuple[int, int], CFGArc] = {}
+        for old_id in kept:
+            by_type: Dict[str, List[CFGArc]] = {}
+            for target_id in succ[old_id]:
+                arc = self._arcs[(old_id, target_id)]
+                arc.source_id, arc.target_id = id_map[old_id], id_map[target_id]
+                new_arcs[(arc.source_id, arc.target_id)] = arc
+                by_type.setdefault(arc.arc_type, []).append(arc)
+            new_succ.append([id_map[target_id] for target_id in succ[old_id]])
+            new_out_by_type.append(by_type)
+            # a removed predecessor is replaced by its own predecessors, in their order
+            preds: List[int] = []
+            stack = pred[old_id][::-1]
+            while stack:
+                pred_id = stack.pop()
+                if pred_id in removed:
+                    stack.extend(pred[pred_id][::-1])
+                else:
+                    preds.append(id_map[pred_id])
+            new_pred.append(preds)
+
+        by_type = {node_type: [node for node in type_nodes if node.node_id not in removed]
+                   for node_type, type_nodes in self._nodes_by_type.items()}
+        self._nodes_by_type = {node_type: type_nodes for node_type, type_nodes in by_type.items() if type_nodes}
+        for old_id in kept:
+            nodes[old_id].node_id = new_ids[old_id]
+        self._nodes_by_id = {new_id: nodes[old_id] for new_id, old_id in enumerate(kept)}
+        self._succ, self._pred, self._arcs, self._out_by_type = new_succ, new_pred, new_arcs, new_out_by_type
+        self._next_node_id = len(kept)
+        if self.entry_node_id is not None:
+            self.entry_node_id = id_map[self.entry_node_id]
+        if self.exit_node_id is not None:
+            self.exit_node_id = id_map[self.exit_node_id]
+        self._tables.clear()
+        if self._flow_cache:
+            self._flow_cache = {}
+
+        if self.contracted_ids is not None:  # contracted before: map the original ids
+            id_map = {orig_id: id_map[old_id] for orig_id, old_id in self.contracted_ids.items()}
+        self.contracted_ids = id_map
+        return id_map
 
     def to_dict(self) -> Dict[str, Any]:
         """Serializes this single CFG (including its nodes and arcs) into a dictionary."""
         nodes_data = [node.to_dict() for node_id, node in self._nodes_by_id.items()]
-        arcs_data = [self._graph.edges[u, v]['data'].to_dict() for u, v in self._graph.edges]
+        arcs_data = [arc.to_dict() for arc in self.arcs()]
 
         return {
             "name": self.name,
@@ -234,15 +506,96 @@ class CFG:
             "arcs": arcs_data
         }
 
+    # --- compact form ---
+    # to_dict() above is for reading (it unparses every AST node); the compact form is for caching
+    # and sending CFGs between processes. It holds ids, types, spans and the arc tables, and for
+    # AST references only position keys, which from_compact binds to a given tree.
+
+    def _to_compact_tuple(self) -> Tuple:
+        nodes = [self._nodes_by_id[node_id] for node_id in range(self._next_node_id)]
+        arcs = list(self.arcs())
+        return (
+            self.name, self.entry_node_id, self.exit_node_id,
+            tuple(node.node_type for node in nodes),
+            tuple(node.start_line for node in nodes),
+            tuple(node.start_col for node in nodes),
+            tuple(node.end_line for node in nodes),
+            tuple(node._snippet for node in nodes),  # line nodes: None, re-sliced on load
+            tuple(node.cfg_owner_node.node_id if node.cfg_owner_node else -1 for node in nodes),
+            tuple(tuple(_ast_key(n) for n in node.ast_nodes) for node in nodes),
+            tuple(arc.source_id for arc in arcs),
+            tuple(arc.target_id for arc in arcs),
+            tuple(arc.arc_type for arc in arcs),
+            tuple(_ast_key(arc.condition) if arc.condition is not None else None for arc in arcs),
+            tuple(tuple(pred_ids) for pred_ids in self._pred),  # predecessor order is arc insertion order
+        )
+
+    @classmethod
+    def _from_compact_tuple(cls, data: Tuple, source_code_lines: List[str],
+                            scope_stmt: Optional[ast.AST] = None) -> 'CFG':
+        (name, entry_node_id, exit_node_id, node_types, start_lines, start_cols, end_lines, snippets,
+         owner_ids, ast_keys, arc_sources, arc_targets, arc_types, arc_conditions, preds) = data
+        cfg = cls(name=name, source_code_lines=source_code_lines)
+        cfg.entry_node_id = entry_node_id
+        cfg.exit_node_id = exit_node_id
+        n = len(node_types)
+        cfg._next_node_id = n
+        line_table = cfg._line_table if source_code_lines else None
+        nodes = list(map(CFGNode, range(n), map(list, ast_keys), node_types, start_lines, start_cols,
+                         end_lines, snippets, repeat(line_table, n)))
+        for node, owner_id in zip(nodes, owner_ids):
+            if owner_id != -1:
+                node.cfg_owner_node = nodes[owner_id]
+            cfg._nodes_by_type.setdefault(node.node_type, []).append(node)
+        cfg._nodes_by_id = dict(enumerate(nodes))
+        cfg._succ = [[] for _ in range(n)]
+        cfg._pred = [list(pred_ids) for pred_ids in preds]
+        cfg._out_by_type = [{} for _ in range(n)]
+        arcs = cfg._arcs
+        succ, out_by_type = cfg._succ, cfg._out_by_type
+        for arc in map(CFGArc, arc_sources, arc_targets, arc_types, arc_conditions):
+            arcs[(arc.source_id, arc.target_id)] = arc
+            succ[arc.source_id].append(arc.target_id)
+            out_by_type[arc.source_id].setdefault(arc.arc_type, []).append(arc)
+
+        if scope_stmt is not None:
+            _bind_ast_keys(cfg, scope_stmt)
+        else:
+            # no tree to refer to: the CFG carries no AST references (the flows do not need them)
+            for node in nodes:
+                node.ast_nodes = []
+            for arc in arcs.values():
+                arc.condition = None
+        return cfg
+
+    def to_compact(self) -> bytes:
+        """This CFG as compact bytes (see from_compact)."""
+        return marshal.dumps((COMPACT_VERSION, self._to_compact_tuple()))
+
+    @classmethod
+    def from_compact(cls, data: bytes, source_code_lines: Optional[List[str]] = None,
+                     scope_stmt: Optional[ast.AST] = None) -> 'CFG':
+        """
+        Loads a CFG saved by to_compact. scope_stmt is the scope's def statement (or a Module holding
+        the global statements) in the caller's tree, to bind the AST references to; without it,
+        ast_nodes are empty and arc conditions None. Nodes with lines take their source code from
+        source_code_lines; without them, their source_code is None.
+        """
+        version, cfg_data = marshal.loads(data)
+        if version != COMPACT_VERSION:
+            raise ValueError(f"unsupported compact CFG version {version!r}")
+        return cls._from_compact_tuple(cfg_data, source_code_lines or [], scope_stmt)
+
     def _process_block(self,
                        statements: List[ast.stmt],
                        current_predecessors: List[CFGNode],
                        cfg_function_exit_node: CFGNode,
                        loop_context: List[Tuple[CFGNode, CFGNode]] # Added for break/continue targets (loop_exit, loop_continue)
-                      ) -> List[CFGNode]:
+                      ) -> BuildStep:
         """
-        Recursively processes a list of AST statements (a block), creating CFGNodes and arcs.
-        Handles sequential statements and dispatches to specific handlers for control flow.
+        Processes a list of AST statements (a block), creating CFGNodes and arcs.
+        Handles sequential statements and dispatches to specific handlers for control flow
+        (yielding them to _run_builder, see BuildStep).
 
         Args:
             statements: The list of AST statements to process in this block.
@@ -285,7 +638,7 @@ class CFG:
 
                 # Now handle the control flow statement itself
                 if isinstance(stmt, ast.If):
-                    if_join_nodes = self._handle_if_statement(stmt, active_fallthroughs, cfg_function_exit_node, loop_context)
+                    if_join_nodes = yield self._handle_if_statement(stmt, active_fallthroughs, cfg_function_exit_node, loop_context)
                     active_fallthroughs = if_join_nodes # The join node becomes the predecessor for subsequent statements
                 elif isinstance(stmt, ast.Return):
                     return_node = self.add_node([stmt], node_type='return')
@@ -296,10 +649,10 @@ class CFG:
                     # Any subsequent statements in this block are unreachable
                     break
                 elif isinstance(stmt, ast.While):
-                    loop_fallthroughs = self._handle_while_loop(stmt, active_fallthroughs, cfg_function_exit_node, loop_context)
+                    loop_fallthroughs = yield self._handle_while_loop(stmt, active_fallthroughs, cfg_function_exit_node, loop_context)
                     active_fallthroughs = loop_fallthroughs
                 elif isinstance(stmt, ast.For):
-                    loop_fallthroughs = self._handle_for_loop(stmt, active_fallthroughs, cfg_function_exit_node, loop_context)
+                    loop_fallthroughs = yield self._handle_for_loop(stmt, active_fallthroughs, cfg_function_exit_node, loop_context)
                     active_fallthroughs = loop_fallthroughs
                 elif isinstance(stmt, ast.Break):
                     break_node = self.add_node([stmt], node_type='break')
@@ -330,10 +683,10 @@ class CFG:
                     active_fallthroughs = [] # Continue terminates flow from this path in current block
                     break # No more statements in this block are reachable
                 elif isinstance(stmt, ast.Try):
-                    try_fallthroughs = self._handle_try_statement(stmt, active_fallthroughs, cfg_function_exit_node, loop_context)
+                    try_fallthroughs = yield self._handle_try_statement(stmt, active_fallthroughs, cfg_function_exit_node, loop_context)
                     active_fallthroughs = try_fallthroughs
                 elif isinstance(stmt, ast.With):
-                    with_fallthroughs = self._handle_with_statement(stmt, active_fallthroughs, cfg_function_exit_node, loop_context)
+                    with_fallthroughs = yield self._handle_with_statement(stmt, active_fallthroughs, cfg_function_exit_node, loop_context)
                     active_fallthroughs = with_fallthroughs
                 elif isinstance(stmt, ast.Raise):
                     # For now, raise acts as a terminator, similar to return.
@@ -364,7 +717,7 @@ class CFG:
                              if_node: ast.If,
                              current_predecessors: List[CFGNode],
                              cfg_function_exit_node: CFGNode,
-                             loop_context: List[Tuple[CFGNode, CFGNode]]) -> List[CFGNode]:
+                             loop_context: List[Tuple[CFGNode, CFGNode]]) -> BuildStep:
         """
         Handles an ast.If node, building its corresponding CFG structure:
         condition -> (true_branch_start / false_branch_start) -> join_node.
@@ -389,7 +742,7 @@ class CFG:
         if_join_node = self.add_node([], node_type='if_join')
 
         # True branch
-        true_branch_fallthroughs = self._process_block(if_node.body, [condition_node], cfg_function_exit_node, loop_context)
+        true_branch_fallthroughs = yield self._process_block(if_node.body, [condition_node], cfg_function_exit_node, loop_context)
         for node in true_branch_fallthroughs:
             self.add_arc(node, if_join_node, arc_type='fallthrough')
         
@@ -399,7 +752,7 @@ class CFG:
             # This is a bit indirect, as _process_block creates nodes.
             # A more robust approach might have _process_block return its actual entry node if one is created.
             # For now, we assume the first node of the block's content is the first node generated.
-            for succ_id in self._graph.successors(condition_node.node_id):
+            for succ_id in self.successor_ids(condition_node.node_id):
                 succ_node = self.get_node(succ_id)
                 if succ_node and succ_node.ast_nodes and succ_node.ast_nodes[0] == if_node.body[0]:
                     first_true_body_node = succ_node
@@ -413,13 +766,13 @@ class CFG:
 
         # False branch (else)
         if if_node.orelse:
-            false_branch_fallthroughs = self._process_block(if_node.orelse, [condition_node], cfg_function_exit_node, loop_context)
+            false_branch_fallthroughs = yield self._process_block(if_node.orelse, [condition_node], cfg_function_exit_node, loop_context)
             for node in false_branch_fallthroughs:
                 self.add_arc(node, if_join_node, arc_type='fallthrough')
             
             if if_node.orelse:
                 first_false_body_node = None
-                for succ_id in self._graph.successors(condition_node.node_id):
+                for succ_id in self.successor_ids(condition_node.node_id):
                     succ_node = self.get_node(succ_id)
                     if succ_node and succ_node.ast_nodes and succ_node.ast_nodes[0] == if_node.orelse[0]:
                         first_false_body_node = succ_node
@@ -441,7 +794,7 @@ class CFG:
                            while_node: ast.While,
                            current_predecessors: List[CFGNode],
                            cfg_function_exit_node: CFGNode,
-                           loop_context: List[Tuple[CFGNode, CFGNode]]) -> List[CFGNode]:
+                           loop_context: List[Tuple[CFGNode, CFGNode]]) -> BuildStep:
         """
         Handles an ast.While node, building its CFG structure:
         predecessors -> loop_condition -> loop_body -> loop_condition (back-edge)
@@ -470,7 +823,7 @@ class CFG:
         new_loop_context = loop_context + [(loop_exit_node, loop_condition_node)]
 
         # 4. Process the loop body
-        loop_body_fallthroughs = self._process_block(while_node.body, [loop_condition_node], cfg_function_exit_node, new_loop_context)
+        loop_body_fallthroughs = yield self._process_block(while_node.body, [loop_condition_node], cfg_function_exit_node, new_loop_context)
 
         # 5. Add back-edge from loop body fallthroughs to the condition node
         for node in loop_body_fallthroughs:
@@ -485,7 +838,7 @@ class CFG:
         if while_node.orelse:
             # Create a separate block for the 'else' part of the while loop
             # This block is only entered if the loop condition becomes false *naturally*.
-            while_else_fallthroughs = self._process_block(while_node.orelse, [loop_condition_node], cfg_function_exit_node, loop_context)
+            while_else_fallthroughs = yield self._process_block(while_node.orelse, [loop_condition_node], cfg_function_exit_node, loop_context)
             
             # The 'else' block's fallthroughs also connect to the loop_exit_node
             for node in while_else_fallthroughs:
@@ -498,7 +851,7 @@ class CFG:
                 # Need to find the first node generated by _process_block for while_node.orelse
                 # This is a bit tricky, but it would be the first node whose predecessor is loop_condition_node
                 # and whose AST content matches the first statement of orelse.
-                for succ_id in self._graph.successors(loop_condition_node.node_id):
+                for succ_id in self.successor_ids(loop_condition_node.node_id):
                     succ_node = self.get_node(succ_id)
                     if succ_node and succ_node.ast_nodes and succ_node.ast_nodes[0] == while_node.orelse[0]:
                         first_else_body_node = succ_node
@@ -518,7 +871,7 @@ class CFG:
                           for_node: ast.For,
                           current_predecessors: List[CFGNode],
                           cfg_function_exit_node: CFGNode,
-                          loop_context: List[Tuple[CFGNode, CFGNode]]) -> List[CFGNode]:
+                          loop_context: List[Tuple[CFGNode, CFGNode]]) -> BuildStep:
         """
         Handles an ast.For node, building its CFG structure:
         predecessors -> iterator_init -> loop_condition (get next) -> loop_body -> loop_condition (back-edge)
@@ -553,7 +906,7 @@ class CFG:
         new_loop_context = loop_context + [(loop_exit_node, loop_condition_node)]
 
         # 5. Process the loop body
-        loop_body_fallthroughs = self._process_block(for_node.body, [loop_condition_node], cfg_function_exit_node, new_loop_context)
+        loop_body_fallthroughs = yield self._process_block(for_node.body, [loop_condition_node], cfg_function_exit_node, new_loop_context)
 
         # 6. Add back-edge from loop body fallthroughs to the condition node
         for node in loop_body_fallthroughs:
@@ -566,14 +919,14 @@ class CFG:
 
         # 8. Handle `else` block for `for` (executed if loop finishes normally, without `break`)
         if for_node.orelse:
-            for_else_fallthroughs = self._process_block(for_node.orelse, [loop_condition_node], cfg_function_exit_node, loop_context)
+            for_else_fallthroughs = yield self._process_block(for_node.orelse, [loop_condition_node], cfg_function_exit_node, loop_context)
             for node in for_else_fallthroughs:
                 self.add_arc(node, loop_exit_node, arc_type='fallthrough_from_else')
             
             # The 'no_more_items' from condition should specifically lead to the ELSE body entry if present
             first_else_body_node = None
             if for_node.orelse:
-                for succ_id in self._graph.successors(loop_condition_node.node_id):
+                for succ_id in self.successor_ids(loop_condition_node.node_id):
                     succ_node = self.get_node(succ_id)
                     if succ_node and succ_node.ast_nodes and succ_node.ast_nodes[0] == for_node.orelse[0]:
                         first_else_body_node = succ_node
@@ -592,7 +945,7 @@ class CFG:
                               try_node: ast.Try,
                               current_predecessors: List[CFGNode],
                               cfg_function_exit_node: CFGNode,
-                              loop_context: List[Tuple[CFGNode, CFGNode]]) -> List[CFGNode]:
+                              loop_context: List[Tuple[CFGNode, CFGNode]]) -> BuildStep:
         """
         Handles an ast.Try node for Phase 1: Normal flow only.
         Models: predecessors -> try_body -> else_body -> finally_body -> try_join.
@@ -616,19 +969,19 @@ class CFG:
         current_block_fallthroughs = [try_entry_node]
 
         # 1. Process the `try` block
-        try_body_fallthroughs = self._process_block(try_node.body, current_block_fallthroughs, cfg_function_exit_node, loop_context)
+        try_body_fallthroughs = yield self._process_block(try_node.body, current_block_fallthroughs, cfg_function_exit_node, loop_context)
         current_block_fallthroughs = try_body_fallthroughs
 
         # 2. Process the `else` block (if no exception occurred in try block)
         # In Phase 1, we assume the 'normal' path, so 'else' follows 'try'.
         if try_node.orelse:
-            else_body_fallthroughs = self._process_block(try_node.orelse, current_block_fallthroughs, cfg_function_exit_node, loop_context)
+            else_body_fallthroughs = yield self._process_block(try_node.orelse, current_block_fallthroughs, cfg_function_exit_node, loop_context)
             current_block_fallthroughs = else_body_fallthroughs
         
         # 3. Process the `finally` block (always executes)
         # In Phase 1, it executes after the 'normal' flow of try/else.
         if try_node.finalbody:
-            finally_body_fallthroughs = self._process_block(try_node.finalbody, current_block_fallthroughs, cfg_function_exit_node, loop_context)
+            finally_body_fallthroughs = yield self._process_block(try_node.finalbody, current_block_fallthroughs, cfg_function_exit_node, loop_context)
             current_block_fallthroughs = finally_body_fallthroughs
         
         # 4. Create a join node for the entire try-except-else-finally structure
@@ -644,7 +997,7 @@ class CFG:
                               try_node: ast.Try,
                               current_predecessors: List[CFGNode],
                               cfg_function_exit_node: CFGNode,
-                              loop_context: List[Tuple[CFGNode, CFGNode]]) -> List[CFGNode]:
+                              loop_context: List[Tuple[CFGNode, CFGNode]]) -> BuildStep:
         """
         Handles an ast.Try node, building its full CFG structure including
         try, except, else, and finally blocks.
@@ -684,7 +1037,7 @@ class CFG:
         # ----------------------------------------
         # _process_block returns the fallthrough nodes from the try body
         # (i.e., paths that completed without an immediate return, break, continue, or raise)
-        try_body_fallthroughs = self._process_block(
+        try_body_fallthroughs = yield self._process_block(
             try_node.body,
             [try_entry_node], # Try body starts after try_entry_node
             cfg_function_exit_node,
@@ -715,7 +1068,7 @@ class CFG:
             self.add_arc(try_entry_node, except_entry_node, arc_type='exception_jump', condition=handler.type)
             
             # Process the body of the current except handler
-            except_body_fallthroughs = self._process_block(
+            except_body_fallthroughs = yield self._process_block(
                 handler.body,
                 [except_entry_node], # Except body starts after its entry node
                 cfg_function_exit_node,
@@ -731,7 +1084,7 @@ class CFG:
         if try_node.orelse:
             # Ensure there were paths from the try body to connect to the else
             if try_body_fallthroughs: # Only proceed if try block had normal fallthroughs
-                else_body_fallthroughs = self._process_block(
+                else_body_fallthroughs = yield self._process_block(
                     try_node.orelse,
                     try_body_fallthroughs, # Else block follows successful try execution
                     cfg_function_exit_node,
@@ -760,7 +1113,7 @@ class CFG:
                 self.add_arc(node, finally_entry_node, arc_type='to_finally')
             
             # Process the finally body
-            final_block_exit_points = self._process_block(
+            final_block_exit_points = yield self._process_block(
                 try_node.finalbody,
                 [finally_entry_node], # Finally body starts after its entry node
                 cfg_function_exit_node,
@@ -786,7 +1139,7 @@ class CFG:
                                with_node: ast.With,
                                current_predecessors: List[CFGNode],
                                cfg_function_exit_node: CFGNode,
-                               loop_context: List[Tuple[CFGNode, CFGNode]]) -> List[CFGNode]:
+                               loop_context: List[Tuple[CFGNode, CFGNode]]) -> BuildStep:
         """
         Handles an ast.With node for Phase 1: Normal flow only.
         Models: predecessors -> with_entry -> with_body -> with_exit -> fallthrough.
@@ -810,7 +1163,7 @@ class CFG:
             self.add_arc(pred, with_entry_node, arc_type='normal')
         
         # 2. Process the `with` block body
-        with_body_fallthroughs = self._process_block(with_node.body, [with_entry_node], cfg_function_exit_node, loop_context)
+        with_body_fallthroughs = yield self._process_block(with_node.body, [with_entry_node], cfg_function_exit_node, loop_context)
 
         # 3. Create a node for the context manager exit
         # This represents the `__exit__` call and cleanup
@@ -825,6 +1178,22 @@ class CFG:
         return [with_exit_node]
 
 
+    @staticmethod
+    def _run_builder(root: BuildStep) -> List[CFGNode]:
+        """Runs a block builder and every nested builder it yields, depth first; returns root's result."""
+        stack = [root]
+        result = None  # what the top builder is sent next: None to start it, else a nested result
+        while stack:
+            try:
+                nested = stack[-1].send(result)
+            except StopIteration as done:
+                stack.pop()
+                result = done.value
+            else:
+                stack.append(nested)
+                result = None
+        return result
+
     def _build_graph_from_ast(self, ast_subtree: ast.AST) -> None:
         """
         (CORE IMPLEMENTATION)
@@ -848,26 +1217,212 @@ class CFG:
             raise ValueError(f"Unsupported AST subtree type for CFG building: {type(ast_subtree).__name__}")
 
         # Initial call to _process_block with an empty loop_context
-        final_fallthroughs_from_main_block = self._process_block(
+        final_fallthroughs_from_main_block = self._run_builder(self._process_block(
             statements_to_process,
             [entry_node],
             exit_node,
             [] # Start with an empty loop_context
-        )
+        ))
 
         for node in final_fallthroughs_from_main_block:
-            if node.node_id != exit_node.node_id and not self._graph.has_edge(node.node_id, exit_node.node_id):
+            if node.node_id != exit_node.node_id and not self.has_arc(node.node_id, exit_node.node_id):
                 self.add_arc(node, exit_node, arc_type='fallthrough_to_cfg_exit')
 
+# conceptual nodes without a line that only mark where paths meet (see CFG.contract_placeholders)
+PLACEHOLDER_NODE_TYPES = ('if_join', 'loop_exit', 'loop_exit_for', 'try_join', 'with_exit')
+
+# line-number fields of the flow records built from CFGs (-1 means "none")
+FLOW_LINE_KEYS = ('stmt_from', 'stmt_to', 'stmt_to_true', 'stmt_to_false')
+
+# version of the to_compact() layout; bump on any change
+COMPACT_VERSION = 2
+
+class _ScopeEntry:
+    """A built CFG, remembered by the content hash of the statements it was built from."""
+
+    def __init__(self, cfg: CFG, stmts: List[ast.stmt]):
+        self.cfg = cfg
+        self.stmts = stmts  # top-level statements of the scope, in the tree the CFG was built from
+
+def _stmt_first_line(stmt: ast.stmt) -> int:
+    decos = getattr(stmt, 'decorator_list', None)
+    if decos:
+        return min([stmt.lineno] + [d.lineno for d in decos])
+    return stmt.lineno
+
+
+# --- Parallel construction ---
+# With CFGManager(workers=N), a large module's function and method CFGs are built in a process pool.
+# Each worker gets the source text of its scopes only (a method is re-wrapped in a one-line class
+# header), parses it, moves the tree to the scope's real line numbers, builds the CFGs and sends
+# them back in compact form (CFG.to_compact), whose AST position keys are bound to the caller's
+# own tree on arrival. The global scope is always built in the calling process.
+
+# below this many lines of function/method source the pool costs more than it saves
+PARALLEL_MIN_LINES = 20000
+# scope chunks per worker: several, so that one chunk of big functions doesn't hold up the pool
+PARALLEL_CHUNKS_PER_WORKER = 4
+
+
+class _ScopeLines:
+    """The source lines of one scope, indexed as in the whole file (only slicing is supported)."""
+
+    def __init__(self, lines: List[str], first_line: int):
+        self.lines = lines
+        self.offset = first_line - 1
+
+    def __getitem__(self, index: slice) -> List[str]:
+        return self.lines[max(0, index.start - self.offset):max(0, index.stop - self.offset)]
+
+
+def _build_scope_chunk(chunk: List[Tuple[str, int, bool, str]]) -> List[bytes]:
+    """Worker: chunk is [(scope name, first line, is_method, source text)] -> their compact CFGs."""
+    cfgs = []
+    for name, first_line, is_method, text in chunk:
+        if is_method:
+            node = ast.parse("class _:\n" + text).body[0].body[0]
+            ast.increment_lineno(node, first_line - 2)
+        else:
+            node = ast.parse(text).body[0]
+            ast.increment_lineno(node, first_line - 1)
+        cfg = CFG(name=name, source_code_lines=_ScopeLines(text.split("\n"), first_line))
+        cfg._build_graph_from_ast(node)
+        cfgs.append(cfg.to_compact())
+    return cfgs
+
+
+def _ast_key(node: ast.AST) -> Tuple:
+    return (type(node).__name__, getattr(node, 'lineno', None), getattr(node, 'col_offset', None),
+            getattr(node, 'end_lineno', None), getattr(node, 'end_col_offset', None))
+
+
+def _def_scopes(module_ast) -> Iterator[Tuple[ast.stmt, str, bool]]:
+    """(def statement, scope name, is_method) for the module's functions and class methods, in source order."""
+    for stmt in module_ast.body:
+        if isinstance(stmt, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            yield stmt, stmt.name, False
+        elif isinstance(stmt, ast.ClassDef):
+            for class_stmt in stmt.body:
+                if isinstance(class_stmt, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                    yield class_stmt, f"{stmt.name}.{class_stmt.name}", True
+
+
+# the CFG builder refers to statements, except handlers and these expressions directly under them
+_STMT_LIST_FIELDS = ('body', 'orelse', 'finalbody', 'handlers')
+_STMT_EXPR_FIELDS = ('test', 'iter', 'target', 'type')
+
+
+def _bind_ast_keys(cfg: CFG, scope_stmt: ast.AST) -> None:
+    """Replaces the AST position keys of a CFG loaded from compact form with the matching nodes of scope_stmt."""
+    # index only the statement structure (a full ast.walk costs about as much as the build)
+    nodes: Dict[Tuple, ast.AST] = {}
+    stack: List[ast.AST] = [scope_stmt]
+    while stack:
+        node = stack.pop()
+        nodes.setdefault(_ast_key(node), node)
+        for field in _STMT_EXPR_FIELDS:
+            child = getattr(node, field, None)
+            if isinstance(child, ast.expr):
+                nodes.setdefault(_ast_key(child), child)
+        for field in _STMT_LIST_FIELDS:
+            stack.extend(reversed(getattr(node, field, ())))
+
+    def lookup(key):
+        if key not in nodes:  # something outside that structure: index everything once
+            for node in ast.walk(scope_stmt):
+                nodes.setdefault(_ast_key(node), node)
+        return nodes[key]
+
+    for cfg_node in cfg._nodes_by_id.values():
+        cfg_node.ast_nodes = [lookup(key) for key in cfg_node.ast_nodes]
+    for arc in cfg._arcs.values():
+        if arc.condition is not None:
+            arc.condition = lookup(arc.condition)
+
+
 # --- 4. CFGManager Class Definition ---
 class CFGManager:
     """Manages the creation and storage of multiple CFGs for a given source file."""
 
-    def __init__(self):
-        self.cfgs: Dict[str, CFG] = {}
+    def __init__(self, incremental: bool = False, lazy: bool = False,
+                 workers: Optional[int] = None, parallel_min_lines: int = PARALLEL_MIN_LINES,
+                 contract_placeholders: bool = False):
+        self._cfgs: Dict[str, CFG] = {}
         self.source_code: Optional[str] = None
         self.source_code_lines: List[str] = []
 
+        # every CFG gets CFG.contract_placeholders() right after it is built
+        self.contract_placeholders = contract_placeholders
+
+        # Lazy mode: loading only takes the scope inventory; a scope's CFG is built on its first
+        # get_cfg(), and get_all_cfgs() (or .cfgs) builds whatever is still missing.
+        self.lazy = lazy
+        self._scope_names: List[str] = []  # in source order (a repeated name keeps its first place)
+        self._pending: Dict[str, Tuple[List[ast.stmt], Any]] = {}  # name -> (stmts, build) not built yet
+
+        # Parallel mode (eager, non-incremental loads only): see _build_scope_chunk
+        self.workers = workers
+        self.parallel_min_lines = parallel_min_lines
+        self._prebuilt: Dict[int, bytes] = {}  # id(def statement) -> compact CFG built by the pool
+
+        # Incremental mode: a manager kept across edits of the same program reloads only the
+        # scopes (global segment, functions, methods) whose source text changed. Unchanged
+        # scopes keep their CFG (and the flow lists computed from it), renumbered if they moved.
+        self.incremental = incremental
+        self._scope_cache: Dict[str, _ScopeEntry] = {}  # scopes of the current source
+        self._prev_scope_cache: Dict[str, _ScopeEntry] = {}  # scopes of the previous load
+        self.reused_scopes: List[str] = []
+        self.rebuilt_scopes: List[str] = []
+
+    def _scope_hash(self, name: str, stmts: List[ast.stmt]) -> str:
+        # the full source lines of each statement; positions are left out so a moved scope still matches
+        h = hashlib.sha256(name.encode('utf-8'))
+        for stmt in stmts:
+            text = "\n".join(self.source_code_lines[_stmt_first_line(stmt) - 1:stmt.end_lineno])
+            h.update(b'\0')
+            h.update(text.encode('utf-8', 'surrogatepass'))
+        return h.hexdigest()
+
+    def _build_scope(self, name: str, stmts: List[ast.stmt], build) -> CFG:
+        if not self.incremental:
+            cfg = CFG(name=name, source_code_lines=self.source_code_lines)
+            build(cfg)
+            return cfg
+
+        key = self._scope_hash(name, stmts)
+        new_cache = self._scope_cache
+        entry = self._prev_scope_cache.get(key) or new_cache.get(key)
+        if entry is not None and key not in new_cache:
+            self._reuse_scope(entry, stmts)
+            self.reused_scopes.append(name)
+        else:
+            cfg = CFG(name=name, source_code_lines=self.source_code_lines)
+            cfg._flow_cache = {}
+            build(cfg)
+            entry = _ScopeEntry(cfg, stmts)
+            self.rebuilt_scopes.append(name)
+        new_cache[key] = entry
+        return entry.cfg
+
+    def _reuse_scope(self, entry: _ScopeEntry, new_stmts: List[ast.stmt]) -> None:
+        """Moves a cached scope to the position of its (textually identical) new statements."""
+        old_starts = [_stmt_first_line(s) for s in entry.stmts]
+        deltas = [_stmt_first_line(new) - old for new, old in zip(new_stmts, old_starts)]
+        entry.cfg.source_code_lines = self.source_code_lines
+        if any(deltas):
+            def line_map(line: int) -> int:
+                i = bisect.bisect_right(old_starts, line) - 1
+                return line + deltas[i] if i >= 0 else line
+            entry.cfg.shift_lines(line_map)
+        # the CFG now refers to the new tree's (identical, already renumbered) nodes; the previous
+        # tree may still be held by the caller, so it is not renumbered in place
+        node_map = {}
+        for old_stmt, new_stmt in zip(entry.stmts, new_stmts):
+            for old_node, new_node in zip(ast.walk(old_stmt), ast.walk(new_stmt)):
+                node_map[id(old_node)] = new_node
+        entry.cfg.rebind_ast(node_map)
+        entry.stmts = new_stmts
+
     def load_from_file(self, filename: str) -> None:
         """
         Loads source code from file, parses it, and builds CFGs for all
@@ -907,10 +1462,18 @@ class CFGManager:
         #module_ast = ast.parse(self.source_code, filename=filename)
         self.module_ast = module_ast
 
+        self._cfgs = {}
+        self._scope_names = []
+        self._pending = {}
+        self.reused_scopes = []
+        self.rebuilt_scopes = []
+        # only the scopes of the current source are kept for the next reload
+        self._prev_scope_cache = self._scope_cache
+        self._scope_cache = {}
+
         # --- 4.1. Build CFG for the Global Scope ---
         #global_cfg_name = f"__global__({os.path.basename(filename)})" if filename else "__global__(in_memory)"
         global_cfg_name = '<global>'
-        global_cfg = CFG(name=global_cfg_name, source_code_lines=self.source_code_lines)
         
         global_statements: List[ast.stmt] = []
         
@@ -925,32 +1488,128 @@ class CFGManager:
                 self.col_offset = 0
                 self.type_ignores = []
 
-        global_cfg._build_graph_from_ast(_MockGlobalModule(global_statements))
-        self.cfgs[global_cfg_name] = global_cfg
+        self._add_scope(global_cfg_name, global_statements,
+            lambda cfg: cfg._build_graph_from_ast(_MockGlobalModule(global_statements)))
 
 
         # --- 4.2. Build CFGs for Functions and Methods ---
+        self._prebuilt = self._build_parallel(module_ast)
         for stmt in module_ast.body:
             if isinstance(stmt, (ast.FunctionDef, ast.AsyncFunctionDef)):
                 func_name = stmt.name
-                func_cfg = CFG(name=func_name, source_code_lines=self.source_code_lines)
-                func_cfg._build_graph_from_ast(stmt)
-                self.cfgs[func_name] = func_cfg
+                self._add_scope(func_name, [stmt],
+                    lambda cfg, node=stmt: cfg._build_graph_from_ast(node))
             elif isinstance(stmt, ast.ClassDef):
                 for class_stmt in stmt.body:
                     if isinstance(class_stmt, (ast.FunctionDef, ast.AsyncFunctionDef)):
                         method_name = f"{stmt.name}.{class_stmt.name}"
-                        method_cfg = CFG(name=method_name, source_code_lines=self.source_code_lines)
-                        method_cfg._build_graph_from_ast(class_stmt)
-                        self.cfgs[method_name] = method_cfg
+                        self._add_scope(method_name, [class_stmt],
+                            lambda cfg, node=class_stmt: cfg._build_graph_from_ast(node))
+
+    def _add_scope(self, name: str, stmts: List[ast.stmt], build) -> None:
+        # a repeated name (e.g. a redefined function) keeps its first place and the last definition
+        if name not in self._pending and name not in self._cfgs:
+            self._scope_names.append(name)
+        if self.contract_placeholders:
+            build = lambda cfg, build=build: (build(cfg), cfg.contract_placeholders())
+        if self.lazy:
+            self._cfgs.pop(name, None)
+            self._pending[name] = (stmts, build)
+        elif stmts and id(stmts[0]) in self._prebuilt:
+            self._cfgs[name] = CFG.from_compact(self._prebuilt.pop(id(stmts[0])), self.source_code_lines, stmts[0])
+            if self.contract_placeholders:
+                self._cfgs[name].contract_placeholders()
+        else:
+            self._cfgs[name] = self._build_scope(name, stmts, build)
+
+    def _build_parallel(self, module_ast) -> Dict[int, bytes]:
+        """Builds the function/method CFGs in a process pool when configured and worth it; {} otherwise."""
+        if not self.workers or self.workers < 2 or self.lazy or self.incremental:
+            return {}
+        scopes = list(_def_scopes(module_ast))
+        total_lines = sum(stmt.end_lineno - _stmt_first_line(stmt) + 1 for stmt, _, _ in scopes)
+        if total_lines < self.parallel_min_lines:
+            return {}
+
+        # split on '\n' only: splitlines() also breaks at form feeds etc., which would move lines
+        lines = self.source_code.split("\n")
+        tasks = []
+        for stmt, name, is_method in scopes:
+            first_line = _stmt_first_line(stmt)
+            text = "\n".join(lines[first_line - 1:stmt.end_lineno]) + "\n"
+            tasks.append((name, first_line, is_method, text))
+        # contiguous chunks of about equal line counts
+        n_chunks = min(len(tasks), self.workers * PARALLEL_CHUNKS_PER_WORKER)
+        chunks: List[List[Tuple[str, int, bool, str]]] = [[] for _ in range(n_chunks)]
+        done_lines = 0
+        for task in tasks:
+            chunks[min(n_chunks - 1, done_lines * n_chunks // total_lines)].append(task)
+            done_lines += task[3].count("\n")
+
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            cfgs = [cfg for chunk_cfgs in pool.map(_build_scope_chunk, [c for c in chunks if c])
+                    for cfg in chunk_cfgs]
+        return {id(stmt): cfg for (stmt, _, _), cfg in zip(scopes, cfgs)}
+
+    def to_compact(self) -> bytes:
+        """All CFGs (built now if needed) as compact bytes; see CFG.to_compact and from_compact."""
+        return marshal.dumps((COMPACT_VERSION, tuple(
+            (name, cfg._to_compact_tuple()) for name, cfg in self.get_all_cfgs().items())))
+
+    @classmethod
+    def from_compact(cls, data: bytes, source_code: Optional[str] = None, module_ast=None) -> 'CFGManager':
+        """
+        A manager holding the CFGs saved by to_compact. With the module's source the nodes get their
+        source lines; with its tree (of the same source) the CFGs' AST references are bound to it.
+        """
+        version, scopes = marshal.loads(data)
+        if version != COMPACT_VERSION:
+            raise ValueError(f"unsupported compact CFG version {version!r}")
+        mgr = cls()
+        if source_code is not None:
+            mgr.source_code = source_code
+            mgr.source_code_lines = source_code.splitlines()
+        scope_stmts: Dict[str, ast.AST] = {}
+        if module_ast is not None:
+            mgr.module_ast = module_ast
+            scope_stmts['<global>'] = ast.Module(
+                body=[stmt for stmt in module_ast.body
+                      if not isinstance(stmt, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef))],
+                type_ignores=[])
+            for stmt, name, _ in _def_scopes(module_ast):
+                scope_stmts[name] = stmt  # a repeated name: the last definition, as in load_from_ast
+        for name, cfg_data in scopes:
+            mgr._scope_names.append(name)
+            mgr._cfgs[name] = CFG._from_compact_tuple(cfg_data, mgr.source_code_lines, scope_stmts.get(name))
+        return mgr
+
+    def scope_names(self) -> List[str]:
+        """Names of all scopes of the loaded source, in source order, without building any CFG."""
+        return list(self._scope_names)
+
+    def get_cfg(self, name: str) -> Optional[CFG]:
+        """The CFG of the named scope (built now if it was not yet), or None for an unknown name."""
+        cfg = self._cfgs.get(name)
+        if cfg is None and name in self._pending:
+            stmts, build = self._pending.pop(name)
+            cfg = self._cfgs[name] = self._build_scope(name, stmts, build)
+        return cfg
+
+    @property
+    def cfgs(self) -> Dict[str, CFG]:
+        return self.get_all_cfgs()
 
     def to_dict(self) -> Dict[str, Any]:
         """Serializes the manager's state, including all contained CFGs."""
-        return {name: cfg.to_dict() for name, cfg in self.cfgs.items()}
+        return {name: cfg.to_dict() for name, cfg in self.get_all_cfgs().items()}
 
     def get_all_cfgs(self) -> Dict[str, CFG]:
-        """Returns all built CFG objects."""
-        return self.cfgs
+        """Returns all CFG objects, building any not built yet, in source order."""
+        if self._pending:
+            for name in list(self._pending):
+                self.get_cfg(name)
+            self._cfgs = {name: self._cfgs[name] for name in self._scope_names}
+        return self._cfgs
 
 
 # --- 5. Example Test Code for if __name__ == '__main__': (Updated) ---
@@ -1091,14 +1750,13 @@ final_result = my_function(z)
             print(f"  Entry Node ID: {cfg_obj.entry_node_id}")
             print(f"  Exit Node ID: {cfg_obj.exit_node_id}")
             print(f"  Total Nodes: {len(cfg_obj._nodes_by_id)}")
-            print(f"  Total Arcs: {len(cfg_obj._graph.edges)}")
+            print(f"  Total Arcs: {cfg_obj.arc_count()}")
             print("  Nodes (ID, Type, Lines, Source Snippet):")
             for node_id, node in cfg_obj._nodes_by_id.items():
                 source_preview = (node.source_code.splitlines()[0][:50] + "..." if node.source_code and len(node.source_code) > 50 else node.source_code) if node.source_code else ""
                 print(f"    - {node.node_id}: {node.node_type} (L{node.start_line or '?'}-L{node.end_line or '?'}) - '{source_preview}'")
             print("  Arcs (Source -> Target, Type, Condition):")
-            for u, v, data in cfg_obj._graph.edges(data=True):
-                arc = data['data']
+            for arc in cfg_obj.arcs():
                 cond_str = f" (cond: '{arc.condition}')" if arc.condition else ""
                 print(f"    - {arc.source_id} -> {arc.target_id} [{arc.arc_type}]{cond_str}")
 
@@ -3,7 +3,7 @@
 import sys
 import os
 import json
-from typing import List, Dict, Any, Optional, Set
+from typing import List, Dict, Any, Optional, Set, Tuple
 
 # Import necessary classes from cx_cfg6.py
 from cx_cfg6 import CFG, CFGNode # Import CFGNode and CFGArc for type hints if needed
@@ -18,96 +18,260 @@ def _scope_type(scope_name):
         result= 'function'
     return result
 
-# --- Helper Function for Recursive Line Finding (Forward Traversal) ---
-def _get_first_executable_line_forward(start_node: CFGNode, cfg: CFG, visited: Set[int]) -> Optional[int]:
-    #print(f"DEBUG: _get_first_executable_line_forward called for Node ID: {start_node.node_id}, Type: {start_node.node_type}, Line: {start_node.start_line}")
+# --- First executable line (Forward Traversal) ---
+# For each node: the first executable line reached going forward from it, -1 for the exit node,
+# None if nothing is reachable. Successors are tried in order, depth first, and a node already on
+# the current path is a dead end.
 
-    if start_node.node_id in visited:
-        #print(f"DEBUG: Node {start_node.node_id} already visited. Returning None.")
-        return None
+EXECUTABLE_NODE_TYPES = ('normal', 'if_condition', 'loop_condition', 'try_entry', 'with_entry',
+                         'except_handler_entry', 'return', 'iterator_init')
 
-    visited.add(start_node.node_id)
+_OPEN = object()  # the search does not stop at this node
 
-    if start_node.node_id == cfg.exit_node_id:
-        #print(f"DEBUG: Node {start_node.node_id} is exit node. Returning -1.")
+
+def _own_line(node: CFGNode, cfg: CFG):
+    """The line the forward search stops at when it reaches node, or _OPEN to keep going."""
+    if node.node_id == cfg.exit_node_id:
         return -1
 
-    # Base Case 2: If it's an executable statement node with a valid line number.
-    condition_check = (start_node.node_type in ('normal', 'if_condition', 'loop_condition', 'try_entry', 'with_entry',
-                                 'except_handler_entry', 'return', 'iterator_init'))
-    line_valid_check = (start_node.start_line is not None and start_node.start_line != -1)
-    #print(f"DEBUG: Node {start_node.node_id}: Type check ({condition_check}), Line valid check ({line_valid_check})")
-
-    if condition_check and line_valid_check:
-        #print(f"DEBUG: Node {start_node.node_id}: Found direct executable line: {start_node.start_line}. Returning.")
-        return start_node.start_line
-
-    # Special Handling for 'loop_condition_for' nodes:
-    # ... (rest of the function remains the same, no new prints needed in this block for now)
-    if start_node.node_type == 'loop_condition_for' and (start_node.start_line is None or start_node.start_line == -1):
-        #print(f"DEBUG: Node {start_node.node_id}: Handling loop_condition_for with no line.")
-        for pred_id in cfg._graph.predecessors(start_node.node_id):
+    if node.node_type in EXECUTABLE_NODE_TYPES and node.start_line is not None and node.start_line != -1:
+        return node.start_line
+
+    # Special Handling for 'loop_condition_for' nodes without a line: use the iterator_init before it
+    if node.node_type == 'loop_condition_for' and (node.start_line is None or node.start_line == -1):
+        for pred_id in cfg.predecessor_ids(node.node_id):
             pred_node = cfg.get_node(pred_id)
             if pred_node and pred_node.node_type == 'iterator_init' and \
                pred_node.start_line is not None and pred_node.start_line != -1:
-                #print(f"DEBUG: Node {start_node.node_id}: Found iterator_init predecessor {pred_node.node_id} at line {pred_node.start_line}. Returning.")
                 return pred_node.start_line
 
-    # Recursive Step:
-    #print(f"DEBUG: Node {start_node.node_id}: Traversing successors...")
-    for succ_id in cfg._graph.successors(start_node.node_id):
-        succ_node = cfg.get_node(succ_id)
-        if succ_node:
-            line = _get_first_executable_line_forward(succ_node, cfg, visited.copy())
-            if line is not None:
-                #print(f"DEBUG: Node {start_node.node_id}: Successor {succ_node.node_id} returned line {line}. Propagating.")
-                return line
-    #print(f"DEBUG: Node {start_node.node_id}: No executable line found down this path. Returning None.")
-    return None
+    return _OPEN
+
+
+def _compute_first_executable_lines(cfg: CFG) -> Dict[int, Optional[int]]:
+    table: Dict[int, Optional[int]] = {}
+    nodes = cfg._nodes_by_id
+    for root_id, root in nodes.items():
+        if root_id in table:
+            continue
+        line = _own_line(root, cfg)
+        if line is not _OPEN:
+            table[root_id] = line
+            continue
 
+        # Iterative depth-first search; a frame is [node id, index of the next successor to try].
+        # Loop back arcs lead to loop conditions, which have a line, so the search normally never
+        # meets the current path again; if it does, that successor is a dead end.
+        on_path = {root_id}
+        stack = [[root_id, 0]]
+        while stack:
+            frame = stack[-1]
+            succ_ids = cfg.successor_ids(frame[0])
+            result = None
+            descended = False
+            while frame[1] < len(succ_ids):
+                succ_id = succ_ids[frame[1]]
+                frame[1] += 1
+                if succ_id in on_path:
+                    continue
+                if succ_id in table:
+                    result = table[succ_id]
+                else:
+                    result = _own_line(nodes[succ_id], cfg)
+                    if result is _OPEN:
+                        on_path.add(succ_id)
+                        stack.append([succ_id, 0])
+                        descended = True
+                        break
+                    table[succ_id] = result
+                if result is not None:
+                    break
+            if descended:
+                continue
 
-def _get_last_statement_lines_of_branch(node: CFGNode, cfg: CFG, visited: Optional[Set[int]] = None) -> List[int]:
-    """
-    Recursively finds the end_line of the last 'normal' or 'return' statement
-    that eventually leads to the given 'node' in a branch's flow.
-    Handles conceptual nodes like 'if_join' by looking at their predecessors.
-    Returns a list of all such lines found.
-    """
-    if visited is None:
-        visited = set()
-    # Prevent infinite recursion for cycles in graphs
-    if node.node_id in visited:
-        return [] 
+            # this frame is finished with result; a line found is also the answer of every open frame
+            # below it, while None sends the parent on to its next successor
+            table[frame[0]] = result
+            on_path.discard(frame[0])
+            stack.pop()
+            if result is not None:
+                for open_frame in stack:
+                    table[open_frame[0]] = result
+                stack.clear()
+    return table
 
-    visited.add(node.node_id)
 
-    lines: List[int] = []
+def first_executable_line(node: CFGNode, cfg: CFG) -> Optional[int]:
+    """The first executable line at or after node (-1 = exit, None = none); O(1) after the first call per CFG."""
+    return cfg.cached_table('first_executable_line', _compute_first_executable_lines).get(node.node_id)
 
-    # Case 1: Base case - a normal statement block or a return statement
+
+# --- Last statement lines (Backward Traversal) ---
+# For each node: the lines of the last statements of the branches that lead into it. Going backward,
+# a 'normal' node contributes its end_line and a 'return' node its start_line, and the walk stops
+# there; an 'if_condition' node stops the walk without contributing (it starts a branch, it does
+# not end one); any other node passes on whatever reaches its predecessors.
+# Answers are computed per query and kept: a table for every node would repeat the lines of each
+# nested branch at every enclosing join, quadratic in the nesting depth (e.g. long elif chains).
+
+def _own_lines(node: CFGNode) -> Optional[Tuple[int, ...]]:
+    """What node contributes when the walk reaches it, or None if it passes on its predecessors' lines."""
     if node.node_type == 'normal' and node.end_line is not None and node.end_line != -1:
-        lines.append(node.end_line)
-    elif node.node_type == 'return' and node.start_line is not None and node.start_line != -1:
-        lines.append(node.start_line)
-    # NEW Base Case / Stop Condition: If it's an if_condition node, do NOT trace further back.
-    # An if_condition node marks the *beginning* of a conditional path, not the end of a branch.
-    elif node.node_type == 'if_condition':
-        # print(f"DEBUG: _get_last_statement_lines_of_branch stopping at if_condition node {node.node_id} (line {node.start_line})")
-        return [] # Stop tracing here, do not include lines before the if_condition
-    # Case 2: Recursive case - for other conceptual nodes or those that need further tracing
-    else:
-        for pred_id in cfg._graph.predecessors(node.node_id):
-            pred_node = cfg.get_node(pred_id)
-            if pred_node:
-                lines.extend(_get_last_statement_lines_of_branch(pred_node, cfg, visited))
+        return (node.end_line,)
+    if node.node_type == 'return' and node.start_line is not None and node.start_line != -1:
+        return (node.start_line,)
+    if node.node_type == 'if_condition':
+        return ()
+    return None
+
+
+def _find_last_statement_lines(cfg: CFG, node_id: int, known: Dict[int, Tuple[int, ...]]) -> Tuple[int, ...]:
+    own = _own_lines(cfg._nodes_by_id[node_id])
+    if own is not None:
+        return own
+    # iterative backward walk through the passing nodes; an answer already known for a passing
+    # node covers everything behind it
+    lines: Set[int] = set()
+    seen = {node_id}
+    stack = list(cfg.predecessor_ids(node_id))
+    while stack:
+        pred_id = stack.pop()
+        if pred_id in seen:
+            continue
+        seen.add(pred_id)
+        own = known.get(pred_id)
+        if own is None:
+            own = _own_lines(cfg._nodes_by_id[pred_id])
+        if own is None:
+            stack.extend(cfg.predecessor_ids(pred_id))
+        else:
+            lines.update(own)
+    return tuple(sorted(lines))
+
+
+def last_statement_lines(node: CFGNode, cfg: CFG) -> List[int]:
+    """The end lines of the last statements leading into node, in line order; kept per CFG once asked."""
+    known = cfg.cached_table('last_statement_lines', lambda cfg: {})
+    lines = known.get(node.node_id)
+    if lines is None:
+        lines = known[node.node_id] = _find_last_statement_lines(cfg, node.node_id, known)
+    return list(lines)
+
+
+# --- Dominator and post-dominator trees, merge lines ---
+# Immediate dominators by the Cooper-Harvey-Kennedy iteration ("A Simple, Fast Dominance Algorithm"):
+# over reverse postorder, a node's dominator is the intersection of its processed predecessors'
+# dominator paths. The CFGs are reducible, so this settles in two or three passes, near linear.
+# Post-dominators are the same on the reversed graph, from the exit node. Nodes that cannot be
+# reached (or, for post-dominators, cannot reach the exit) have no entry in the tables.
+
+def _postorder(root_id: int, next_ids) -> List[int]:
+    order: List[int] = []
+    seen = {root_id}
+    stack = [(root_id, iter(next_ids(root_id)))]
+    while stack:
+        node_id, children = stack[-1]
+        for child_id in children:
+            if child_id not in seen:
+                seen.add(child_id)
+                stack.append((child_id, iter(next_ids(child_id))))
+                break
+        else:
+            stack.pop()
+            order.append(node_id)
+    return order
+
+
+def _immediate_dominators(root_id: int, next_ids, prev_ids) -> Dict[int, Optional[int]]:
+    order = _postorder(root_id, next_ids)
+    number = {node_id: i for i, node_id in enumerate(order)}
+    idom: Dict[int, int] = {root_id: root_id}
+
+    def intersect(a: int, b: int) -> int:
+        while a != b:
+            while number[a] < number[b]:
+                a = idom[a]
+            while number[b] < number[a]:
+                b = idom[b]
+        return a
+
+    changed = True
+    while changed:
+        changed = False
+        for node_id in reversed(order[:-1]):  # reverse postorder without the root
+            new_idom = None
+            for prev_id in prev_ids(node_id):
+                if prev_id in idom:
+                    new_idom = prev_id if new_idom is None else intersect(prev_id, new_idom)
+            if idom.get(node_id) != new_idom:
+                idom[node_id] = new_idom
+                changed = True
+    idom[root_id] = None
+    return idom
+
+
+def _compute_dominators(cfg: CFG) -> Dict[int, Optional[int]]:
+    if cfg.entry_node_id is None:
+        return {}
+    return _immediate_dominators(cfg.entry_node_id, cfg.successor_ids, cfg.predecessor_ids)
+
+
+def _compute_post_dominators(cfg: CFG) -> Dict[int, Optional[int]]:
+    if cfg.exit_node_id is None:
+        return {}
+    return _immediate_dominators(cfg.exit_node_id, cfg.predecessor_ids, cfg.successor_ids)
+
+
+def immediate_dominator(node: CFGNode, cfg: CFG) -> Optional[CFGNode]:
+    """The closest node every path from the entry to node passes through (None for the entry)."""
+    idom_id = cfg.cached_table('dominators', _compute_dominators).get(node.node_id)
+    return cfg.get_node(idom_id) if idom_id is not None else None
+
+
+def immediate_post_dominator(node: CFGNode, cfg: CFG) -> Optional[CFGNode]:
+    """The closest node every path from node to the exit passes through: where node's branches join."""
+    ipdom_id = cfg.cached_table('post_dominators', _compute_post_dominators).get(node.node_id)
+    return cfg.get_node(ipdom_id) if ipdom_id is not None else None
+
+
+# For each node: the line control reaches once the paths leaving it have merged, i.e. the node's
+# own line (see _own_line) or else that of the nearest post-dominator that has one, found by
+# climbing the post-dominator tree through placeholders (if_join, loop_exit, break, ...). A node
+# without a line that branches (entry, try_entry) is not a merge: like nodes that cannot reach
+# the exit, it takes first_executable_line, the first line down its first path.
+
+def _compute_merge_lines(cfg: CFG) -> Dict[int, Optional[int]]:
+    ipdom = cfg.cached_table('post_dominators', _compute_post_dominators)
+    nodes = cfg._nodes_by_id
+    table: Dict[int, Optional[int]] = {}
+    for node_id in nodes:
+        chain = []  # nodes passed on the way up the post-dominator tree; they share the answer
+        current = node_id
+        while current not in table:
+            line = _own_line(nodes[current], cfg)
+            if line is not _OPEN:
+                table[current] = line
+            elif ipdom.get(current) is None or len(cfg.successor_ids(current)) != 1:
+                table[current] = first_executable_line(nodes[current], cfg)
+            else:
+                chain.append(current)
+                current = ipdom[current]
+        for passed_id in chain:
+            table[passed_id] = table[current]
+    return table
+
+
+def merge_line(node: CFGNode, cfg: CFG) -> Optional[int]:
+    """The line executed once node's outgoing paths merge (-1 = exit, None = none); O(1) after the first call per CFG."""
+    return cfg.cached_table('merge_lines', _compute_merge_lines).get(node.node_id)
 
-    return list(set(lines)) # Return unique lines
 
 def print_cfg(cfg_obj, cfg_name=''):
     print(f"\n--- CFG: {cfg_name} ---")
     print(f"  Entry Node ID: {cfg_obj.entry_node_id}")
     print(f"  Exit Node ID: {cfg_obj.exit_node_id}")
     print(f"  Total Nodes: {len(cfg_obj._nodes_by_id)}")
-    print(f"  Total Arcs: {len(cfg_obj._graph.edges)}")
+    print(f"  Total Arcs: {cfg_obj.arc_count()}")
 
     print("  Nodes (ID, Type, Start Line, AST Node Types, Source Snippet):")
     for node_id, node in cfg_obj._nodes_by_id.items():
@@ -117,8 +281,8 @@ def print_cfg(cfg_obj, cfg_name=''):
         print(f"    - {node.node_id}: Type={node.node_type}, Line={node.start_line}, AST={ast_node_types}, Source='{source_preview}'")
 
     print("  Arcs (Source ID -> Target ID, Type, Condition):")
-    for u, v, data in cfg_obj._graph.edges(data=True):
-        arc = data['data']
+    for arc in cfg_obj.arcs():
+        u, v = arc.source_id, arc.target_id
         cond_str = f" (cond: '{arc.condition}')" if arc.condition else ""
         print(f"    - {u} -> {v}, Type={arc.arc_type}", end='')
         if cond_str != '':
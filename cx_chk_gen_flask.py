@@ -6,7 +6,8 @@ import os
 
 from flask import Flask, request, Response, jsonify, send_file, send_from_directory
 from cx_chk_all import cx_chk_all
-from cx_gen_src2html import cx_gen_src2html
+from cx_gen_src2html import cx_gen_src2html_with_stats
+from cx_cache import get_default_cache
 
 app = Flask(__name__)
 
@@ -21,6 +22,12 @@ def setup_logging():
 
 logger = setup_logging()
 
+def log_and_attach_stats(response, stats):
+    # one JSON line per request, plus a Server-Timing header the browser devtools can show
+    app.logger.info('cx_gen_src2html stats: %s', stats.to_json())
+    response.headers['Server-Timing'] = stats.server_timing()
+    return response
+
 @app.route("/")
 def serve_test_page():
     app.logger.info('Entering serve_test_page()')
@@ -67,8 +74,8 @@ def generate_html():
         return jsonify({"error": "No code submitted."}), 400
 
     try:
-        html = cx_gen_src2html(source_code)
-        return jsonify({"html": html})
+        html, stats = cx_gen_src2html_with_stats(source_code, cache=get_default_cache())
+        return log_and_attach_stats(jsonify({"html": html}), stats)
     except Exception as e:
         app.logger.exception('generate_html(): Exception')
         return jsonify({"error": f"HTML generation failed: {str(e)}"}), 500
@@ -78,8 +85,8 @@ def render_visualizer():
     app.logger.info('Entering render_visualizer()')
     source = request.form.get("code", "")
     try:
-        html = cx_gen_src2html(source)
-        return Response(html, mimetype='text/html')
+        html, stats = cx_gen_src2html_with_stats(source, cache=get_default_cache())
+        return log_and_attach_stats(Response(html, mimetype='text/html'), stats)
     except Exception as e:
         app.logger.exception('render_visualizer(): Exception')
         return f"Error: {str(e)}", 400
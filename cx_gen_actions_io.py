@@ -8,99 +8,100 @@ from cx_utils import (
     derive_filename,
     parse_ast
 )
-
-def build_stmt_line_map(statements):
-    line_to_stmt = {}
-    for stmt in statements:
-        start = stmt['start']['line']
-        if stmt.get('is_compound'):
-            end = stmt['end_header']['line']
-        else:
-            end = stmt['end']['line']
-        for line in range(start, end + 1):
-            line_to_stmt[line] = start  # using start.line as stmt ID
-    return line_to_stmt
+from cx_ast_walk import AstCollector, walk_ast
+from cx_token_store import tokens_from_dicts
+from cx_stmt_index import get_stmt_index
+from cx_scope_model import build_scope_model
 
 def build_io_lookup(tokens):
     io_positions = {}
     for tok in tokens:
-        if tok.get('type') == 'NAME' and tok.get('type_name') == 'function_call':
-            key = (tok['start']['line'], tok['start']['col'])
-            io_positions[key] = tok['text']
+        if tok.type == 'NAME' and tok.type_name == 'function_call':
+            io_positions[(tok.line, tok.col)] = tok.text
     return io_positions
 
-class IOActionExtractor(ast.NodeVisitor):
-    def __init__(self, stmt_map, io_lookup):
-        self.stmt_map = stmt_map
-        self.io_lookup = io_lookup
-        self.scope_stack = ['global']
-        self.results = defaultdict(list)
-        self.count = 0
-
-    def current_scope(self):
-        if len(self.scope_stack) == 1:
-            return "<global>"
-        return ".".join(self.scope_stack[1:])
-    
-    def visit_FunctionDef(self, node):
-        self.scope_stack.append(node.name)
-        self.generic_visit(node)
-        self.scope_stack.pop()
-
-    def visit_AsyncFunctionDef(self, node):
-        self.scope_stack.append(node.name)
-        self.generic_visit(node)
-        self.scope_stack.pop()
-
-    def visit_ClassDef(self, node):
-        self.scope_stack.append(node.name)
-        self.generic_visit(node)
-        self.scope_stack.pop()
-
-    def visit_Call(self, node):
-        stmt = self.stmt_map.get(node.lineno)
-        if stmt is None:
-            return
-
-        func_name = None
+class IOActionExtractor(AstCollector):
+    """
+    Records each call during the shared AST walk (with its scope and its nearest enclosing
+    call). resolve() replays them once the statement map and the classified tokens are known:
+    a call that is not confirmed is skipped together with all the calls nested inside it.
+    """
+    def __init__(self):
+        self.calls = []        # (scope, lineno, func_name, func_key, parent call index)
+        self._call_stack = []  # indexes of the calls currently being walked
+
+    def visit_Call(self, node, walker):
+        func_name, func_key = None, None
         if isinstance(node.func, ast.Name):
             func_name = node.func.id
-            key = (node.func.lineno, node.func.col_offset)
-            if key not in self.io_lookup or self.io_lookup[key] != func_name:
-                return  # not an I/O call, or unconfirmed
-
-        if func_name == 'print':
-            self.results[self.current_scope()].append({
-                "item": "-display",
-                "stmt": stmt,
-                "action": "output",
-                "channel": "stdout"
-            })
-            self.count += 1
-        elif func_name == 'input':
-            self.results[self.current_scope()].append({
-                "item": "-display",
-                "stmt": stmt,
-                "action": "output",
-                "channel": "stdout"
-            })
-            self.results[self.current_scope()].append({
-                "item": "-keyboard",
-                "stmt": stmt,
-                "action": "input",
-                "channel": "stdin"
-            })
-            self.count += 2
-
-        self.generic_visit(node)
-
-def cx_gen_actions_io(tree, tokens, stmts):
-    stmt_map = build_stmt_line_map(stmts)
+            func_key = (node.func.lineno, node.func.col_offset)
+        parent = self._call_stack[-1] if self._call_stack else None
+        self._call_stack.append(len(self.calls))
+        self.calls.append((walker.scope_name(), node.lineno, func_name, func_key, parent))
+
+    def leave_Call(self, node, walker):
+        self._call_stack.pop()
+
+    # scope_model: optional ScopeModel of the source; a print/input the program binds itself
+    # (a def, an import, a parameter) is not the builtin and is skipped
+    # Leaves the collector as it is, so it can resolve again (the count is the total of the lists)
+    def resolve(self, stmt_map, io_lookup, scope_model=None):
+        results = defaultdict(list)
+        visited = []  # per call: were its nested calls visited?
+        for scope, lineno, func_name, func_key, parent in self.calls:
+            if parent is not None and not visited[parent]:
+                visited.append(False)
+                continue
+            visited.append(False)
+
+            stmt = stmt_map.get(lineno)
+            if stmt is None:
+                continue
+
+            if func_key is not None:
+                if func_key not in io_lookup or io_lookup[func_key] != func_name:
+                    continue  # not an I/O call, or unconfirmed
+                if scope_model is not None and func_name in ('print', 'input') \
+                        and scope_model.resolve(scope, func_name) is not None \
+                        and not scope_model.is_builtin(scope, func_name):
+                    continue  # shadowed
+
+            if func_name == 'print':
+                results[scope].append({
+                    "item": "-display",
+                    "stmt": stmt,
+                    "action": "output",
+                    "channel": "stdout"
+                })
+            elif func_name == 'input':
+                results[scope].append({
+                    "item": "-display",
+                    "stmt": stmt,
+                    "action": "output",
+                    "channel": "stdout"
+                })
+                results[scope].append({
+                    "item": "-keyboard",
+                    "stmt": stmt,
+                    "action": "input",
+                    "channel": "stdin"
+                })
+
+            visited[-1] = True
+
+        return results
+
+# collector: optional IOActionExtractor already driven by a shared walk_ast() pass
+# stmt_index: optional StatementIndex over stmts, shared with the other generators
+# scope_model: optional ScopeModel (cx_scope_model.py) of the source, built once per request
+def cx_gen_actions_io(tree, tokens, stmts, collector=None, stmt_index=None, scope_model=None):
+    stmt_map = get_stmt_index(stmts, stmt_index).header
     io_lookup = build_io_lookup(tokens)
-    extractor = IOActionExtractor(stmt_map, io_lookup)
-    extractor.visit(tree)
+    if collector is None:
+        collector = IOActionExtractor()
+        walk_ast(tree, collector)
 
-    return extractor.results
+    return collector.resolve(stmt_map, io_lookup, scope_model)
 
 if __name__ == '__main__':
     if len(sys.argv) != 2:
@@ -109,12 +110,12 @@ if __name__ == '__main__':
 
     filename = sys.argv[1]
     source_code = read_source_file(filename)
-    tokens = load_json_file(derive_filename(filename, 'tokens'))
+    tokens = tokens_from_dicts(load_json_file(derive_filename(filename, 'tokens')))
     stmts = load_json_file(derive_filename(filename, 'stmts'))
 
     tree = parse_ast(source_code) # get ast tree from source
     
-    io_actions = cx_gen_actions_io(tree, tokens, stmts) # generate io actions
+    io_actions = cx_gen_actions_io(tree, tokens, stmts, scope_model=build_scope_model(source_code, filename)) # generate io actions
 
     output_path = derive_filename(filename, 'actions_io')
     write_json_file(io_actions, output_path)
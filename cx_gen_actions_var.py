@@ -2,129 +2,111 @@ import sys
 import ast
 from collections import defaultdict
 from cx_utils import load_json_file, write_json_file, read_source_file, derive_filename, parse_ast
-
-def build_stmt_line_map(statements):
-    line_to_stmt = {}
-    for stmt in statements:
-        start = stmt['start']['line']
-        if stmt.get('is_compound'):
-            end = stmt['end_header']['line']
-        else:
-            end = stmt['end']['line']
-        for line in range(start, end + 1):
-            line_to_stmt[line] = start  # using start.line as stmt ID
-    return line_to_stmt
+from cx_ast_walk import AstCollector, walk_ast
+from cx_token_store import tokens_from_dicts
+from cx_stmt_index import get_stmt_index
+from cx_scope_model import build_scope_model
 
 def build_variable_lookup(tokens):
     var_positions = set()
     for tok in tokens:
-        if tok.get('type_name') == 'variable':
-            var_positions.add((tok['start']['line'], tok['start']['col'], tok['text']))
+        if tok.type_name == 'variable':
+            var_positions.add((tok.line, tok.col, tok.text))
     return var_positions
 
-class VarActionExtractor(ast.NodeVisitor):
-    def __init__(self, stmt_map, var_positions):
-        self.stmt_map = stmt_map
-        self.var_positions = var_positions
-        self.scope_stack = ['global']
-        self.results = defaultdict(lambda: defaultdict(set))  # scope -> (var, stmt) -> set(actions)
-        self.scope_vars = defaultdict(set)  # scope -> set of variable names
-        self.global_declared_vars = defaultdict(set)
-
-    def current_scope(self):
-        if len(self.scope_stack) == 1:
-            return "<global>"
-        return '.'.join(self.scope_stack[1:])
-
-    def visit_ClassDef(self, node):
-        self.scope_stack.append(node.name)
-        self.generic_visit(node)
-        self.scope_stack.pop()
-
-    def visit_FunctionDef(self, node):
-        self.scope_stack.append(node.name)
-        self._register_function_params(node)
-        self.generic_visit(node)
-        self.scope_stack.pop()
-
-    def visit_AsyncFunctionDef(self, node):
-        self.scope_stack.append(node.name)
-        self._register_function_params(node)
-        self.generic_visit(node)
-        self.scope_stack.pop()
-
-    def _register_function_params(self, node):
-        stmt = node.lineno
-        scope = self.current_scope()
+class VarActionExtractor(AstCollector):
+    """
+    Records the variable-related events (parameters, names, global declarations) during
+    the shared AST walk. The statement map and the classified tokens are only known after
+    that walk, so resolve() replays the events in tree order to build the results.
+    """
+    def __init__(self):
+        self.events = []
+
+    def visit_FunctionDef(self, node, walker):
+        self.events.append(('params', walker.scope_name(), node.lineno, self._function_param_names(node)))
+
+    def visit_AsyncFunctionDef(self, node, walker):
+        self.visit_FunctionDef(node, walker)
 
+    @staticmethod
+    def _function_param_names(node):
         args = node.args
         param_names = [arg.arg for arg in args.args + args.kwonlyargs]
         if args.vararg:
             param_names.append(args.vararg.arg)
         if args.kwarg:
             param_names.append(args.kwarg.arg)
+        return param_names
 
-        self.scope_vars[scope].update(param_names)
-        for param in param_names:
-            self.results[scope][(param, stmt)].add("set")
-
-    def visit_Name(self, node):
-        pos = (node.lineno, node.col_offset, node.id)
-        if pos not in self.var_positions:
-            return
-        stmt = self.stmt_map.get(node.lineno)
-        if stmt is None:
-            return
-
-        varname = node.id
+    def visit_Name(self, node, walker):
         action = 'get' if isinstance(node.ctx, ast.Load) else 'set' if isinstance(node.ctx, ast.Store) else None
-        if not action:
-            return
-
-        scope = self.current_scope()
-
-        ''' replace w/ code below, to handle global declared vars
-        # Check if variable is declared in current scope
-        if action == 'get' and varname not in self.scope_vars[scope]:
-            # Read from outer scope (assumed <global> here)
-            target_scope = "<global>"
-        else:
-            # Write or local read
-            target_scope = scope
-            self.scope_vars[scope].add(varname)
-        '''
-
-        # Check if variable is declared global in current scope
-        if varname in self.global_declared_vars.get(scope, set()):
-            target_scope = "<global>"
-        elif action == 'get' and varname not in self.scope_vars[scope]:
-            # Read from outer scope (assumed <global>)
-            target_scope = "<global>"
-        else:
-            target_scope = scope
-            self.scope_vars[scope].add(varname)
-
-        self.results[target_scope][(varname, stmt)].add(action)
-
-    def visit_Global(self, node):
-        stmt = node.lineno
-        scope = self.current_scope()
-        #print('visit_Global', stmt, scope)
-        for name in node.names:
-            self.global_declared_vars[scope].add(name)
-            self.results['<global>'][(name, stmt)].add("declare")
-            #print(self.results)
-
-
-def cx_gen_actions_var(tree, tokens, stmts):
-    stmt_map = build_stmt_line_map(stmts)
+        if action:
+            self.events.append(('name', walker.scope_name(), node.lineno, node.col_offset, node.id, action))
+
+    def visit_Global(self, node, walker):
+        self.events.append(('global', walker.scope_name(), node.lineno, node.names))
+
+    # scope_model: optional ScopeModel of the source; names it resolves go to the scope that
+    # binds them (closures and nonlocals included), the others follow the rules below
+    def resolve(self, stmt_map, var_positions, scope_model=None):
+        results = defaultdict(lambda: defaultdict(set))  # scope -> (var, stmt) -> set(actions)
+        scope_vars = defaultdict(set)  # scope -> set of variable names
+        global_declared_vars = defaultdict(set)
+
+        for event in self.events:
+            kind, scope = event[0], event[1]
+            if kind == 'params':
+                _, _, stmt, param_names = event
+                scope_vars[scope].update(param_names)
+                for param in param_names:
+                    results[scope][(param, stmt)].add("set")
+
+            elif kind == 'name':
+                _, _, lineno, col, varname, action = event
+                if (lineno, col, varname) not in var_positions:
+                    continue
+                stmt = stmt_map.get(lineno)
+                if stmt is None:
+                    continue
+
+                target_scope = scope_model.resolve(scope, varname) if scope_model is not None else None
+                if target_scope is None:
+                    # Check if variable is declared global in current scope
+                    if varname in global_declared_vars.get(scope, set()):
+                        target_scope = "<global>"
+                    elif action == 'get' and varname not in scope_vars[scope]:
+                        # Read from outer scope (assumed <global>)
+                        target_scope = "<global>"
+                    else:
+                        target_scope = scope
+                        scope_vars[scope].add(varname)
+
+                results[target_scope][(varname, stmt)].add(action)
+
+            elif kind == 'global':
+                _, _, stmt, names = event
+                for name in names:
+                    global_declared_vars[scope].add(name)
+                    results['<global>'][(name, stmt)].add("declare")
+
+        return results
+
+
+# collector: optional VarActionExtractor already driven by a shared walk_ast() pass
+# stmt_index: optional StatementIndex over stmts, shared with the other generators
+# scope_model: optional ScopeModel (cx_scope_model.py) of the source, built once per request
+def cx_gen_actions_var(tree, tokens, stmts, collector=None, stmt_index=None, scope_model=None):
+    stmt_map = get_stmt_index(stmts, stmt_index).header
     var_positions = build_variable_lookup(tokens)
-    extractor = VarActionExtractor(stmt_map, var_positions)
-    extractor.visit(tree)
+    if collector is None:
+        collector = VarActionExtractor()
+        walk_ast(tree, collector)
+    results = collector.resolve(stmt_map, var_positions, scope_model)
 
     final = defaultdict(list)
     count = 0
-    for scope, var_stmt_map in extractor.results.items():
+    for scope, var_stmt_map in results.items():
         for (var, stmt), actions in var_stmt_map.items():
             if 'get' in actions and 'set' in actions:
                 action = 'getset'
@@ -146,11 +128,11 @@ if __name__ == '__main__':
 
     filename = sys.argv[1]
     source_code = read_source_file(filename)
-    tokens = load_json_file(derive_filename(filename, 'tokens'))
+    tokens = tokens_from_dicts(load_json_file(derive_filename(filename, 'tokens')))
     stmts = load_json_file(derive_filename(filename, 'stmts'))
 
     tree = parse_ast(source_code)
-    var_actions = cx_gen_actions_var(tree, tokens, stmts)
+    var_actions = cx_gen_actions_var(tree, tokens, stmts, scope_model=build_scope_model(source_code, filename))
 
     output_path = derive_filename(filename, 'actions_var')
     write_json_file(var_actions, output_path)
@@ -17,7 +17,7 @@ except ImportError:
 
 # Import helper functions from cx_cfg6_utils.py
 try:
-    from cx_cfg6_utils import _get_first_executable_line_forward, _scope_type, print_cfgs
+    from cx_cfg6_utils import first_executable_line, _scope_type, print_cfgs
 except ImportError:
     print("Error: Could not import helper functions from cx_cfg6_utils.py.", file=sys.stderr)
     print("Please ensure cx_cfg6_utils.py is in the same directory or your PYTHONPATH is configured.", file=sys.stderr)
@@ -45,41 +45,40 @@ def get_break_info(cfg: CFG) -> List[Dict[str, Any]]:
     results = []
     display_scope_name = cfg.name
 
-    for node_id, node in cfg._nodes_by_id.items():
-        if node.node_type == 'break':
-            stmt_from = node.end_line  # or node.start_line, depending on preference for single-line statements
-
-            # A break node should have exactly one successor, which represents the jump target
-            successors = cfg.get_successors(node_id)
-            if not successors:
-                # This shouldn't happen for a valid break, but handle defensively
-                continue
-
-            # The successor of a 'break' node is typically a 'loop_exit' or 'loop_exit_for'
-            # conceptual node, which then points to the actual code after the loop.
-            succ_node_from_break = successors[0]
-
-            # Use the helper function to find the first executable line reachable from the successor
-            # Pass an empty set for 'visited' as we start a new traversal from this point
-            resolved_to_line = _get_first_executable_line_forward(succ_node_from_break, cfg, set())
-
-            stmt_to = -1 # Default to -1 (scope exit)
-
-            if resolved_to_line is not None:
-                stmt_to = resolved_to_line
-
-            # Ensure we correctly interpret -1 as exit, and actual line numbers
-            # If resolved_to_line indicates the CFG's exit node, ensure stmt_to is -1
-            if resolved_to_line == cfg.exit_node_id:
-                 stmt_to = -1
-
-            results.append({
-                'stmt_from': stmt_from,
-                'stmt_to': stmt_to,
-                'type': 'break',
-                'scope': display_scope_name,
-                'scope_type': _scope_type(display_scope_name)
-            })
+    for node in cfg.nodes_of_type('break'):
+        node_id = node.node_id
+        stmt_from = node.end_line  # or node.start_line, depending on preference for single-line statements
+
+        # A break node should have exactly one successor, which represents the jump target
+        successors = cfg.get_successors(node_id)
+        if not successors:
+            # This shouldn't happen for a valid break, but handle defensively
+            continue
+
+        # The successor of a 'break' node is typically a 'loop_exit' or 'loop_exit_for'
+        # conceptual node, which then points to the actual code after the loop.
+        succ_node_from_break = successors[0]
+
+        # Use the helper function to find the first executable line reachable from the successor
+        resolved_to_line = first_executable_line(succ_node_from_break, cfg)
+
+        stmt_to = -1 # Default to -1 (scope exit)
+
+        if resolved_to_line is not None:
+            stmt_to = resolved_to_line
+
+        # Ensure we correctly interpret -1 as exit, and actual line numbers
+        # If resolved_to_line indicates the CFG's exit node, ensure stmt_to is -1
+        if resolved_to_line == cfg.exit_node_id:
+             stmt_to = -1
+
+        results.append({
+            'stmt_from': stmt_from,
+            'stmt_to': stmt_to,
+            'type': 'break',
+            'scope': display_scope_name,
+            'scope_type': _scope_type(display_scope_name)
+        })
     return results
 
 # --- Aggregation Function for Multiple CFGs (if scope is '*') ---
@@ -91,7 +90,7 @@ def cx_gen_flows_break(manager: CFGManager) -> List[Dict[str, Any]]:
     for cfg_name, cfg in manager.get_all_cfgs().items():
         # You can add a debug print here if you decide to pass debug_mode to this function
         # Or just rely on the main block's prints for all scopes
-        results = get_break_info(cfg)
+        results = cfg.cached_flows('break', get_break_info)
         all_break_results.extend(results)
     return all_break_results
 
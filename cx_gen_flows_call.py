@@ -7,6 +7,78 @@ from cx_utils import (
     derive_output_filename,
     write_json_file,
 )
+from cx_stmt_index import get_stmt_index
+from cx_ast_walk import AstCollector, walk_ast
+
+
+class CallFlowCollector(AstCollector):
+    """
+    Collects function/class definitions and call sites during the shared AST walk.
+    Definitions are reported in ast.walk() (breadth-first) order, as before, since
+    the first matching definition wins in map_calls_to_defs().
+    """
+    def __init__(self):
+        self._defs = []   # (depth, seq, kind, name, info)
+        self.calls = []   # (call_line, call_name, call_type, self_class)
+
+    def visit_FunctionDef(self, node, walker):
+        parent = walker.parent()
+        if isinstance(parent, ast.ClassDef):
+            qualified_name = f"{parent.name}.{node.name}"
+            kind = "constructor" if node.name == "__init__" else "method"
+            info = {"line": node.lineno, "type": kind, "class": parent.name}
+            self._defs.append((walker.depth, walker.seq, "func", qualified_name, info))
+        else:
+            info = {"line": node.lineno, "type": "function"}
+            self._defs.append((walker.depth, walker.seq, "func", node.name, info))
+
+    def visit_ClassDef(self, node, walker):
+        has_init = any(
+            isinstance(child, ast.FunctionDef) and child.name == "__init__"
+            for child in node.body
+        )
+        info = {"line": node.lineno, "has_init": has_init}
+        self._defs.append((walker.depth, walker.seq, "class", node.name, info))
+
+    def visit_Call(self, node, walker):
+        name, call_type = self.get_call_target(node.func)
+        if name:
+            self_class = None
+            if isinstance(node.func, ast.Attribute) and isinstance(node.func.value, ast.Name) \
+                    and node.func.value.id == "self":
+                self_class = self.enclosing_class(walker.scope_stack)
+            self.calls.append((node.lineno, name, call_type, self_class))
+
+    @staticmethod
+    def enclosing_class(scope_stack):
+        """Name of the class whose method (or a function nested in it) is being walked, else None."""
+        for i in range(len(scope_stack) - 1, 0, -1):
+            if isinstance(scope_stack[i - 1], ast.ClassDef) and \
+                    isinstance(scope_stack[i], (ast.FunctionDef, ast.AsyncFunctionDef)):
+                return scope_stack[i - 1].name
+        return None
+
+    @staticmethod
+    def get_call_target(node):
+        if isinstance(node, ast.Name):
+            return node.id, "function"
+        elif isinstance(node, ast.Attribute):
+            return node.attr, "method"
+        return None, None
+
+    def defs(self):
+        """Return:
+        - func_defs: { name: { line, type, class (opt) } }
+        - class_defs: { class_name: { line, has_init: bool } }
+        """
+        func_defs = {}
+        class_defs = {}
+        for _depth, _seq, kind, name, info in sorted(self._defs, key=lambda d: (d[0], d[1])):
+            if kind == "func":
+                func_defs[name] = info
+            else:
+                class_defs[name] = info
+        return func_defs, class_defs
 
 
 def extract_function_and_class_defs(tree):
@@ -14,67 +86,49 @@ def extract_function_and_class_defs(tree):
     - func_defs: { name: { line, type, class (opt) } }
     - class_defs: { class_name: { line, has_init: bool } }
     """
-    func_defs = {}
-    class_defs = {}
-
-    for node in ast.walk(tree):
-        if isinstance(node, ast.FunctionDef):
-            parent = getattr(node, 'parent', None)
-            if isinstance(parent, ast.ClassDef):
-                qualified_name = f"{parent.name}.{node.name}"
-                #print('*** DEBUG: qualified_name:', qualified_name)
-                kind = "constructor" if node.name == "__init__" else "method"
-                #func_defs[node.name] = {"line": node.lineno, "type": kind, "class": parent.name}
-                func_defs[qualified_name] = {"line": node.lineno, "type": kind, "class": parent.name}
-            else:
-                func_defs[node.name] = {"line": node.lineno, "type": "function"}
-
-        elif isinstance(node, ast.ClassDef):
-            has_init = any(
-                isinstance(child, ast.FunctionDef) and child.name == "__init__"
-                for child in node.body
-            )
-            class_defs[node.name] = {"line": node.lineno, "has_init": has_init}
-
-    return func_defs, class_defs
+    collector = CallFlowCollector()
+    walk_ast(tree, collector)
+    return collector.defs()
 
 
 def extract_calls(tree):
-    """Return a list of (call_line, call_name, call_type)"""
-    calls = []
-
-    class CallVisitor(ast.NodeVisitor):
-        def visit_Call(self, node):
-            name, call_type = self.get_call_target(node.func)
-            if name:
-                calls.append((node.lineno, name, call_type))
-            self.generic_visit(node)
+    """Return a list of (call_line, call_name, call_type, self_class);
+    self_class is the enclosing class for self.<name>() calls in its methods, else None."""
+    collector = CallFlowCollector()
+    walk_ast(tree, collector)
+    return collector.calls
 
-        def get_call_target(self, node):
-            if isinstance(node, ast.Name):
-                return node.id, "function"
-            elif isinstance(node, ast.Attribute):
-                return node.attr, "method"
-            return None, None
 
-    CallVisitor().visit(tree)
-    return calls
+def build_def_index(func_defs):
+    """Return:
+    - by_name: { short name: [qualified names ending in it, in func_defs order] }
+    - constructors: { class_name: qualified name of its __init__ (the first, in func_defs order) }
+    """
+    by_name = {}
+    constructors = {}
+    for func_name, fd in func_defs.items():
+        by_name.setdefault(func_name.rpartition(".")[2], []).append(func_name)
+        if fd["type"] == "constructor":
+            constructors.setdefault(fd.get("class"), func_name)
+    return by_name, constructors
 
 
 def map_calls_to_defs(calls, func_defs, class_defs, stmt_lines):
+    by_name, constructors = build_def_index(func_defs)
     flows = []
-    for call_line, name, call_type in calls:
+    for call_line, name, call_type, self_class in calls:
         stmt_from = stmt_lines.get(call_line)
         stmt_to = None
         actual_type = call_type
         target_name = None
 
-        # Try to match function or method
+        # Try to match function or method: self.<name>() in a method prefers the method's own
+        # class; otherwise the first definition with that name wins
         matched_name = None
-        for func_name in func_defs:
-            if func_name == name or func_name.endswith(f".{name}"):
-                matched_name = func_name
-                break
+        if self_class is not None and f"{self_class}.{name}" in func_defs:
+            matched_name = f"{self_class}.{name}"
+        elif name in by_name:
+            matched_name = by_name[name][0]
 
         if matched_name:
             stmt_to = func_defs[matched_name]["line"]
@@ -82,13 +136,11 @@ def map_calls_to_defs(calls, func_defs, class_defs, stmt_lines):
             target_name = matched_name
 
         # Try constructor
-        elif name in class_defs and class_defs[name]["has_init"]:
-            for fn, fd in func_defs.items():
-                if fd["type"] == "constructor" and fd.get("class") == name:
-                    stmt_to = fd["line"]
-                    actual_type = "constructor"
-                    target_name = fn  # this would already be like ClassName.__init__
-                    break
+        elif name in class_defs and class_defs[name]["has_init"] and name in constructors:
+            fn = constructors[name]
+            stmt_to = func_defs[fn]["line"]
+            actual_type = "constructor"
+            target_name = fn  # this would already be like ClassName.__init__
 
         #print('*** DEBUG: name =', name, '→ target =', target_name)
 
@@ -104,27 +156,30 @@ def map_calls_to_defs(calls, func_defs, class_defs, stmt_lines):
     return flows
 
 
-def extract_stmt_line_map(stmt_list):
-    line_map = {}
-    for stmt in stmt_list:
-        start = stmt["start"]["line"]
-        end = stmt.get("end", {}).get("line", start)
-        for line in range(start, end + 1):
-            line_map[line] = start
-    return line_map
+# not needed by cx_gen_flows_call any more (the shared walk tracks parents), kept for other callers
+def annotate_ast_parents(tree):
+    for child, parent in ast_parent_map(tree).items():
+        child.parent = parent
 
 
-def annotate_ast_parents(tree):
+# {child node: parent node}, for callers that must not write to a shared tree
+def ast_parent_map(tree):
+    parents = {}
     for node in ast.walk(tree):
         for child in ast.iter_child_nodes(node):
-            child.parent = node
-
-
-def cx_gen_flows_call(tree, stmt_list):
-    annotate_ast_parents(tree)
-    func_defs, class_defs = extract_function_and_class_defs(tree)
-    calls = extract_calls(tree)
-    stmt_line_map = extract_stmt_line_map(stmt_list)
+            parents[child] = node
+    return parents
+
+
+# collector: optional CallFlowCollector already driven by a shared walk_ast() pass
+# stmt_index: optional StatementIndex over stmt_list; calls map to statements by their full extent
+def cx_gen_flows_call(tree, stmt_list, collector=None, stmt_index=None):
+    if collector is None:
+        collector = CallFlowCollector()
+        walk_ast(tree, collector)
+    func_defs, class_defs = collector.defs()
+    calls = collector.calls
+    stmt_line_map = get_stmt_index(stmt_list, stmt_index).full
     return map_calls_to_defs(calls, func_defs, class_defs, stmt_line_map)
 
 
@@ -0,0 +1,95 @@
+# cx_gen_flows_cfg.py
+# All CFG-based flows (implicit returns, end_if, loop, if, break) in one pass over the CFGs.
+#
+# Each CFG is visited once; every flow kind reads only the node-type buckets it needs
+# (CFG.nodes_of_type), so no kind sweeps all nodes. The per-kind lists have the same
+# shapes and order as cx_gen_flows_<kind>(cfg_mgr), which remain for standalone use.
+
+import time
+import argparse
+from typing import Any, Callable, Dict, List
+
+from cx_cfg6 import CFG, CFGManager
+from cx_gen_flows_return_implicit import get_implicit_returns_info
+from cx_gen_flows_endif import get_end_if_info
+from cx_gen_flows_loop import get_loop_info
+from cx_gen_flows_if import get_if_info
+from cx_gen_flows_break import get_break_info
+from cx_utils import derive_filename, read_source_file, write_json_file
+from cx_timing import NULL_STATS
+
+# kind -> extractor(cfg, cfg_name); kind is also the CFG.cached_flows key
+CFG_FLOW_KINDS: Dict[str, Callable[[CFG, str], List[Dict[str, Any]]]] = {
+    'return_implicit': lambda cfg, cfg_name: get_implicit_returns_info(cfg),
+    'endif': lambda cfg, cfg_name: get_end_if_info(cfg),
+    'loop': get_loop_info,
+    'if': lambda cfg, cfg_name: get_if_info(cfg),
+    'break': lambda cfg, cfg_name: get_break_info(cfg),
+}
+
+
+# stats: optional PipelineStats; each kind's time, summed over the CFGs, is recorded as its own
+# stage, flows_<kind> (inside the caller's flows_cfg stage, which also covers building any CFGs
+# not built yet)
+def cx_gen_flows_cfg(cfg_mgr: CFGManager, stats=None) -> Dict[str, List[Dict[str, Any]]]:
+    """Returns kind -> flows for every kind in CFG_FLOW_KINDS, over all CFGs of the manager."""
+    timed = stats is not None and stats is not NULL_STATS
+    results: Dict[str, List[Dict[str, Any]]] = {kind: [] for kind in CFG_FLOW_KINDS}
+    wall = dict.fromkeys(CFG_FLOW_KINDS, 0.0)
+    cpu = dict.fromkeys(CFG_FLOW_KINDS, 0.0)
+    for cfg_name, cfg in cfg_mgr.get_all_cfgs().items():
+        for kind, extract in CFG_FLOW_KINDS.items():
+            if timed:
+                wall0, cpu0 = time.perf_counter(), time.process_time()
+            results[kind].extend(cfg.cached_flows(kind, lambda cfg: extract(cfg, cfg_name)))
+            if timed:
+                wall[kind] += time.perf_counter() - wall0
+                cpu[kind] += time.process_time() - cpu0
+    if timed:
+        for kind in CFG_FLOW_KINDS:
+            stats.add(f'flows_{kind}', wall[kind] * 1000.0, cpu[kind] * 1000.0)
+    return results
+
+
+def contraction_mismatches(source_code: str, filename: str = '') -> List[str]:
+    """The kinds whose flows (order included) differ between CFGManager(contract_placeholders=True)
+    and the plain CFGs of the source; a check for CFG.contract_placeholders()."""
+    results = []
+    for contract in (False, True):
+        manager = CFGManager(contract_placeholders=contract)
+        manager.load_from_string(source_code, filename)
+        results.append(cx_gen_flows_cfg(manager))
+    plain, contracted = results
+    return [kind for kind in CFG_FLOW_KINDS if plain[kind] != contracted[kind]]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Write all CFG-based flows of a Python file, one JSON file per kind.")
+    parser.add_argument("input_filenames", nargs='+', help="Path(s) to the Python source file(s).")
+    parser.add_argument("--check-contraction", action="store_true",
+                        help="Write nothing; check that placeholder contraction leaves every kind's flows unchanged.")
+    args = parser.parse_args()
+
+    if args.check_contraction:
+        failed = skipped = 0
+        for input_filename in args.input_filenames:
+            try:
+                kinds = contraction_mismatches(read_source_file(input_filename), input_filename)
+            except Exception as e:  # code the CFG builder does not handle (or does not parse)
+                skipped += 1
+                print(f"{input_filename}: skipped, no CFGs: {type(e).__name__}: {e}")
+                continue
+            if kinds:
+                failed += 1
+                print(f"{input_filename}: flows differ with contraction: {', '.join(kinds)}")
+        checked = len(args.input_filenames) - skipped
+        print(f"{checked - failed} of {checked} files unchanged by contraction ({skipped} skipped)")
+        parser.exit(1 if failed else 0)
+
+    for input_filename in args.input_filenames:
+        manager = CFGManager()
+        manager.load_from_file(input_filename)
+        for kind, flows in cx_gen_flows_cfg(manager).items():
+            output_filename = derive_filename(input_filename, 'flows', kind)
+            write_json_file(flows, output_filename)
+            print(f"Wrote {len(flows)} flows_{kind} to {output_filename}")
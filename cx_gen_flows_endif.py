@@ -5,7 +5,7 @@ import os
 import json
 from typing import List, Dict, Any, Optional, Set
 import argparse
-from cx_cfg6_utils import _get_last_statement_lines_of_branch, _get_first_executable_line_forward, _scope_type, print_cfgs
+from cx_cfg6_utils import last_statement_lines, merge_line, _scope_type, print_cfgs
 # Import necessary classes from cx_cfg6.py
 # Assuming cx_cfg6.py is in the same directory or accessible via PYTHONPATH
 try:
@@ -22,44 +22,45 @@ def get_end_if_info(cfg: CFG) -> List[Dict[str, Any]]:
     results = []
     display_scope_name = cfg.name 
 
-    for node_id, node in cfg._nodes_by_id.items():
-        if node.node_type == 'if_join':
-            successors_of_join = cfg.get_successors(node_id)
+    for node in cfg.nodes_of_type('if_join'):
+        node_id = node.node_id
+        successors_of_join = cfg.get_successors(node_id)
+        
+        if successors_of_join:
+            succ_node_from_join = successors_of_join[0]
             
-            if successors_of_join:
-                succ_node_from_join = successors_of_join[0]
-                
-                # --- ADD THIS NEW FILTER ---
-                # If the successor of this if_join is another if_join,
-                # it means this is an intermediate join in an if/elif/else chain.
-                # The 'end_if' will be captured by the final if_join.
-                if succ_node_from_join.node_type == 'if_join':
-                    continue # Skip this intermediate if_join
-                # --- END OF NEW FILTER ---
-
-                resolved_to_line = _get_first_executable_line_forward(succ_node_from_join, cfg, set())
-                
-                to_line_id_for_this_join = -1
-                if resolved_to_line is not None:
-                    to_line_id_for_this_join = resolved_to_line
-                
-                # Existing filter (keep this, it handles different cases)
-                if to_line_id_for_this_join == -1 and successors_of_join and successors_of_join[0].node_id != cfg.exit_node_id:
-                    continue
+            # --- ADD THIS NEW FILTER ---
+            # If the successor of this if_join is another if_join,
+            # it means this is an intermediate join in an if/elif/else chain.
+            # The 'end_if' will be captured by the final if_join.
+            if succ_node_from_join.node_type == 'if_join':
+                continue # Skip this intermediate if_join
+            # --- END OF NEW FILTER ---
+
+            # the line after the join: read from the post-dominator tree (see merge_line)
+            resolved_to_line = merge_line(node, cfg)
+            
+            to_line_id_for_this_join = -1
+            if resolved_to_line is not None:
+                to_line_id_for_this_join = resolved_to_line
+            
+            # Existing filter (keep this, it handles different cases)
+            if to_line_id_for_this_join == -1 and successors_of_join and successors_of_join[0].node_id != cfg.exit_node_id:
+                continue
 
-                predecessor_nodes = cfg.get_predecessors(node_id)
+            predecessor_nodes = cfg.get_predecessors(node_id)
+            
+            for pred_node in predecessor_nodes:
+                from_line_ids_for_branch = last_statement_lines(pred_node, cfg)
                 
-                for pred_node in predecessor_nodes:
-                    from_line_ids_for_branch = _get_last_statement_lines_of_branch(pred_node, cfg)
-                    
-                    for from_line_id in from_line_ids_for_branch:
-                        results.append({
-                            'stmt_from': from_line_id,
-                            'stmt_to': to_line_id_for_this_join,
-                            'type': 'end_if',
-                            'scope': display_scope_name,
-                            'scope_type': _scope_type(display_scope_name)
-                        })
+                for from_line_id in from_line_ids_for_branch:
+                    results.append({
+                        'stmt_from': from_line_id,
+                        'stmt_to': to_line_id_for_this_join,
+                        'type': 'end_if',
+                        'scope': display_scope_name,
+                        'scope_type': _scope_type(display_scope_name)
+                    })
     return results
 
 
@@ -67,7 +68,7 @@ def get_end_if_info(cfg: CFG) -> List[Dict[str, Any]]:
 def cx_gen_flows_endif(cfg_mgr):
     end_if_results = []
     for cfg_name, cfg in cfg_mgr.get_all_cfgs().items():
-        results = get_end_if_info(cfg) # find end_ifs for a given CFG
+        results = cfg.cached_flows('endif', get_end_if_info) # find end_ifs for a given CFG
         end_if_results += results # cumulate the results
     return end_if_results
 
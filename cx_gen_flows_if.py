@@ -15,7 +15,7 @@ except ImportError:
 
 # Import helper functions from cx_cfg6_utils.py
 try:
-    from cx_cfg6_utils import _get_first_executable_line_forward, _scope_type, print_cfgs
+    from cx_cfg6_utils import merge_line, _scope_type, print_cfgs
 except ImportError:
     print("Error: Could not import helper functions from cx_cfg6_utils.py.")
     print("Please ensure cx_cfg6_utils.py is in the same directory or your PYTHONPATH is configured.")
@@ -27,7 +27,8 @@ except ImportError:
 def _resolve_target_line(target_node: Optional[CFGNode], cfg: CFG) -> int:
     """
     Resolves a target CFGNode to its corresponding executable line number.
-    Uses start_line if available, otherwise traverses using _get_first_executable_line_forward.
+    Uses start_line if available; for join/exit placeholders (if_join, loop_exit, loop_exit_for)
+    and other conceptual nodes, the line where their paths merge (merge_line).
     Returns -1 if no executable line is found.
     """
     if target_node is None:
@@ -36,13 +37,8 @@ def _resolve_target_line(target_node: Optional[CFGNode], cfg: CFG) -> int:
     if target_node.start_line is not None and target_node.start_line != -1:
         # Direct line for normal statements, if_condition, etc.
         return target_node.start_line
-    elif target_node.node_type in ('if_join', 'loop_exit', 'loop_exit_for'):
-        # For join/exit nodes, find the next executable statement *after* them
-        resolved_line = _get_first_executable_line_forward(target_node, cfg, set())
-        return resolved_line if resolved_line is not None else -1
     else:
-        # Fallback for other conceptual nodes that don't have a direct line
-        resolved_line = _get_first_executable_line_forward(target_node, cfg, set())
+        resolved_line = merge_line(target_node, cfg)
         return resolved_line if resolved_line is not None else -1
 
 
@@ -51,46 +47,43 @@ def _find_if_branch_targets(node: CFGNode, cfg: CFG) -> Tuple[Optional[CFGNode],
     elif_target_node: Optional[CFGNode] = None
     else_or_join_target_node: Optional[CFGNode] = None
 
+    out_arcs = cfg.out_arcs_by_type(node.node_id)
+
     # First pass: Identify explicit true_branch and false_branch
-    for u, v, data in cfg._graph.edges(data=True):
-        if u == node.node_id:
-            arc = data['data']
-            target_node_obj = cfg.get_node(v)
-
-            if target_node_obj:
-                if arc.arc_type == 'true_branch':
-                    # Only accept true_branch if it leads to an executable statement,
-                    # not directly to a join/exit node (CFG anomaly)
-                    if target_node_obj.node_type not in ('if_join', 'exit_point'):
-                        true_target_node = target_node_obj
-                elif arc.arc_type == 'false_branch':
-                    else_or_join_target_node = target_node_obj
+    for arc in out_arcs.get('true_branch', ()):
+        target_node_obj = cfg.get_node(arc.target_id)
+        # Only accept true_branch if it leads to an executable statement,
+        # not directly to a join/exit node (CFG anomaly)
+        if target_node_obj and target_node_obj.node_type not in ('if_join', 'exit_point'):
+            true_target_node = target_node_obj
+    for arc in out_arcs.get('false_branch', ()):
+        target_node_obj = cfg.get_node(arc.target_id)
+        if target_node_obj:
+            else_or_join_target_node = target_node_obj
 
     # Second pass: Handle 'normal' arcs. These are tricky.
     # They can be the TRUE path into a nested structure OR an ELIF.
-    for u, v, data in cfg._graph.edges(data=True):
-        if u == node.node_id:
-            arc = data['data']
-            target_node_obj = cfg.get_node(v)
-
-            if target_node_obj and arc.arc_type == 'normal':
-                # Rule 1: If true_target_node is still None (no valid true_branch found yet),
-                # AND this 'normal' arc leads to a non-join/exit node,
-                # it's a strong candidate for the TRUE path.
-                # This covers `if A: if B:` where A->B is 'normal'.
-                # This also covers `if A: for B:` where A->B is 'normal'.
-                if true_target_node is None and target_node_obj.node_type not in ('if_join', 'exit_point'):
-                    true_target_node = target_node_obj
-
-                # Rule 2: If we have a 'normal' arc to an 'if_condition' node,
-                # AND this 'if_condition' is *NOT* the same as our *already determined* true_target_node,
-                # THEN it must be an 'elif'.
-                elif target_node_obj.node_type == 'if_condition':
-                    if true_target_node is None or true_target_node.node_id != target_node_obj.node_id:
-                        elif_target_node = target_node_obj
-                        # If we found an elif, it takes precedence for the false path
-                        # over any false_branch leading to an 'else' block or 'if_join'.
-                        else_or_join_target_node = None # Clear it if set by false_branch
+    for arc in out_arcs.get('normal', ()):
+        target_node_obj = cfg.get_node(arc.target_id)
+
+        if target_node_obj:
+            # Rule 1: If true_target_node is still None (no valid true_branch found yet),
+            # AND this 'normal' arc leads to a non-join/exit node,
+            # it's a strong candidate for the TRUE path.
+            # This covers `if A: if B:` where A->B is 'normal'.
+            # This also covers `if A: for B:` where A->B is 'normal'.
+            if true_target_node is None and target_node_obj.node_type not in ('if_join', 'exit_point'):
+                true_target_node = target_node_obj
+
+            # Rule 2: If we have a 'normal' arc to an 'if_condition' node,
+            # AND this 'if_condition' is *NOT* the same as our *already determined* true_target_node,
+            # THEN it must be an 'elif'.
+            elif target_node_obj.node_type == 'if_condition':
+                if true_target_node is None or true_target_node.node_id != target_node_obj.node_id:
+                    elif_target_node = target_node_obj
+                    # If we found an elif, it takes precedence for the false path
+                    # over any false_branch leading to an 'else' block or 'if_join'.
+                    else_or_join_target_node = None # Clear it if set by false_branch
 
     return true_target_node, elif_target_node, else_or_join_target_node
 
@@ -104,8 +97,8 @@ def get_if_info(cfg: CFG) -> List[Dict[str, Any]]:
     scope_name = cfg.name
     scope_type = _scope_type(scope_name)
 
-    for node_id, node in cfg._nodes_by_id.items():
-        if node.node_type == 'if_condition' and node.start_line is not None and node.start_line != -1:
+    for node in cfg.nodes_of_type('if_condition'):
+        if node.start_line is not None and node.start_line != -1:
             stmt_from = node.start_line
             stmt_to_true: int = -1
             stmt_to_false: int = -1
@@ -142,7 +135,7 @@ def cx_gen_flows_if(cfg_manager: CFGManager) -> List[Dict[str, Any]]:
     all_if_results: List[Dict[str, Any]] = []
 
     for cfg_name, cfg_obj in all_cfgs.items():
-        if_results_for_cfg = get_if_info(cfg_obj)
+        if_results_for_cfg = cfg_obj.cached_flows('if', get_if_info)
         all_if_results.extend(if_results_for_cfg)
 
     return all_if_results
@@ -17,7 +17,7 @@ except ImportError:
 
 # Import helper functions from cx_cfg6_utils.py as requested
 try:
-    from cx_cfg6_utils import _get_first_executable_line_forward, _scope_type, print_cfgs
+    from cx_cfg6_utils import merge_line, _scope_type, print_cfgs
 except ImportError:
     print("Error: Could not import helper functions from cx_cfg6_utils.py.")
     print("Please ensure cx_cfg6_utils.py is in the same directory or your PYTHONPATH is configured.")
@@ -55,18 +55,16 @@ def get_to_false_line(loop_node: CFGNode, cfg: CFG) -> int:
     """
     For a loop_condition node, find the statement executed when the loop condition is false.
     - Follows the 'false_branch' or 'no_more_items' arc.
-    - Then uses _get_first_executable_line_forward() to skip over placeholders.
+    - Then uses merge_line() to skip over placeholders.
     - Returns -1 if nothing reachable.
     """
-    false_arc_types = {'false_branch', 'no_more_items'}
+    false_arc_types = ('false_branch', 'no_more_items')
 
-    for succ_node in cfg.get_successors(loop_node.node_id):
-        arc = cfg.get_arc(loop_node.node_id, succ_node.node_id)
-        if arc.arc_type in false_arc_types:
-            succ_node = cfg.get_node(succ_node.node_id)
-            if succ_node:
-                result = _get_first_executable_line_forward(succ_node, cfg, visited=set())
-                return result if result is not None else -1
+    for arc in cfg.out_arcs_of_type(loop_node.node_id, *false_arc_types):
+        succ_node = cfg.get_node(arc.target_id)
+        if succ_node:
+            result = merge_line(succ_node, cfg)
+            return result if result is not None else -1
 
     return -1  # No false branch arc found
 
@@ -83,24 +81,23 @@ def get_loop_info(cfg: CFG, cfg_name: str) -> List[Dict[str, int]]:
     """
     results = []
 
-    for node_id, node in cfg._nodes_by_id.items():
-        if node.node_type in {'loop_condition', 'loop_condition_for'}:
-            #from_line = node.start_line or -1
-            #if from_line == -1:
-            #    from_line = get_real_stmt_line(cfg, node)
-            from_line = node.getStartLine()
-            to_true = get_to_true_line(node, cfg)
-            to_false = get_to_false_line(node, cfg)
-            loop_type = 'for' if node.node_type == 'loop_condition_for' else 'while'
-            scope_type = _scope_type(cfg_name)
-            results.append({
-                "stmt_from": from_line,
-                "stmt_to_true": to_true,
-                "stmt_to_false": to_false,
-                "type": loop_type,
-                "scope": cfg_name,
-                "scope_type": scope_type
-            })
+    for node in cfg.nodes_of_type('loop_condition', 'loop_condition_for'):
+        #from_line = node.start_line or -1
+        #if from_line == -1:
+        #    from_line = get_real_stmt_line(cfg, node)
+        from_line = node.getStartLine()
+        to_true = get_to_true_line(node, cfg)
+        to_false = get_to_false_line(node, cfg)
+        loop_type = 'for' if node.node_type == 'loop_condition_for' else 'while'
+        scope_type = _scope_type(cfg_name)
+        results.append({
+            "stmt_from": from_line,
+            "stmt_to_true": to_true,
+            "stmt_to_false": to_false,
+            "type": loop_type,
+            "scope": cfg_name,
+            "scope_type": scope_type
+        })
 
     return results
 
@@ -112,7 +109,7 @@ def cx_gen_flows_loop(cfg_manager):
     #print(f"--- Analyzing loops for {input_filename} ---")
     for cfg_name, cfg_obj in all_cfgs.items():
         #print(f"  Processing CFG: {cfg_name}")
-        loop_results_for_cfg = get_loop_info(cfg_obj, cfg_name)
+        loop_results_for_cfg = cfg_obj.cached_flows('loop', lambda cfg: get_loop_info(cfg, cfg_name))
         all_loop_results.extend(loop_results_for_cfg)
 
     return all_loop_results
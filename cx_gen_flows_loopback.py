@@ -1,18 +1,25 @@
 import sys
 import ast
 from cx_utils import read_source_file, derive_output_filename, write_json_file
+from cx_ast_walk import AstCollector, walk_ast
 
-class LoopbackFlowExtractor(ast.NodeVisitor):
+class LoopbackFlowExtractor(AstCollector):
     def __init__(self):
         self.results = []
         self.parent_stack = []
 
-    def visit_For(self, node):
+    def visit_For(self, node, walker):
         self._handle_loop(node)
 
-    def visit_While(self, node):
+    def visit_While(self, node, walker):
         self._handle_loop(node)
 
+    def leave_For(self, node, walker):
+        self.parent_stack.pop()
+
+    def leave_While(self, node, walker):
+        self.parent_stack.pop()
+
     def _handle_loop(self, node):
         loop_header_line = node.lineno
         self.parent_stack.append(loop_header_line)
@@ -24,12 +31,9 @@ class LoopbackFlowExtractor(ast.NodeVisitor):
                 "stmt_to": loop_header_line,
                 "type": "loop_back"
             })
+        # nested nodes are visited by the walker, then leave_For/leave_While pops the header
 
-        # Visit nested nodes
-        self.generic_visit(node)
-        self.parent_stack.pop()
-
-    def visit_Continue(self, node):
+    def visit_Continue(self, node, walker):
         stmt_from = node.lineno
         header_line = self._find_enclosing_loop_header()
         if header_line:
@@ -75,10 +79,12 @@ class LoopbackFlowExtractor(ast.NodeVisitor):
 
         return terminals
 
-def cx_gen_flows_loopback(tree):
-    extractor = LoopbackFlowExtractor()
-    extractor.visit(tree)
-    return extractor.results
+# collector: optional LoopbackFlowExtractor already driven by a shared walk_ast() pass
+def cx_gen_flows_loopback(tree, collector=None):
+    if collector is None:
+        collector = LoopbackFlowExtractor()
+        walk_ast(tree, collector)
+    return collector.results
 
 if __name__ == '__main__':
     if len(sys.argv) != 2:
@@ -6,7 +6,7 @@ from cx_utils import (
 )
 
 def cx_gen_flows_return(returns_data, calls_data):
-    """Adds 'stmt_to' list to each return item based on scope/target_name match."""
+    """New return items: each one with a 'stmt_to' list based on scope/target_name match (the inputs are not changed)."""
     # Build a mapping: target_name → list of stmt_froms
     call_map = {}
     for call in calls_data:
@@ -15,12 +15,8 @@ def cx_gen_flows_return(returns_data, calls_data):
             call_map.setdefault(target, []).append(call["stmt_from"])
 
     # Enhance return entries with 'stmt_to', 'type'
-    for ret in returns_data:
-        scope = ret.get("scope")
-        ret["stmt_to"] = sorted(call_map.get(scope, []))
-        ret["type"] = "return"
-
-    return returns_data
+    return [{**ret, "stmt_to": sorted(call_map.get(ret.get("scope"), [])), "type": "return"}
+            for ret in returns_data]
 
 if __name__ == "__main__":
     if len(sys.argv) != 2:
@@ -2,51 +2,74 @@ import ast
 import sys
 import json
 from cx_utils import read_source_file, derive_filename, parse_ast
+from cx_ast_walk import AstCollector, walk_ast
 
 
-def cx_gen_flows_return_explicit(tree):
-    results = []
-
-    class ReturnRaiseVisitor(ast.NodeVisitor):
-        def __init__(self):
-            self.current_class = None
-            self.current_function = None
-
-        def visit_ClassDef(self, node):
-            prev_class = self.current_class
-            self.current_class = node.name
-            self.generic_visit(node)
-            self.current_class = prev_class
-
-        def visit_FunctionDef(self, node):
-            prev_function = self.current_function
-            self.current_function = node.name
-
-            if self.current_class:
-                call_type = "method" if node.name != "__init__" else "constructor"
-                function_name = f"{self.current_class}.{node.name}"
-            else:
-                call_type = "function"
-                function_name = node.name
-
-            for child in ast.walk(node):
-                if isinstance(child, (ast.Return, ast.Raise)):
-                    results.append({
-                        "stmt_from": child.lineno,
-                        "return_type": "explicit_return",
-                        "is_raise": isinstance(child, ast.Raise),
-                        "scope": function_name,
-                        "scope_type": call_type
-                    })
-
-            self.generic_visit(node)
-            self.current_function = prev_function
-
-        def visit_AsyncFunctionDef(self, node):
-            self.visit_FunctionDef(node)
-
-    ReturnRaiseVisitor().visit(tree)
-    return results
+class ReturnRaiseVisitor(AstCollector):
+    """
+    Collects return/raise statements per function during the shared AST walk.
+    A return inside a nested function is reported for each enclosing function, as before:
+    each open function keeps a group, and groups are emitted in function order, with
+    each group in ast.walk() (breadth-first) order of the function's subtree.
+    """
+    def __init__(self):
+        self._groups = []  # [function_name, call_type, [(depth, seq, item)]]
+        self._open = []    # groups of the functions currently being walked
+
+    def visit_FunctionDef(self, node, walker):
+        current_class = None
+        for scope_node in reversed(walker.scope_stack[:-1]):
+            if isinstance(scope_node, ast.ClassDef):
+                current_class = scope_node.name
+                break
+
+        if current_class:
+            call_type = "method" if node.name != "__init__" else "constructor"
+            function_name = f"{current_class}.{node.name}"
+        else:
+            call_type = "function"
+            function_name = node.name
+
+        group = [function_name, call_type, []]
+        self._groups.append(group)
+        self._open.append(group)
+
+    def leave_FunctionDef(self, node, walker):
+        self._open.pop()
+
+    def visit_AsyncFunctionDef(self, node, walker):
+        self.visit_FunctionDef(node, walker)
+
+    def leave_AsyncFunctionDef(self, node, walker):
+        self.leave_FunctionDef(node, walker)
+
+    def visit_Return(self, node, walker):
+        for group in self._open:
+            group[2].append((walker.depth, walker.seq, node))
+
+    def visit_Raise(self, node, walker):
+        self.visit_Return(node, walker)
+
+    def results(self):
+        results = []
+        for function_name, call_type, found in self._groups:
+            for _depth, _seq, child in sorted(found, key=lambda f: (f[0], f[1])):
+                results.append({
+                    "stmt_from": child.lineno,
+                    "return_type": "explicit_return",
+                    "is_raise": isinstance(child, ast.Raise),
+                    "scope": function_name,
+                    "scope_type": call_type
+                })
+        return results
+
+
+# collector: optional ReturnRaiseVisitor already driven by a shared walk_ast() pass
+def cx_gen_flows_return_explicit(tree, collector=None):
+    if collector is None:
+        collector = ReturnRaiseVisitor()
+        walk_ast(tree, collector)
+    return collector.results()
 
 if __name__ == "__main__":
     if len(sys.argv) < 2:
@@ -16,7 +16,7 @@ except ImportError:
 
 # Import helper functions from cx_cfg6_utils.py
 try:
-    from cx_cfg6_utils import _get_last_statement_lines_of_branch, _scope_type, print_cfgs
+    from cx_cfg6_utils import last_statement_lines, _scope_type, print_cfgs
 except ImportError:
     print("Error: Could not import helper functions from cx_cfg6_utils.py.")
     print("Please ensure cx_cfg6_utils.py is in the same directory or your PYTHONPATH is configured.")
@@ -59,7 +59,7 @@ def get_implicit_returns_info(cfg: CFG) -> List[Dict[str, Any]]:
         # For any other node type that directly precedes the exit,
         # it represents an implicit return path. We use the helper to find
         # the actual source line(s) that comprise this implicit return.
-        from_line_ids_for_branch = _get_last_statement_lines_of_branch(pred_node, cfg)
+        from_line_ids_for_branch = last_statement_lines(pred_node, cfg)
         
         # Each line returned by the helper corresponds to a distinct "from" point
         for from_line_id in from_line_ids_for_branch:
@@ -83,7 +83,7 @@ def cx_gen_flows_return_implicit(cfg_mgr):
         #print(target_cfg_name)
         target_cfg = target_cfgs[target_cfg_name]
         #print(f"--- Running 'get_implicit_returns_info' for CFG: {target_cfg.name} ---")
-        implicit_returns_results += get_implicit_returns_info(target_cfg) # get & cumulate implicit returns
+        implicit_returns_results += target_cfg.cached_flows('return_implicit', get_implicit_returns_info) # get & cumulate implicit returns
         #print(f'Found {len(implicit_returns_result)} implicit returns')
     return implicit_returns_results
 
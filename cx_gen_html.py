@@ -2,6 +2,8 @@ import sys
 import os
 import json
 from cx_utils import load_json_file, derive_basename
+from cx_token_store import tokens_from_dicts
+from cx_stmt_index import get_stmt_index
 
 
 # Token types to CSS classes
@@ -38,8 +40,8 @@ def escape_html(text):
 
 
 def get_token_class(tok):
-    ttype = tok["type"]
-    tname = tok.get("type_name")
+    ttype = tok.type
+    tname = tok.type_name
 
     if ttype == "NAME":
         return TOKEN_CLASSES.get(ttype, {}).get(tname)
@@ -47,7 +49,7 @@ def get_token_class(tok):
 
 
 def wrap_token(tok):
-    text = escape_html(tok["text"])
+    text = escape_html(tok.text)
     cls = get_token_class(tok)
     if cls:
         result =  f'<span class="{cls}">{text}</span>'
@@ -57,29 +59,18 @@ def wrap_token(tok):
     return result
 
 
-def build_statement_map(stmt_list):
-    stmt_map = {}  # (line, col) -> stmt_id
-    for stmt in stmt_list:
-        stmt_id = stmt['start']['line'] # stmt["id"]
-        start = (stmt["start"]["line"], stmt["start"]["col"])
-        endattr = "end_header" if "end_header" in stmt else "end" # choose from "end" or "end_header"
-        end = (stmt[endattr]["line"], stmt[endattr]["col"])
-        stmt_map[start] = {"id": stmt_id, "start": True}
-        stmt_map[end] = {"id": stmt_id, "end": True}
-    return stmt_map
-
-def generate_code_section(tokens, tokens_bs, stmt_list):
+def generate_code_section(tokens, tokens_bs, stmt_list, stmt_index=None):
     # convert \ list into dict of line #s and pre-\ text
     bs_by_line = {it["line"]: it["pre_ws"] for it in tokens_bs}
     #print(tokens_bs)
     #print(bs_by_line)
-    stmt_map = build_statement_map(stmt_list)
+    stmt_map = get_stmt_index(stmt_list, stmt_index).boundaries # (line, col) -> {"id", "start"/"end"}
     #print(stmt_map)
     output_lines = []
 
     grouped_tokens = {}
     for tok in tokens:
-        grouped_tokens.setdefault(tok["start"]["line"], []).append(tok)
+        grouped_tokens.setdefault(tok.line, []).append(tok)
 
     # for wrapping physical lines, we need to track if there is an open (in-progress) multi-line statement
     stmt_level = 0
@@ -96,9 +87,9 @@ def generate_code_section(tokens, tokens_bs, stmt_list):
            line_fragments.append(f'<span class="cx_srcline" id="{line}s">')
 
         for tok in line_tokens:
-            if not tok["text"]: # skip over empty tokens like DEDENT, EOF
+            if not tok.text: # skip over empty tokens like DEDENT, EOF
                 continue
-            tok_start_col = tok["start"]["col"]
+            tok_start_col = tok.col
             if tok_start_col > col:
                 line_fragments.append(" " * (tok_start_col - col))
 
@@ -110,7 +101,7 @@ def generate_code_section(tokens, tokens_bs, stmt_list):
 
             line_fragments.append(wrap_token(tok))
 
-            tok_end_col = tok["end"]["col"]
+            tok_end_col = tok.end_col
             col = tok_end_col
 
             # are we at the end of a statement? If so, close the statement span
@@ -121,9 +112,9 @@ def generate_code_section(tokens, tokens_bs, stmt_list):
                 stmt_level -=1
 
             # 9/1/25 multi-line string is a special case for end of statement
-            elif tok['type'] == 'STRING' and tok['start']['line'] != tok['end']['line']:
+            elif tok.type == 'STRING' and tok.line != tok.end_line:
                #print('found multi-line string')
-               end_coord = (tok['end']['line'], tok['end']['col'])
+               end_coord = (tok.end_line, tok.end_col)
                end_info = stmt_map.get(end_coord)
                if end_info and end_info.get('end'):
                    line_fragments.append('</span>')
@@ -335,8 +326,9 @@ def generate_html(title, code_html, var_html, allhilites, allarrows, allflows, a
 </html>"""
     return full_html
 
-def cx_gen_html(py_filename, tokens, tokens_bs, stmt_list, var_actions, allhilites, allarrows, allflows, allscopes):
-    code_html_output = generate_code_section(tokens, tokens_bs, stmt_list)
+# stmt_index: optional StatementIndex over stmt_list, shared with the other generators
+def cx_gen_html(py_filename, tokens, tokens_bs, stmt_list, var_actions, allhilites, allarrows, allflows, allscopes, stmt_index=None):
+    code_html_output = generate_code_section(tokens, tokens_bs, stmt_list, stmt_index)
     var_html_output = generate_variable_section(var_actions)
     html_output = generate_html(py_filename, code_html_output, var_html_output, allhilites, allarrows, allflows, allscopes)
     return html_output
@@ -350,7 +342,7 @@ if __name__ == '__main__':
     py_filename = sys.argv[1]
     base = derive_basename(py_filename)
 
-    tokens = load_json_file(f"{base}.tokens.json")
+    tokens = tokens_from_dicts(load_json_file(f"{base}.tokens.json"))
     tokens_bs = load_json_file(f"{base}.tokens_bs.json")
     stmt_list = load_json_file(f"{base}.stmts.json")
     var_actions = load_json_file(f"{base}.actions_var.json")
@@ -36,6 +36,9 @@ import tokenize
 from dataclasses import dataclass
 from typing import Dict, List, Optional, Tuple
 
+from cx_token_store import TokenStore
+from cx_ast_walk import AstCollector, AstWalker, walk_ast
+
 MOD_ID = "mod:<global>:1"
 
 # ---------------- Helpers ----------------
@@ -58,11 +61,26 @@ def _docstring_span(body: List[ast.stmt]) -> Tuple[Optional[int], Optional[int]]
             return int(start), int(end if end is not None else start)
     return None, None
 
-def compute_header_end_with_tokenize(source: str, def_line: int) -> int:
+def compute_header_end_with_tokenize(source: str, def_line: int, token_store: Optional[TokenStore] = None) -> int:
     """
     Fallback: find the physical line that contains the ':' ending a def/class header.
     Scans forward from def_line, tracking (), [], {} depth; returns def_line on failure.
+    If a shared TokenStore is passed, its tokens are scanned instead of re-tokenizing from def_line.
     """
+    if token_store is not None:
+        depth = 0
+        raw = token_store.raw
+        for i in range(token_store.index_at_line(def_line), len(raw)):
+            tok = raw[i]
+            if tok.type == tokenize.OP:
+                if tok.string in "([{":
+                    depth += 1
+                elif tok.string in ")]}":
+                    depth -= 1
+                elif tok.string == ":" and depth == 0:
+                    return tok.start[0]
+        return def_line
+
     lines = source.splitlines()
     text = "\n".join(lines[def_line - 1 :])
     depth = 0
@@ -122,12 +140,11 @@ class Owner:
     header_start_line: int    # earliest decorator or def line
     docstring_span: Optional[Tuple[int, int]]  # (start, end) or None
 
-class OwnerBuilder(ast.NodeVisitor):
+class OwnerBuilder(AstCollector):
+    # the enclosing class/function nodes and qualified names come from the shared walker's scope stack
     def __init__(self): #, source: str):
         #self.source = source
         self.owners: List[Owner] = []
-        self._node_stack: List[ast.AST] = []
-        self._qname_stack: List[str] = []
         self._scope_id_stack: List[str] = [MOD_ID]  # default parent at module level
 
     @staticmethod
@@ -137,9 +154,6 @@ class OwnerBuilder(ast.NodeVisitor):
     def _make_id(self, kind: str, qname: str, def_line: int) -> str:
         return f"{self._abbr(kind)}:{qname}:{def_line}"
 
-    def _qual(self, name: str) -> str:
-        return f"{self._qname_stack[-1]}.{name}" if self._qname_stack else name
-
     @staticmethod
     def _first_last_stmt_lines(body: List[ast.stmt], fallback_def: int) -> Tuple[Optional[int], int]:
         if not body:
@@ -152,17 +166,28 @@ class OwnerBuilder(ast.NodeVisitor):
         )
         return first_ln, last_end_ln
 
-    def visit_ClassDef(self, node: ast.ClassDef) -> None:
-        self._handle_owner(node, kind="class", name=node.name)
+    def visit_ClassDef(self, node: ast.ClassDef, walker: AstWalker) -> None:
+        self._handle_owner(node, walker, kind="class", name=node.name)
+
+    def visit_FunctionDef(self, node: ast.FunctionDef, walker: AstWalker) -> None:
+        self._handle_owner(node, walker, kind="function", name=node.name)
 
-    def visit_FunctionDef(self, node: ast.FunctionDef) -> None:
-        self._handle_owner(node, kind="function", name=node.name)
+    def visit_AsyncFunctionDef(self, node: ast.AsyncFunctionDef, walker: AstWalker) -> None:
+        self._handle_owner(node, walker, kind="function", name=node.name)
 
-    def visit_AsyncFunctionDef(self, node: ast.AsyncFunctionDef) -> None:
-        self._handle_owner(node, kind="function", name=node.name)
+    def leave_ClassDef(self, node: ast.ClassDef, walker: AstWalker) -> None:
+        self._scope_id_stack.pop()
+
+    def leave_FunctionDef(self, node: ast.FunctionDef, walker: AstWalker) -> None:
+        self._scope_id_stack.pop()
 
-    def _handle_owner(self, node: ast.AST, kind: str, name: str) -> None:
-        parent_is_class = bool(self._node_stack and isinstance(self._node_stack[-1], ast.ClassDef))
+    def leave_AsyncFunctionDef(self, node: ast.AsyncFunctionDef, walker: AstWalker) -> None:
+        self._scope_id_stack.pop()
+
+    def _handle_owner(self, node: ast.AST, walker: AstWalker, kind: str, name: str) -> None:
+        # walker.scope_stack ends with this node; the one before it is the enclosing owner
+        enclosing = walker.scope_stack[:-1]
+        parent_is_class = bool(enclosing and isinstance(enclosing[-1], ast.ClassDef))
         real_kind = "method" if (kind == "function" and parent_is_class) else kind
 
         def_line = int(getattr(node, "lineno", 1))
@@ -175,7 +200,7 @@ class OwnerBuilder(ast.NodeVisitor):
         deco_starts = [int(getattr(d, "lineno", def_line)) for d in deco_list if hasattr(d, "lineno")]
         header_start = min([def_line] + deco_starts) if deco_starts else def_line
 
-        qn = self._qual(name)
+        qn = walker.scope_name()
         oid = self._make_id(real_kind, qn, def_line)
         parent_id = (self._scope_id_stack[-1] if self._scope_id_stack else MOD_ID) or MOD_ID
 
@@ -190,28 +215,26 @@ class OwnerBuilder(ast.NodeVisitor):
             docstring_span=(int(doc_start), int(doc_end)) if doc_start is not None else None
         ))
 
-        # descend for nested owners
-        self._node_stack.append(node)
-        self._qname_stack.append(qn)
+        # nested owners are visited by the walker, then leave_* pops this id
         self._scope_id_stack.append(oid)
-        self.generic_visit(node)
-        self._scope_id_stack.pop()
-        self._qname_stack.pop()
-        self._node_stack.pop()
 
 # ---------------- Orchestration ----------------
 
-def cx_gen_scopes(tree: ast.AST, stmts_list: Optional[List[dict]]) -> Dict[str, dict]:
-    ob = OwnerBuilder() #py_source)
-    ob.visit(tree)
+# collector: optional OwnerBuilder already driven by a shared walk_ast() pass
+def cx_gen_scopes(tree: ast.AST, stmts_list: Optional[List[dict]], token_store: Optional[TokenStore] = None,
+                  collector: Optional[OwnerBuilder] = None) -> Dict[str, dict]:
+    ob = collector
+    if ob is None:
+        ob = OwnerBuilder() #py_source)
+        walk_ast(tree, ob)
 
     header_end_map = load_header_end_map_from_stmts_list(stmts_list or [])
     scopes: Dict[str, dict] = {}
 
     for o in ob.owners:
         he = header_end_map.get(o.def_line)
-        #if he is None:
-        #    he = compute_header_end_with_tokenize(py_source, o.def_line)
+        if he is None and token_store is not None:
+            he = compute_header_end_with_tokenize(token_store.source_code, o.def_line, token_store)
 
         scopes[str(o.def_line)] = {
             "id": o.id,
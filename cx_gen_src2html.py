@@ -1,163 +1,322 @@
 import sys
 import os
+import logging
 from cx_utils import read_source_file, parse_ast, derive_basename
 from cx_errors import CxParseError
 
 # cfg support
 from cx_cfg6 import CFGManager
 
+# per-stage timing
+from cx_timing import PipelineStats
+
+# the stages, run in order or on a thread pool
+from cx_stages import Stage, run_stages
+
+# cache of finished results
+from cx_cache import make_cache_key
+
+# tokenize once, shared by all token-based generators
+from cx_token_store import TokenStore
+
+# one AST pass, shared by all ast-based generators
+from cx_ast_walk import walk_ast
+from cx_scope_model import build_scope_model
+
 # Import top-level functions from each generator
 from cx_gen_tokens_core import cx_gen_tokens_core
-from cx_gen_tokens_name import cx_gen_tokens_name
+from cx_gen_tokens_name import cx_gen_tokens_name, NameClassifier, get_token_lookup
 from cx_gen_tokens_bs import cx_gen_tokens_bs
-from cx_gen_stmts_real import cx_gen_stmts_real
-from cx_gen_stmts_synth import cx_gen_stmts_synth
-from cx_gen_stmts_head import cx_gen_stmts_head
+from cx_gen_stmts_real import cx_gen_stmts_real, RealStmtCollector
+from cx_gen_stmts_head import cx_gen_stmts_synth_head
 from cx_gen_stmts import cx_gen_stmts
-from cx_gen_actions_var import cx_gen_actions_var
-from cx_gen_actions_io import cx_gen_actions_io
-from cx_gen_flows_call import cx_gen_flows_call
-from cx_gen_flows_loopback import cx_gen_flows_loopback
-from cx_gen_flows_return_explicit import cx_gen_flows_return_explicit
-from cx_gen_flows_return_implicit import cx_gen_flows_return_implicit
+from cx_stmt_index import StatementIndex
+from cx_gen_actions_var import cx_gen_actions_var, VarActionExtractor
+from cx_gen_actions_io import cx_gen_actions_io, IOActionExtractor
+from cx_gen_flows_call import cx_gen_flows_call, CallFlowCollector
+from cx_gen_flows_loopback import cx_gen_flows_loopback, LoopbackFlowExtractor
+from cx_gen_flows_return_explicit import cx_gen_flows_return_explicit, ReturnRaiseVisitor
+from cx_gen_flows_cfg import cx_gen_flows_cfg
 from cx_gen_flows_return import cx_gen_flows_return
-from cx_gen_flows_endif import cx_gen_flows_endif
-from cx_gen_flows_loop import cx_gen_flows_loop
-from cx_gen_flows_if import cx_gen_flows_if
-from cx_gen_flows_break import cx_gen_flows_break
 from cx_gen_allhilites import cx_gen_allhilites
 from cx_gen_allarrows import cx_gen_allarrows
 from cx_gen_flows_all import cx_gen_flows_all
-from cx_gen_scopes import cx_gen_scopes
+from cx_gen_scopes import cx_gen_scopes, OwnerBuilder
 from cx_gen_html import cx_gen_html
 
+logger = logging.getLogger(__name__)
+
 def print_status(name, items=None, drill=True):
+    if not logger.isEnabledFor(logging.INFO):
+        return
     if isinstance(items, list):
         count = len(items)
-        print(f'Generated {count} {name}.')
+        logger.info(f'Generated {count} {name}.')
     elif isinstance(items, dict) and drill:
         count = sum(len(v) for v in items.values())
-        print(f'Generated {count} {name}.')
+        logger.info(f'Generated {count} {name}.')
     elif isinstance(items, dict):
         count = len(items.keys())
-        print(f'Generated {count} {name}.')
+        logger.info(f'Generated {count} {name}.')
     else:
-        print(f'Generated {name}.')
+        logger.info(f'Generated {name}.')
+
+def cx_gen_src2html(source_code, filename='CodeXplorer', stats=None, intermediates=None, cfg_mgr=None,
+                    workers=None, freeze_outputs=None):
+    # stats: optional PipelineStats; each stage below is timed into it
+    # intermediates: optional dict, filled with the generators' outputs (e.g. for the cache)
+    # cfg_mgr: optional CFGManager(incremental=True) kept by the caller across edits of one program;
+    #          unchanged scopes then reuse their CFGs and CFG-based flows
+    # workers: threads for the independent stages (see cx_stages.py; default CX_STAGE_WORKERS, 0 = in order)
+    # freeze_outputs: hand read-only copies of the stage outputs to the next stages (default CX_FREEZE_STAGES)
+    logger.debug('Entering cx_gen_src2html(): %d chars', len(source_code))
+    if cfg_mgr is None:
+        cfg_mgr = CFGManager()
+    outputs = run_stages(build_stages(source_code, filename, cfg_mgr, stats), stats=stats,
+                         workers=workers, freeze_outputs=freeze_outputs)
+
+    if intermediates is not None:
+        token_store, tokens_core, tokens_from_tokenizer = outputs['tokens_core']
+        stmts, stmt_index = outputs['stmts']
+        intermediates.update(
+            tokens=outputs['tokens_name'], tokens_bs=outputs['tokens_bs'], stmts=stmts,
+            actions_var=outputs['actions_var'], actions_io=outputs['actions_io'],
+            allhilites=outputs['allhilites'], allarrows=outputs['allarrows'],
+            allflows=outputs['flows_all'], allscopes=outputs['scopes'],
+        )
+
+    return outputs['html']
 
-def cx_gen_src2html(source_code, filename='CodeXplorer'):
-    print('Entering cx_gen_src2html()')
-    print(source_code)
+
+# The pipeline as stages (see cx_stages.py). Each stage reads the outputs named in its deps, in the
+# order listed here, which is also the order they run in without workers. stats, if given, also
+# gets the sub-stages a stage times itself (the CFG flow kinds).
+def build_stages(source_code, filename, cfg_mgr, stats=None):
 
     # === The basics: ast tree and cfg graph ===
 
     # the ast tree
-    try:
-       print('calling parse_ast()')
-       tree = parse_ast(source_code) #, filename=source_path)
-       print('after calling parse_ast()')
-    except Exception as e:
-        print('Exception during call of parse_ast()')
-        # Construct a CxError with useful info
-        err = CxParseError("SyntaxError", e.msg,
-            line=e.lineno or 0,
-            col=e.offset or 0,
-            severity="error"
-        )
-        raise err
-    except Exception as e:
-    # Catch-all fallback in case it's not a SyntaxError (e.g., internal failure)
-        print('Exception during call of parse_ast()')
-        raise CxParseError("InternalError",str(e),
-            severity="fatal"
-        ) from e
+    def parse(r):
+        try:
+            tree = parse_ast(source_code) #, filename=source_path)
+        except Exception as e:
+            logger.info('Exception during call of parse_ast()')
+            # Construct a CxError with useful info
+            err = CxParseError("SyntaxError", e.msg,
+                line=e.lineno or 0,
+                col=e.offset or 0,
+                severity="error"
+            )
+            raise err
+        except Exception as e:
+        # Catch-all fallback in case it's not a SyntaxError (e.g., internal failure)
+            logger.info('Exception during call of parse_ast()')
+            raise CxParseError("InternalError",str(e),
+                severity="fatal"
+            ) from e
+        print_status('tree')
+        return tree
 
-    print_status('tree')
-    #print(tree)
+    # the scope model: where each name lives, from the compiler's symbol tables
+    def scope_model(r):
+        model = build_scope_model(source_code, filename)
+        print_status('scope_model')
+        return model
 
     # create the cfgs
-    cfg_mgr = CFGManager()
-    cfg_mgr.load_from_ast(tree, source_code)
-    print_status('cfg_mgr')
-    #print(cfg_mgr)
+    def cfg(r):
+        cfg_mgr.load_from_ast(r['parse'], source_code)
+        print_status('cfg_mgr')
+        return cfg_mgr
 
     # === Tokenization ===
-    tokens_core, tokens_from_tokenizer = cx_gen_tokens_core(source_code)
-    print_status('tokens_core', tokens_core)
-    tokens = cx_gen_tokens_name(tokens_core, tree)
-    print_status('tokens_name', tokens)
-    tokens_bs = cx_gen_tokens_bs(source_code)
+    def tokens_core(r):
+        token_store = TokenStore(source_code) # the one tokenizer pass for this request
+        tokens_core, tokens_from_tokenizer = cx_gen_tokens_core(source_code, token_store=token_store)
+        print_status('tokens_core', tokens_core)
+        return token_store, tokens_core, tokens_from_tokenizer
+
+    # === One AST pass feeding every ast-based generator ===
+    def ast_walk(r):
+        tokens_core = r['tokens_core'][1]
+        collectors = dict(
+            name_classifier=NameClassifier(get_token_lookup(tokens_core)),
+            real_stmts=RealStmtCollector(),
+            var_actions=VarActionExtractor(),
+            io_actions=IOActionExtractor(),
+            call_flows=CallFlowCollector(),
+            loopback_flows=LoopbackFlowExtractor(),
+            return_flows=ReturnRaiseVisitor(),
+            owners=OwnerBuilder(),
+        )
+        walk_ast(r['parse'], *collectors.values())
+        print_status('ast_walk')
+        return collectors
+
+    def tokens_name(r):
+        tokens = cx_gen_tokens_name(r['tokens_core'][1], r['parse'], classifier=r['ast_walk']['name_classifier'])
+        print_status('tokens_name', tokens)
+        return tokens
+
+    def tokens_bs(r):
+        return cx_gen_tokens_bs(source_code, token_store=r['tokens_core'][0])
 
     # === Statements ===
-    stmts_real = cx_gen_stmts_real(tree)
-    print_status('stmts_real', stmts_real)
-    stmts_synth = cx_gen_stmts_synth(tokens_from_tokenizer)
-    print_status('stmts_synth', stmts_synth)
-    stmts_head = cx_gen_stmts_head(tokens_from_tokenizer, stmts_real, stmts_synth)
-    print_status('stmts_head', stmts_head)
-    stmts = cx_gen_stmts(stmts_real, stmts_synth, stmts_head)
-    print_status('stmts', stmts)
-    #print(stmts)
+    def stmts_real(r):
+        stmts_real = cx_gen_stmts_real(r['parse'], collector=r['ast_walk']['real_stmts'])
+        print_status('stmts_real', stmts_real)
+        return stmts_real
+
+    def stmts_head(r):
+        # one token sweep finds the synthetic statements and every header end
+        stmts_synth, stmts_head = cx_gen_stmts_synth_head(r['tokens_core'][2], r['stmts_real'])
+        print_status('stmts_synth', stmts_synth)
+        print_status('stmts_head', stmts_head)
+        return stmts_synth, stmts_head
+
+    def stmts(r):
+        stmts = cx_gen_stmts(r['stmts_real'], *r['stmts_head'])
+        stmt_index = StatementIndex(stmts) # line/position -> statement lookups, shared below
+        print_status('stmts', stmts)
+        return stmts, stmt_index
 
     # === Actions ===
-    actions_var = cx_gen_actions_var(tree, tokens, stmts)
-    print_status('actions_var', actions_var)
-    actions_io  = cx_gen_actions_io(tree, tokens, stmts)
-    print_status('actions_io', actions_io)
-    
+    def actions_var(r):
+        stmts, stmt_index = r['stmts']
+        actions_var = cx_gen_actions_var(r['parse'], r['tokens_name'], stmts, collector=r['ast_walk']['var_actions'],
+                                         stmt_index=stmt_index, scope_model=r['scope_model'])
+        print_status('actions_var', actions_var)
+        return actions_var
+
+    def actions_io(r):
+        stmts, stmt_index = r['stmts']
+        actions_io = cx_gen_actions_io(r['parse'], r['tokens_name'], stmts, collector=r['ast_walk']['io_actions'],
+                                       stmt_index=stmt_index, scope_model=r['scope_model'])
+        print_status('actions_io', actions_io)
+        return actions_io
+
     # === Flows ===
-    flows_call = cx_gen_flows_call(tree, stmts)
-    print_status('flows_call', flows_call)
-    flows_loopback = cx_gen_flows_loopback(tree)
-    print_status('flows_loopback', flows_loopback)
-    flows_return_explicit = cx_gen_flows_return_explicit(tree)
-    print_status('flows_return_explicit', flows_return_explicit)
-    flows_return_implicit = cx_gen_flows_return_implicit(cfg_mgr)
-    print_status('flows_return_implicit', flows_return_implicit)
-    flows_return_from = flows_return_explicit + flows_return_implicit
-    print_status('flows_return_from', flows_return_from)
-    flows_return = cx_gen_flows_return(flows_return_from, flows_call)
-    print_status('flows_return', flows_return)
-    flows_endif = cx_gen_flows_endif(cfg_mgr)
-    print_status('flows_endif', flows_endif)
-    flows_loop = cx_gen_flows_loop(cfg_mgr)
-    print_status('flows_loop', flows_loop)
-    flows_if = cx_gen_flows_if(cfg_mgr)
-    print_status('flows_if', flows_if)
-    flows_break = cx_gen_flows_break(cfg_mgr)
-    print_status('flows_break', flows_break)
+    def flows_call(r):
+        stmts, stmt_index = r['stmts']
+        flows_call = cx_gen_flows_call(r['parse'], stmts, collector=r['ast_walk']['call_flows'], stmt_index=stmt_index)
+        print_status('flows_call', flows_call)
+        return flows_call
+
+    def flows_loopback(r):
+        flows_loopback = cx_gen_flows_loopback(r['parse'], collector=r['ast_walk']['loopback_flows'])
+        print_status('flows_loopback', flows_loopback)
+        return flows_loopback
+
+    def flows_return_explicit(r):
+        flows_return_explicit = cx_gen_flows_return_explicit(r['parse'], collector=r['ast_walk']['return_flows'])
+        print_status('flows_return_explicit', flows_return_explicit)
+        return flows_return_explicit
+
+    # implicit returns, end_if, loop, if and break flows: one pass over the CFGs
+    def flows_cfg(r):
+        cfg_flows = cx_gen_flows_cfg(r['cfg'], stats=stats)
+        for name in ('return_implicit', 'endif', 'loop', 'if', 'break'):
+            print_status(f'flows_{name}', cfg_flows[name])
+        return cfg_flows
+
+    def flows_return(r):
+        flows_return_from = [*r['flows_return_explicit'], *r['flows_cfg']['return_implicit']]
+        print_status('flows_return_from', flows_return_from)
+        flows_return = cx_gen_flows_return(flows_return_from, r['flows_call'])
+        print_status('flows_return', flows_return)
+        return flows_return
+
+    def flows_of(r):
+        cfg_flows = r['flows_cfg']
+        return (r['flows_call'], r['flows_return'], r['flows_loopback'],
+                cfg_flows['endif'], cfg_flows['break'], cfg_flows['if'], cfg_flows['loop'])
 
     # === Variables for html ===
-    allhilites = cx_gen_allhilites(actions_var, actions_io)
-    print_status('allhilites', allhilites)    
-    allarrows = cx_gen_allarrows(
-        flows_call,
-        flows_return,
-        flows_loopback,
-        flows_endif,
-        flows_break,
-        flows_if,
-        flows_loop
-    )
-    print_status('allarrows', allarrows)
-    allflows = cx_gen_flows_all(
-        flows_call,
-        flows_return,
-        flows_loopback,
-        flows_endif,
-        flows_break,
-        flows_if,
-        flows_loop
-    )
-    print_status('allflows', allflows)
+    def allhilites(r):
+        allhilites = cx_gen_allhilites(r['actions_var'], r['actions_io'])
+        print_status('allhilites', allhilites)
+        return allhilites
+
+    def allarrows(r):
+        allarrows = cx_gen_allarrows(*flows_of(r))
+        print_status('allarrows', allarrows)
+        return allarrows
+
+    def flows_all(r):
+        allflows = cx_gen_flows_all(*flows_of(r))
+        print_status('allflows', allflows)
+        return allflows
 
     # new for scopes
-    allscopes = cx_gen_scopes(tree, stmts)
-    print_status('allscopes', allscopes, drill=False)
-    #print(allscopes)
-    
-    html_output = cx_gen_html(filename, tokens, tokens_bs, stmts, actions_var, allhilites, allarrows, allflows, allscopes)
-    print_status('html_output')
+    def scopes(r):
+        allscopes = cx_gen_scopes(r['parse'], r['stmts'][0], token_store=r['tokens_core'][0],
+                                  collector=r['ast_walk']['owners'])
+        print_status('allscopes', allscopes, drill=False)
+        return allscopes
 
+    def html(r):
+        stmts, stmt_index = r['stmts']
+        html_output = cx_gen_html(filename, r['tokens_name'], r['tokens_bs'], stmts, r['actions_var'],
+                                  r['allhilites'], r['allarrows'], r['flows_all'], r['scopes'], stmt_index=stmt_index)
+        print_status('html_output')
+        return html_output
+
+    all_flows = ('flows_call', 'flows_return', 'flows_loopback', 'flows_cfg')
+    return [
+        Stage('parse', parse),
+        Stage('scope_model', scope_model),
+        Stage('cfg', cfg, ('parse',)),
+        Stage('tokens_core', tokens_core),
+        Stage('ast_walk', ast_walk, ('parse', 'tokens_core')),
+        Stage('tokens_name', tokens_name, ('parse', 'tokens_core', 'ast_walk')),
+        Stage('tokens_bs', tokens_bs, ('tokens_core',)),
+        Stage('stmts_real', stmts_real, ('parse', 'ast_walk')),
+        Stage('stmts_head', stmts_head, ('tokens_core', 'stmts_real')),
+        Stage('stmts', stmts, ('stmts_real', 'stmts_head')),
+        Stage('actions_var', actions_var, ('parse', 'tokens_name', 'stmts', 'ast_walk', 'scope_model')),
+        Stage('actions_io', actions_io, ('parse', 'tokens_name', 'stmts', 'ast_walk', 'scope_model')),
+        Stage('flows_call', flows_call, ('parse', 'stmts', 'ast_walk')),
+        Stage('flows_loopback', flows_loopback, ('parse', 'ast_walk')),
+        Stage('flows_return_explicit', flows_return_explicit, ('parse', 'ast_walk')),
+        Stage('flows_cfg', flows_cfg, ('cfg',)),
+        Stage('flows_return', flows_return, ('flows_return_explicit', 'flows_cfg', 'flows_call')),
+        Stage('allhilites', allhilites, ('actions_var', 'actions_io')),
+        Stage('allarrows', allarrows, all_flows),
+        Stage('flows_all', flows_all, all_flows),
+        Stage('scopes', scopes, ('parse', 'stmts', 'tokens_core', 'ast_walk')),
+        Stage('html', html, ('tokens_name', 'tokens_bs', 'stmts', 'actions_var', 'allhilites', 'allarrows',
+                             'flows_all', 'scopes')),
+    ]
+
+
+def cx_gen_src2html_with_stats(source_code, filename='CodeXplorer', trace_memory=None, cache=None):
+    """Run the pipeline and return (html, PipelineStats) with per-stage wall/cpu (and optional memory) figures.
+
+    With an AnalysisCache, identical (source, filename) requests are served from it.
+    """
+    stats = PipelineStats(trace_memory=trace_memory, label=filename)
+    try:
+        if cache is None:
+            html_output = cx_gen_src2html(source_code, filename=filename, stats=stats)
+        else:
+            html_output = _cx_gen_src2html_cached(source_code, filename, stats, cache)
+    finally:
+        stats.finish()
+    return html_output, stats
+
+
+def _cx_gen_src2html_cached(source_code, filename, stats, cache):
+    with stats.stage('cache_lookup'):
+        key = make_cache_key(source_code, filename)
+        html_output = cache.get(key)
+    if html_output is not None:
+        stats.cache_hit = True
+        return html_output
+
+    intermediates = {} if cache.keep_intermediates else None
+    html_output = cx_gen_src2html(source_code, filename=filename, stats=stats, intermediates=intermediates)
+    with stats.stage('cache_store'):
+        cache.put(key, html_output, intermediates)
     return html_output
 
 
@@ -166,12 +325,15 @@ if __name__ == '__main__':
         print("Usage: python cx_gen_src2html.py <source.py>")
         sys.exit(1)
 
+    logging.basicConfig(level=os.environ.get('LOG_LEVEL', 'INFO').upper(), format='%(message)s')
+
     source_path = sys.argv[1]
     source_code = read_source_file(source_path)
 
     try:
-       html_output = cx_gen_src2html(source_code, filename=source_path)
+       html_output, stats = cx_gen_src2html_with_stats(source_code, filename=source_path)
        #print(html_output)
+       logger.info(stats.format_table())
     except Exception as e:
         print('Error during cx_gen_src2html()')
         print(e)
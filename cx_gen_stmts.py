@@ -4,14 +4,16 @@ from cx_utils import load_json_file, write_json_file, derive_filename
 def build_header_map(header_list):
     return {tuple(h["start"].values()): h["end_header"] for h in header_list}
 
+# a new list; statements that get an end_header are new dicts, the inputs are left as they are
 def cx_gen_stmts(real, synth, headers):
-    combined = real + synth
     header_map = build_header_map(headers)
 
-    for stmt in combined:
+    combined = []
+    for stmt in [*real, *synth]:
         key = tuple(stmt["start"].values())
         if key in header_map:
-            stmt["end_header"] = header_map[key]
+            stmt = {**stmt, "end_header": header_map[key]}
+        combined.append(stmt)
 
     return combined
 
@@ -38,20 +38,110 @@ def find_colon_after_start(tokens, start_line, start_col):
                 return {"line": tok.start[0], "col": tok.start[1]+1} # patch 9/3/25 - +1 , sto include the colon in stmt span
     return None
 
-def cx_gen_stmts_head(tokens, stmt_real, stmt_synth):
-    all_stmts = stmt_real + stmt_synth
+# Target keywords for synthetic statements (see cx_gen_stmts_synth)
+SYNTHETIC_KEYWORDS = {"elif", "else", "except", "finally"}
+
+def resolve_headers(tokens, compound_stmts, find_synth=True):
+    """One pass over the tokens that finds the header end of every compound statement.
+
+    Same rule as find_colon_after_start(), applied to all statements at once: from a statement's
+    start, the first ':' at bracket depth 0 (depth counted from that start) ends its header.
+    With find_synth, the elif/else/except/finally keywords found on the way become synthetic
+    statements; an 'else' only when its ':' comes before the end of the logical line (not the
+    'else' of a conditional expression).
+
+    Returns (synth_stmts, end_headers): end_headers[i] is the end_header of compound_stmts[i],
+    and of synth_stmts[i - len(compound_stmts)] after that, or None when no ':' was found.
+    """
+    n_real = len(compound_stmts)
+    order = sorted(range(n_real),
+                   key=lambda i: (compound_stmts[i]["start"]["line"], compound_stmts[i]["start"]["col"]))
+    starts = [(compound_stmts[i]["start"]["line"], compound_stmts[i]["start"]["col"]) for i in order]
+    next_start = 0
+
+    end_headers = [None] * n_real
+    synth = []
+    dropped = set()     # indexes into end_headers of 'else' keywords that turned out not to be statements
+    open_stmts = []     # [index into end_headers, bracket depth since the statement's start]
+    tentative = []      # open entries of 'else' keywords whose ':' has not been seen yet
+
+    for tok in tokens:
+        # statements starting at or before this token begin their search here
+        while next_start < n_real and starts[next_start] <= tok.start:
+            open_stmts.append([order[next_start], 0])
+            next_start += 1
+
+        tt, ts = tok.type, tok.string
+        if tt == tokenize.OP:
+            if not open_stmts:
+                continue
+            if ts in "([{":
+                for entry in open_stmts:
+                    entry[1] += 1
+            elif ts in ")]}":
+                for entry in open_stmts:
+                    if entry[1] > 0:
+                        entry[1] -= 1
+            elif ts == ":":
+                still_open = []
+                for entry in open_stmts:
+                    if entry[1] == 0:
+                        end_headers[entry[0]] = {"line": tok.start[0], "col": tok.start[1]+1} # +1, to include the colon in stmt span
+                    else:
+                        still_open.append(entry)
+                open_stmts = still_open
+                if tentative:
+                    tentative = [entry for entry in tentative if end_headers[entry[0]] is None]
+
+        elif tt == tokenize.NEWLINE:
+            # the logical line ended before these else's found a ':' - conditional expressions, not statements
+            for entry in tentative:
+                open_stmts.remove(entry)
+                dropped.add(entry[0])
+            tentative = []
+
+        elif find_synth and tt == tokenize.NAME and ts in SYNTHETIC_KEYWORDS:
+            synth.append({
+                "start": {"line": tok.start[0], "col": tok.start[1]},
+                "end": {"line": tok.end[0], "col": tok.end[1]},
+                "type": ts,
+                "is_compound": True,  # These always introduce a block
+                "is_synthetic": True
+            })
+            end_headers.append(None)
+            entry = [len(end_headers) - 1, 0]
+            open_stmts.append(entry)
+            if ts == 'else':
+                tentative.append(entry)
+
+    for entry in tentative:
+        dropped.add(entry[0])
+    if dropped:
+        synth = [stmt for k, stmt in enumerate(synth) if n_real + k not in dropped]
+        end_headers = [eh for k, eh in enumerate(end_headers) if k not in dropped]
+    return synth, end_headers
+
+def _headers_list(stmts, end_headers):
     result = []
-    for stmt in all_stmts:
-        if stmt.get("is_compound"):
-            start = stmt["start"]
-            end_header = find_colon_after_start(tokens, start["line"], start["col"])
-            if end_header:
-                result.append({
-                    "start": start,
-                    "end_header": end_header
-                })
+    for stmt, end_header in zip(stmts, end_headers):
+        if end_header:
+            result.append({
+                "start": stmt["start"],
+                "end_header": end_header
+            })
     return result
 
+def cx_gen_stmts_head(tokens, stmt_real, stmt_synth):
+    all_stmts = [stmt for stmt in stmt_real + stmt_synth if stmt.get("is_compound")]
+    _, end_headers = resolve_headers(tokens, all_stmts, find_synth=False)
+    return _headers_list(all_stmts, end_headers)
+
+# the synthetic statements and all the headers, from one sweep over the tokens
+def cx_gen_stmts_synth_head(tokens, stmt_real):
+    compound = [stmt for stmt in stmt_real if stmt.get("is_compound")]
+    synth, end_headers = resolve_headers(tokens, compound, find_synth=True)
+    return synth, _headers_list(compound + synth, end_headers)
+
 if __name__ == "__main__":
     if len(sys.argv) < 2:
         print("Usage: python cx_gen_stmts_head.py <sourcefile.py>")
@@ -1,6 +1,7 @@
 import sys
 import ast
 from cx_utils import read_source_file, parse_ast, derive_filename, write_json_file, get_node_start, get_node_end
+from cx_ast_walk import AstCollector, walk_ast
 
 def is_real_stmt(node):
     return isinstance(node, (
@@ -11,27 +12,29 @@ def is_real_stmt(node):
         ast.Nonlocal, ast.Expr, ast.Pass, ast.Break, ast.Continue
     ))
 
-def cx_gen_stmts_real(tree):
-    statements = []
+class RealStmtCollector(AstCollector):
+    def __init__(self):
+        self.statements = []
 
-    class RealStmtVisitor(ast.NodeVisitor):
-        def visit(self, node):
-            if is_real_stmt(node):
-                start = get_node_start(node)
-                end = get_node_end(node)
-                stmt = {
-                    "start": start,
-                    "end": end,
-                    "type": type(node).__name__,
-                    "is_compound": hasattr(node, 'body'),
-                    "is_synthetic": False
-                }
-                statements.append(stmt)
-            self.generic_visit(node)
-
-    RealStmtVisitor().visit(tree)
-    return statements
+    def visit_any(self, node, walker):
+        if is_real_stmt(node):
+            start = get_node_start(node)
+            end = get_node_end(node)
+            stmt = {
+                "start": start,
+                "end": end,
+                "type": type(node).__name__,
+                "is_compound": hasattr(node, 'body'),
+                "is_synthetic": False
+            }
+            self.statements.append(stmt)
 
+# collector: optional RealStmtCollector already driven by a shared walk_ast() pass
+def cx_gen_stmts_real(tree, collector=None):
+    if collector is None:
+        collector = RealStmtCollector()
+        walk_ast(tree, collector)
+    return collector.statements
     
 if __name__ == "__main__":
     if len(sys.argv) < 2:
@@ -1,15 +1,16 @@
 # cx_gen_tokens_bs.py
 from __future__ import annotations
 
-import io
 import json
 import os
 import sys
 import tokenize
-from typing import List, Dict
+from typing import List, Dict, Optional
+
+from cx_token_store import TokenStore, get_token_store
 
 # fins the line-continue \ tokens in the source code (since the Python tokenizer skips these)
-def cx_gen_tokens_bs(s: str) -> List[Dict]:
+def cx_gen_tokens_bs(s: str, token_store: Optional[TokenStore] = None) -> List[Dict]:
     """
     Return a list of dicts for each explicit line continuation backslash found.
     Each item: {"line": int, "col": int, "pre_ws": str}
@@ -17,15 +18,17 @@ def cx_gen_tokens_bs(s: str) -> List[Dict]:
       - col:  0-based column index of the backslash on that line
       - pre_ws: the exact whitespace (spaces/tabs) immediately preceding the backslash
     Backslashes that occur inside STRING or COMMENT tokens are ignored.
+    If a shared TokenStore is passed, its tokens are reused instead of re-tokenizing.
     """
-    lines = s.splitlines(keepends=True)  # preserve newlines per line
+    store = get_token_store(s, token_store)
+    lines = store.lines  # preserve newlines per line
     nlines = len(lines)
 
     # Build per-line coverage ranges for STRING and COMMENT tokens so we can exclude \ inside them
     covered: List[List[tuple[int, int]]] = [[] for _ in range(nlines + 1)]  # 1-based index
 
-    try:
-        for tok in tokenize.generate_tokens(io.StringIO(s).readline):
+    if store.token_error is None:
+        for tok in store.raw:
             if tok.type not in (tokenize.STRING, tokenize.COMMENT):
                 continue
             (srow, scol) = tok.start
@@ -43,9 +46,7 @@ def cx_gen_tokens_bs(s: str) -> List[Dict]:
                     start = 0
                     end = len(lines[row - 1].rstrip("\r\n"))
                 covered[row].append((start, end))
-    except tokenize.TokenError:
-        # If tokenization fails (e.g., incomplete file), fall back to no exclusions
-        covered = [[] for _ in range(nlines + 1)]
+    # If tokenization failed (e.g., incomplete file), fall back to no exclusions
 
     results: List[Dict] = []
 
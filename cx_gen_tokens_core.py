@@ -1,28 +1,12 @@
 import sys
-import tokenize
-import keyword
-from io import BytesIO
 from cx_utils import derive_filename, write_json_file, read_source_file
+from cx_token_store import get_token_store, tokens_to_dicts
 
-def cx_gen_tokens_core(source_code):
-    token_list = []
-    tokens = []
-    g = tokenize.tokenize(BytesIO(source_code.encode('utf-8')).readline)
-    for token in g:
-        tokens.append(token)
-        if token.type == tokenize.ENCODING or token.type == tokenize.ENDMARKER:
-            continue
-        tok_info = {
-            "start": {"line": token.start[0], "col": token.start[1]},
-            "end": {"line": token.end[0], "col": token.end[1]},
-            "text": token.string,
-            "type": tokenize.tok_name[token.type]
-        }
-        # vary from tokenizer - we can recognize keywords here
-        if keyword.iskeyword(tok_info["text"]):
-            tok_info["type"] = "NAME_KEYWORD" # this is not a pure tokenizer type
-        token_list.append(tok_info)
-    return token_list, tokens
+# token_store: optional shared TokenStore, so the source is tokenized only once per request
+def cx_gen_tokens_core(source_code, token_store=None):
+    store = get_token_store(source_code, token_store)
+    store.check()
+    return store.core, store.raw
 
 if __name__ == "__main__":
     if len(sys.argv) < 2:
@@ -33,6 +17,6 @@ if __name__ == "__main__":
     source = read_source_file(filename)
     token_list, tokens = cx_gen_tokens_core(source)
     output_filename = derive_filename(filename, "tokens","core", sep='_')
-    write_json_file(token_list, output_filename)
+    write_json_file(tokens_to_dicts(token_list), output_filename)
     print(f"Wrote {len(token_list)} tokens to {output_filename}")
     #print(tokens)
@@ -5,6 +5,7 @@
 
 import sys
 import ast
+import bisect
 from cx_utils import (
     read_source_file,
     write_json_file,
@@ -12,6 +13,8 @@ from cx_utils import (
     derive_filename,
     parse_ast
 )
+from cx_ast_walk import AstCollector, walk_ast
+from cx_token_store import tokens_from_dicts, tokens_to_dicts
 
 VALID_TYPE_NAMES = {
     "variable",
@@ -29,14 +32,36 @@ VALID_TYPE_NAMES = {
 
 def get_token_lookup(tokens):
     return {
-        (t['start']['line'], t['start']['col']): t
+        (t.line, t.col): t
         for t in tokens
-        if t.get('type') == 'NAME'
+        if t.type == 'NAME'
     }
 
-class NameClassifier(ast.NodeVisitor):
+# position of the identifier of an ast.Attribute (the part after the '.')
+def attr_name_pos(node):
+    line = getattr(node, 'end_lineno', node.lineno)
+    col  = getattr(node, 'end_col_offset', node.col_offset) - len(node.attr)
+    return line, col
+
+# line -> (cols, tokens): the NAME tokens starting on each line, in column order
+def build_line_index(token_lookup):
+    by_line = {}
+    for (line, col), tok in sorted(token_lookup.items(), key=lambda item: item[0]):
+        cols, toks = by_line.setdefault(line, ([], []))
+        cols.append(col)
+        toks.append(tok)
+    return by_line
+
+class NameClassifier(AstCollector):
+    # the tokens are not changed: the classification is collected in type_names, (line, col) -> type_name,
+    # and cx_gen_tokens_name() returns new tokens carrying it
     def __init__(self, token_lookup):
         self.token_lookup = token_lookup
+        self.by_line = build_line_index(token_lookup)
+        self.type_names = {}
+
+    def _is_unclassified(self, tok):
+        return tok.type_name is None and (tok.line, tok.col) not in self.type_names
 
     # added 8/31/25 - to support correct function/method name finding
     def _mark_by_pos(self, lineno, col, name_text, type_name):
@@ -44,95 +69,86 @@ class NameClassifier(ast.NodeVisitor):
         isn't present, fall back to the nearest NAME with the same text on that
         line at or after `col`."""
         tok = self.token_lookup.get((lineno, col))
-        if tok and tok.get('text') == name_text:
-            tok['type_name'] = type_name
+        if tok and tok.text == name_text:
+            self.type_names[(tok.line, tok.col)] = type_name
             return True
         # Fallback: same line, matching text, nearest col >= given col
-        candidates = [((l, c), t) for (l, c), t in self.token_lookup.items()
-                      if l == lineno and t.get('text') == name_text and c >= col]
-        if candidates:
-            (_, _c), t = min(candidates, key=lambda x: x[0][1])
-            t['type_name'] = type_name
-            return True
+        entry = self.by_line.get(lineno)
+        if entry:
+            cols, toks = entry
+            for t in toks[bisect.bisect_left(cols, col):]:
+                if t.text == name_text:
+                    self.type_names[(t.line, t.col)] = type_name
+                    return True
         return False
 
     def _mark_by_text(self, lineno, name_text, type_name):
-        for (line, col), token in self.token_lookup.items():
-            if line == lineno and token.get('text') == name_text:
-                token['type_name'] = type_name
-                return
-
-    def visit_FunctionDef(self, node):
+        entry = self.by_line.get(lineno)
+        if entry:
+            for token in entry[1]:
+                if token.text == name_text:
+                    self.type_names[(token.line, token.col)] = type_name
+                    return
+
+    def visit_FunctionDef(self, node, walker):
         self._mark_by_text(node.lineno, node.name, 'function_def')
         for arg in node.args.args:
             if hasattr(arg, 'lineno') and hasattr(arg, 'col_offset'):
                 self._mark_by_text(arg.lineno, arg.arg, 'parameter')
-        self.generic_visit(node)
 
-    def visit_AsyncFunctionDef(self, node):
-        self.visit_FunctionDef(node)
+    def visit_AsyncFunctionDef(self, node, walker):
+        self.visit_FunctionDef(node, walker)
 
-    def visit_ClassDef(self, node):
+    def visit_ClassDef(self, node, walker):
         self._mark_by_text(node.lineno, node.name, 'class_def')
-        self.generic_visit(node)
 
-    def visit_Call(self, node):
+    def visit_Call(self, node, walker):
         func = node.func
         if isinstance(func, ast.Name):
             # self._mark_by_text(func.lineno, func.id, 'function_call')
             # Tag the specific occurrence (fixes multiple calls on one line)
             self._mark_by_pos(func.lineno, func.col_offset, func.id, 'function_call')
         elif isinstance(func, ast.Attribute):
-            if hasattr(func, 'attr_node'):
-                #self._mark_by_text(func.attr_node.lineno, func.attr_node.id, 'function_call')
-                # fix 8/31/25 - identify method name
-                self._mark_by_pos(func.attr_node.lineno, func.attr_node.col_offset, func.attr_node.id, 'function_call')
-        self.generic_visit(node)
-
-    #def visit_Attribute(self, node):
-    #    if hasattr(node, 'attr_node'):
-    #        self._mark_by_text(node.attr_node.lineno, node.attr_node.id, 'attribute')
-    #    self.generic_visit(node)
+            # fix 8/31/25 - identify method name
+            line, col = attr_name_pos(func)
+            self._mark_by_pos(line, col, func.attr, 'function_call')
+
     # fix 8/31/25 - for method name finding
-    def visit_Attribute(self, node):
-        if hasattr(node, 'attr_node'):
-            key = (node.attr_node.lineno, node.attr_node.col_offset)
-            tok = self.token_lookup.get(key)
-            # Only tag as 'attribute' if nothing else (like 'function_call') has been set.
-            if tok and 'type_name' not in tok:
-                tok['type_name'] = 'attribute'
-        self.generic_visit(node)
-
-    def visit_ImportFrom(self, node):
+    def visit_Attribute(self, node, walker):
+        key = attr_name_pos(node)
+        tok = self.token_lookup.get(key)
+        # Only tag as 'attribute' if nothing else (like 'function_call') has been set.
+        if tok and self._is_unclassified(tok):
+            self.type_names[key] = 'attribute'
+
+    def visit_ImportFrom(self, node, walker):
         for alias in node.names:
             name = alias.asname if alias.asname else alias.name
             self._mark_by_text(node.lineno, name, 'imported_name')
-        self.generic_visit(node)
 
-    def visit_Import(self, node):
+    def visit_Import(self, node, walker):
         for alias in node.names:
             name = alias.asname if alias.asname else alias.name
             self._mark_by_text(node.lineno, name, 'imported_name')
-        self.generic_visit(node)
 
-    def visit_ExceptHandler(self, node):
+    def visit_ExceptHandler(self, node, walker):
         if node.name and isinstance(node.name, str):
             self._mark_by_text(node.lineno, node.name, 'exception')
         if node.type and isinstance(node.type, ast.Name):
             self._mark_by_text(node.type.lineno, node.type.id, 'class_reference')
-        self.generic_visit(node)
 
-    def visit_Name(self, node):
+    def visit_Name(self, node, walker):
         key = (node.lineno, node.col_offset)
-        if key in self.token_lookup and 'type_name' not in self.token_lookup[key]:
-            self.token_lookup[key]['type_name'] = 'variable'
-        self.generic_visit(node)
+        tok = self.token_lookup.get(key)
+        if tok and self._is_unclassified(tok):
+            self.type_names[key] = 'variable'
 
 #def enrich_ast_nodes(tree):
 #    for node in ast.walk(tree):
 #        if isinstance(node, ast.Attribute):
 #            node.attr_node = ast.Name(id=node.attr, ctx=node.ctx, lineno=node.lineno, col_offset=node.col_offset)
 # fix 8/31/25 - correct function/method name finding
+# no longer called by cx_gen_tokens_name - attr_name_pos() computes the same position without mutating the tree
 def enrich_ast_nodes(tree):
     for node in ast.walk(tree):
         if isinstance(node, ast.Attribute):
@@ -147,18 +163,24 @@ def enrich_ast_nodes(tree):
                 col_offset=col,
             )
 
-# augment the NAME tokens with their type (via utility functions and ast tree walk)
-def cx_gen_tokens_name(tokens, ast_tree):
-    token_lookup = get_token_lookup(tokens)
-    enrich_ast_nodes(ast_tree)
-    classifier = NameClassifier(token_lookup)
-    classifier.visit(ast_tree)
-
+# the tokens, with the NAME tokens carrying their type (via utility functions and ast tree walk);
+# returns a new list, the tokens passed in are left as they are
+# classifier: optional NameClassifier (built on these tokens) already driven by a shared walk_ast() pass
+def cx_gen_tokens_name(tokens, ast_tree, classifier=None):
+    if classifier is None:
+        classifier = NameClassifier(get_token_lookup(tokens))
+        walk_ast(ast_tree, classifier)
+
+    type_names = classifier.type_names
+    named = []
+    append = named.append
     for token in tokens:
-        if token.get('type') == 'NAME' and 'type_name' not in token:
-            token['type_name'] = 'unknown'
-
-    return tokens
+        if token.type == 'NAME':
+            type_name = type_names.get((token.line, token.col), token.type_name) or 'unknown'
+            if type_name != token.type_name:
+                token = token._replace(type_name=type_name)
+        append(token)
+    return named
 
 
 if __name__ == '__main__':
@@ -168,12 +190,12 @@ if __name__ == '__main__':
 
     source_filename = sys.argv[1]
     source_code = read_source_file(source_filename) # get source code
-    tokens = load_json_file(derive_filename(source_filename, 'tokens', 'core')) # read tokens_core json
+    tokens = tokens_from_dicts(load_json_file(derive_filename(source_filename, 'tokens', 'core'))) # read tokens_core json
 
     tree = parse_ast(source_code, filename=source_filename) # create ast tree
 
-    cx_gen_tokens_name(tokens, tree) # augment token json with name types
+    tokens = cx_gen_tokens_name(tokens, tree) # augment token json with name types
 
     output_path = derive_filename(source_filename, 'tokens')
-    write_json_file(tokens, output_path)
+    write_json_file(tokens_to_dicts(tokens), output_path)
     print(f"Wrote {len(tokens)} tokens to {output_path}")
@@ -0,0 +1,383 @@
+# cx_project.py
+# Project mode: call and return flows between the modules of a directory.
+#
+# ProjectIndex keeps, in an sqlite database, one analysis per .py file under a root directory:
+#   files    - path (relative to the root, '/'-separated), module name, size, mtime, sha256
+#   defs     - the module's functions, methods and classes (its symbol table)
+#   imports  - what each import statement binds: local name -> module (and name, for from-imports)
+#   calls    - call sites whose target is a plain or dotted name (f(), mod.f(), pkg.mod.Cls())
+#   returns  - explicit and implicit return points of each function/method
+# update() re-analyzes only the files whose size/mtime changed and whose content hash then
+# differs; the other rows are reused as they are. The flows are resolved from the tables alone,
+# so after a one-file edit only that file is read and parsed.
+#
+# Resolution covers what names and imports determine: f() for a from-imported f, mod.f() and
+# mod.Cls() through an imported module, re-exports through a package's imports. Calls on other
+# receivers (obj.m()) need types and are left to nothing, as in cx_gen_flows_call; calls within
+# a file are cx_gen_flows_call's job, so only flows that cross files are reported here.
+#
+# Usage:
+#   python cx_project.py <root> [--db path] [--output flows.json]
+
+import os
+import ast
+import sqlite3
+import hashlib
+import logging
+import argparse
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from cx_utils import parse_ast, write_json_file
+from cx_ast_walk import AstCollector, walk_ast
+from cx_gen_flows_call import CallFlowCollector
+from cx_gen_flows_return_explicit import ReturnRaiseVisitor
+from cx_gen_flows_cfg import cx_gen_flows_cfg
+from cx_cfg6 import CFGManager
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever the tables or the per-file analysis change; an index of another version is rebuilt.
+INDEX_VERSION = 1
+
+DEFAULT_DB_NAME = '.cx_project.sqlite'
+
+SKIP_DIRS = {'.git', '.hg', '.svn', '__pycache__', '.tox', '.venv', 'venv', 'node_modules'}
+
+# how many re-exports (from .x import f in a package) are followed before giving up
+MAX_REEXPORT_HOPS = 8
+
+_SCHEMA = """
+CREATE TABLE files (path TEXT PRIMARY KEY, module TEXT NOT NULL, is_package INTEGER NOT NULL,
+                    size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, sha256 TEXT NOT NULL,
+                    error TEXT);
+CREATE TABLE defs (path TEXT NOT NULL, qualname TEXT NOT NULL, line INTEGER NOT NULL,
+                   type TEXT NOT NULL, class TEXT, has_init INTEGER);
+CREATE TABLE imports (path TEXT NOT NULL, line INTEGER NOT NULL, local TEXT NOT NULL,
+                      module TEXT NOT NULL, name TEXT);
+CREATE TABLE calls (path TEXT NOT NULL, line INTEGER NOT NULL, stmt INTEGER NOT NULL,
+                    target TEXT NOT NULL);
+CREATE TABLE returns (path TEXT NOT NULL, scope TEXT NOT NULL, scope_type TEXT NOT NULL,
+                      line INTEGER NOT NULL, return_type TEXT NOT NULL, is_raise INTEGER NOT NULL);
+CREATE INDEX defs_path ON defs (path);
+CREATE INDEX imports_path ON imports (path);
+CREATE INDEX calls_path ON calls (path);
+CREATE INDEX returns_path ON returns (path);
+"""
+
+_TABLES = ('defs', 'imports', 'calls', 'returns')
+
+
+def module_name(path: str) -> Tuple[str, bool]:
+    """(dotted module name, is_package) of a root-relative 'a/b/c.py' or 'a/b/__init__.py' path."""
+    parts = path[:-3].split('/')
+    if parts[-1] == '__init__':
+        return '.'.join(parts[:-1]), True
+    return '.'.join(parts), False
+
+
+def resolve_relative(module: str, is_package: bool, level: int, target: Optional[str]) -> str:
+    """The absolute module named by 'from <level dots><target> import ...' inside module."""
+    if level == 0:
+        return target or ''
+    package = module.split('.') if is_package else module.split('.')[:-1]
+    base = package[:len(package) - (level - 1)] if level > 1 else package
+    return '.'.join(base + ([target] if target else []))
+
+
+def _dotted_name(node: ast.AST) -> Optional[str]:
+    """'a.b.c' for a Name/Attribute chain, else None."""
+    parts = []
+    while isinstance(node, ast.Attribute):
+        parts.append(node.attr)
+        node = node.value
+    if not isinstance(node, ast.Name):
+        return None
+    parts.append(node.id)
+    return '.'.join(reversed(parts))
+
+
+class ProjectCollector(AstCollector):
+    """Collects the imports and the name-addressed call sites of one module during the shared walk."""
+
+    def __init__(self, module: str, is_package: bool):
+        self.module = module
+        self.is_package = is_package
+        self.imports = []  # (line, local name, module, imported name or None)
+        self.calls = []    # (line, statement line, dotted target)
+
+    def visit_Import(self, node, walker):
+        for alias in node.names:
+            if alias.asname:
+                self.imports.append((node.lineno, alias.asname, alias.name, None))
+            else:
+                # 'import a.b' binds a, and a.b.f() names module a.b through it
+                self.imports.append((node.lineno, alias.name, alias.name, None))
+
+    def visit_ImportFrom(self, node, walker):
+        source = resolve_relative(self.module, self.is_package, node.level, node.module)
+        for alias in node.names:
+            if alias.name != '*':
+                self.imports.append((node.lineno, alias.asname or alias.name, source, alias.name))
+
+    def visit_Call(self, node, walker):
+        target = _dotted_name(node.func)
+        if target is None:
+            return
+        stmt_line = node.lineno
+        for parent in reversed(walker.parents):
+            if isinstance(parent, ast.stmt):
+                stmt_line = parent.lineno
+                break
+        self.calls.append((node.lineno, stmt_line, target))
+
+
+def analyze_source(source: str, module: str, is_package: bool) -> Dict[str, List[Tuple]]:
+    """Table rows (without the path column) for one module's source; raises SyntaxError."""
+    tree = parse_ast(source)
+    defs_collector = CallFlowCollector()
+    project = ProjectCollector(module, is_package)
+    returns = ReturnRaiseVisitor()
+    walk_ast(tree, defs_collector, project, returns)
+
+    func_defs, class_defs = defs_collector.defs()
+    defs = [(name, info['line'], info['type'], info.get('class'), None) for name, info in func_defs.items()]
+    defs += [(name, info['line'], 'class', None, int(info['has_init'])) for name, info in class_defs.items()]
+
+    return_rows = [(r['scope'], r['scope_type'], r['stmt_from'], r['return_type'], int(r['is_raise']))
+                   for r in returns.results()]
+    try:
+        cfg_mgr = CFGManager()
+        cfg_mgr.load_from_ast(tree, source)
+        implicit = cx_gen_flows_cfg(cfg_mgr)['return_implicit']
+    except Exception as e:  # the CFG builder does not cover every construct yet
+        logger.info('%s: no implicit returns (%s: %s)', module, type(e).__name__, e)
+        implicit = []
+    return_rows += [(r['scope'], r['scope_type'], r['stmt_from'], r['return_type'], int(r['is_raise']))
+                    for r in implicit if r['scope'] != '<global>']
+
+    return {'defs': defs, 'imports': project.imports, 'calls': project.calls, 'returns': return_rows}
+
+
+def iter_source_files(root: str) -> Iterator[str]:
+    """Root-relative '/'-separated paths of the .py files under root, in sorted order."""
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if d not in SKIP_DIRS and not d.startswith('.'))
+        rel_dir = os.path.relpath(dirpath, root)
+        for filename in sorted(filenames):
+            if filename.endswith('.py'):
+                rel = filename if rel_dir == '.' else os.path.join(rel_dir, filename)
+                yield rel.replace(os.sep, '/')
+
+
+class ProjectIndex:
+    def __init__(self, root: str, db_path: Optional[str] = None):
+        self.root = os.path.abspath(root)
+        self.db_path = db_path or os.path.join(self.root, DEFAULT_DB_NAME)
+        self.conn = sqlite3.connect(self.db_path)
+        if self.conn.execute('PRAGMA user_version').fetchone()[0] != INDEX_VERSION:
+            self._create()
+
+    def _create(self) -> None:
+        with self.conn:
+            for (name,) in self.conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'").fetchall():
+                self.conn.execute(f'DROP TABLE {name}')
+            self.conn.executescript(_SCHEMA)
+            self.conn.execute(f'PRAGMA user_version = {INDEX_VERSION}')
+
+    def close(self) -> None:
+        self.conn.close()
+
+    # --- indexing ---
+
+    def update(self) -> Dict[str, int]:
+        """Brings the index in line with the files under root; returns counts of what was done."""
+        counts = {'files': 0, 'analyzed': 0, 'unchanged': 0, 'removed': 0, 'errors': 0}
+        known = {path: (size, mtime_ns, sha256) for path, size, mtime_ns, sha256
+                 in self.conn.execute('SELECT path, size, mtime_ns, sha256 FROM files')}
+        with self.conn:
+            for path in iter_source_files(self.root):
+                counts['files'] += 1
+                st = os.stat(os.path.join(self.root, path))
+                old = known.pop(path, None)
+                if old is not None and old[:2] == (st.st_size, st.st_mtime_ns):
+                    counts['unchanged'] += 1
+                    continue
+                with open(os.path.join(self.root, path), 'rb') as f:
+                    data = f.read()
+                digest = hashlib.sha256(data).hexdigest()
+                if old is not None and old[2] == digest:  # touched, not changed
+                    self.conn.execute('UPDATE files SET size = ?, mtime_ns = ? WHERE path = ?',
+                                      (st.st_size, st.st_mtime_ns, path))
+                    counts['unchanged'] += 1
+                    continue
+                error = self._analyze(path, data, digest, st)
+                counts['analyzed'] += 1
+                counts['errors'] += error is not None
+            for path in known:  # deleted since the last update
+                self._remove(path)
+                counts['removed'] += 1
+        return counts
+
+    def _remove(self, path: str) -> None:
+        for table in _TABLES + ('files',):
+            self.conn.execute(f'DELETE FROM {table} WHERE path = ?', (path,))
+
+    def _analyze(self, path: str, data: bytes, digest: str, st: os.stat_result) -> Optional[str]:
+        module, is_package = module_name(path)
+        self._remove(path)
+        error = None
+        try:
+            rows = analyze_source(data.decode('utf-8', 'replace'), module, is_package)
+        except (SyntaxError, ValueError) as e:
+            error = f'{type(e).__name__}: {e}'
+            rows = {table: [] for table in _TABLES}
+        self.conn.execute('INSERT INTO files VALUES (?, ?, ?, ?, ?, ?, ?)',
+                          (path, module, int(is_package), st.st_size, st.st_mtime_ns, digest, error))
+        self.conn.executemany('INSERT INTO defs VALUES (?, ?, ?, ?, ?, ?)', [(path,) + r for r in rows['defs']])
+        self.conn.executemany('INSERT INTO imports VALUES (?, ?, ?, ?, ?)', [(path,) + r for r in rows['imports']])
+        self.conn.executemany('INSERT INTO calls VALUES (?, ?, ?, ?)', [(path,) + r for r in rows['calls']])
+        self.conn.executemany('INSERT INTO returns VALUES (?, ?, ?, ?, ?, ?)', [(path,) + r for r in rows['returns']])
+        return error
+
+    # --- queries ---
+
+    def import_graph(self) -> Dict[str, List[str]]:
+        """module -> the project modules it imports (from-imports of a submodule count as that module)."""
+        modules = {module: path for path, module in self.conn.execute('SELECT path, module FROM files')}
+        graph: Dict[str, set] = {module: set() for module in modules}
+        for importer, module, name in self.conn.execute(
+                'SELECT f.module, i.module, i.name FROM imports i JOIN files f ON f.path = i.path'):
+            if name is not None and f'{module}.{name}' in modules:
+                graph[importer].add(f'{module}.{name}')
+            elif module in modules:
+                graph[importer].add(module)
+        return {module: sorted(imported) for module, imported in graph.items()}
+
+    def resolve_flows(self) -> Dict[str, List[Dict[str, Any]]]:
+        """{'call': [...], 'return': [...]}: the flows from one file to another."""
+        modules = {module: path for path, module in self.conn.execute('SELECT path, module FROM files')}
+        module_of = {path: module for module, path in modules.items()}
+        defs: Dict[Tuple[str, str], Tuple] = {}
+        for path, qualname, line, def_type, cls, has_init in self.conn.execute(
+                'SELECT path, qualname, line, type, class, has_init FROM defs'):
+            defs.setdefault((path, qualname), (line, def_type, cls, has_init))
+        imports: Dict[str, Dict[str, Tuple[str, Optional[str]]]] = {}
+        for path, local, module, name in self.conn.execute(
+                'SELECT path, local, module, name FROM imports ORDER BY path, line'):
+            imports.setdefault(path, {})[local] = (module, name)
+
+        def lookup(module: str, qualname: str) -> Optional[Tuple[str, str]]:
+            """(path, qualname of the def) that module.qualname names, following re-exports."""
+            for _ in range(MAX_REEXPORT_HOPS):
+                path = modules.get(module)
+                if path is None:
+                    return None
+                head, _, rest = qualname.partition('.')
+                if (path, qualname) in defs:
+                    return path, qualname
+                bound = imports.get(path, {}).get(head)
+                if bound is None:
+                    return None
+                module, name = bound
+                if name is not None:
+                    if f'{module}.{name}' in modules:  # from pkg import submodule
+                        module, qualname = f'{module}.{name}', rest
+                    else:
+                        qualname = name + ('.' + rest if rest else '')
+                else:
+                    qualname = rest
+                if not qualname:
+                    return None
+            return None
+
+        def resolve(path: str, target: str) -> Optional[Tuple[str, str]]:
+            bound_names = imports.get(path, {})
+            parts = target.split('.')
+            # the longest dotted prefix bound by an import (import a.b binds 'a.b' as written)
+            for i in range(len(parts), 0, -1):
+                bound = bound_names.get('.'.join(parts[:i]))
+                if bound is None:
+                    continue
+                module, name = bound
+                rest = parts[i:]
+                if name is not None:
+                    if f'{module}.{name}' in modules:
+                        return lookup(f'{module}.{name}', '.'.join(rest)) if rest else None
+                    return lookup(module, '.'.join([name] + rest))
+                if not rest:
+                    return None
+                # import a: a.b.f() may name module a.b
+                for j in range(len(rest) - 1, -1, -1):
+                    sub = '.'.join([module] + rest[:j])
+                    if sub in modules:
+                        return lookup(sub, '.'.join(rest[j:]))
+                return None
+            return None
+
+        call_flows: List[Dict[str, Any]] = []
+        callers: Dict[Tuple[str, str], Dict[str, List[int]]] = {}  # def -> caller path -> stmt lines
+        for path, line, stmt, target in self.conn.execute(
+                'SELECT path, line, stmt, target FROM calls ORDER BY path, line'):
+            found = resolve(path, target)
+            if found is None or found[0] == path:
+                continue
+            def_path, qualname = found
+            def_line, def_type, cls, has_init = defs[(def_path, qualname)]
+            if def_type == 'class':  # constructor call
+                init = defs.get((def_path, f'{qualname}.__init__'))
+                if init is None:
+                    continue
+                qualname, def_line, def_type = f'{qualname}.__init__', init[0], 'constructor'
+            call_flows.append({
+                'file_from': path,
+                'stmt_from': stmt,
+                'file_to': def_path,
+                'stmt_to': def_line,
+                'type': 'call',
+                'call_type': def_type,
+                'target_name': f'{module_of[def_path]}.{qualname}',
+            })
+            callers.setdefault((def_path, qualname), {}).setdefault(path, []).append(stmt)
+
+        return_flows: List[Dict[str, Any]] = []
+        for path, scope, scope_type, line, return_type, is_raise in self.conn.execute(
+                'SELECT path, scope, scope_type, line, return_type, is_raise FROM returns ORDER BY path, rowid'):
+            for caller_path, stmts in sorted(callers.get((path, scope), {}).items()):
+                return_flows.append({
+                    'file_from': path,
+                    'stmt_from': line,
+                    'return_type': return_type,
+                    'is_raise': bool(is_raise),
+                    'scope': scope,
+                    'scope_type': scope_type,
+                    'file_to': caller_path,
+                    'stmt_to': sorted(stmts),
+                    'type': 'return',
+                })
+        return {'call': call_flows, 'return': return_flows}
+
+
+# top level API
+def cx_project_flows(root: str, db_path: Optional[str] = None) -> Dict[str, List[Dict[str, Any]]]:
+    index = ProjectIndex(root, db_path)
+    try:
+        counts = index.update()
+        logger.info('Indexed %d files: %d analyzed, %d unchanged, %d removed, %d with errors',
+                    counts['files'], counts['analyzed'], counts['unchanged'], counts['removed'], counts['errors'])
+        return index.resolve_flows()
+    finally:
+        index.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Index a directory of Python modules and write the call/return flows between them.")
+    parser.add_argument("root", help="Project directory.")
+    parser.add_argument("--db", help=f"Index database (default: <root>/{DEFAULT_DB_NAME}).")
+    parser.add_argument("--output", help="Output JSON file (default: <root>/project.flows.json).")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=os.environ.get('LOG_LEVEL', 'INFO').upper(), format='%(message)s')
+    flows = cx_project_flows(args.root, args.db)
+    output_filename = args.output or os.path.join(args.root, 'project.flows.json')
+    write_json_file(flows, output_filename)
+    print(f"Wrote {len(flows['call'])} call and {len(flows['return'])} return flows to {output_filename}")
@@ -0,0 +1,177 @@
+# cx_scope_model.py
+# Name resolution for one module, from CPython's symtable (the compiler's own scope analysis).
+#
+# ScopeModel answers "which scope does this name live in?" for the scopes the shared AST walker
+# reports (walker.scope_name(): '<global>', 'func', 'Class.method', 'outer.inner', ...):
+#   - parameters and bound names of a function are its own
+#   - 'global' declarations and reads of names bound nowhere enclosing are '<global>'
+#   - 'nonlocal' declarations and closure reads go to the nearest enclosing function binding the
+#     name (class bodies are skipped, as in Python)
+# Lambdas and comprehensions have no walker scope of their own, so their variables are folded
+# into the enclosing named scope: [x for x in xs] binds x in that scope, as the walker sees it.
+# Two defs of one name in one scope share a walker scope name; their symbols are merged.
+#
+# The walker counts a def's decorators, defaults and annotations as part of the def, while Python
+# evaluates them in the enclosing scope; a name the def's own table lacks is looked up there.
+# The tables are built once per request (one native pass over the source); a lookup is a dict
+# access or a few. Names no table knows resolve to None, and callers fall back to their own rule.
+
+import sys
+import logging
+import symtable
+from typing import Dict, FrozenSet, List, Optional
+
+logger = logging.getLogger(__name__)
+
+GLOBAL_SCOPE = '<global>'
+
+# symtable names of the function scopes Python creates for expressions
+_ANONYMOUS_SCOPES = ('lambda', 'listcomp', 'setcomp', 'dictcomp', 'genexpr')
+
+
+class Scope:
+    __slots__ = ('name', 'kind', 'params', 'locals', 'globals', 'nonlocals', 'frees', '_where')
+
+    def __init__(self, name: str, kind: str):
+        self.name = name
+        self.kind = kind                           # 'module', 'class' or 'function'
+        self.params: FrozenSet[str] = frozenset()
+        self.locals: FrozenSet[str] = frozenset()  # bound here, parameters included
+        self.globals: FrozenSet[str] = frozenset() # declared 'global'
+        self.nonlocals: FrozenSet[str] = frozenset()
+        self.frees: FrozenSet[str] = frozenset()   # read from an enclosing function
+        self._where: Dict[str, str] = {}           # name -> scope it lives in
+
+    def resolve(self, name: str) -> Optional[str]:
+        """The scope name is read from or written to in this scope, or None if not seen here."""
+        return self._where.get(name)
+
+    def __repr__(self):
+        return f"Scope({self.name!r}, {self.kind}, {len(self._where)} names)"
+
+
+def _is_anonymous(table: symtable.SymbolTable) -> bool:
+    return table.get_type() not in ('module', 'class', 'function') or \
+        (table.get_type() == 'function' and table.get_name() in _ANONYMOUS_SCOPES)
+
+
+class ScopeModel:
+    def __init__(self, source_code: str, filename: str = '<unknown>'):
+        """Raises SyntaxError for code symtable rejects (e.g. 'nonlocal' at module level)."""
+        self.scopes: Dict[str, Scope] = {}
+        top = symtable.symtable(source_code, filename, 'exec')
+        # (table, walker scope name of the table, chain of (table, scope name) enclosing it)
+        stack = [(top, GLOBAL_SCOPE, [])]
+        while stack:
+            table, scope_name, chain = stack.pop()
+            self._add_table(table, scope_name, chain)
+            inner_chain = chain + [(table, scope_name)]
+            for child in table.get_children():
+                if _is_anonymous(child):
+                    child_name = scope_name
+                elif scope_name == GLOBAL_SCOPE:
+                    child_name = child.get_name()
+                else:
+                    child_name = f"{scope_name}.{child.get_name()}"
+                stack.append((child, child_name, inner_chain))
+
+    def _add_table(self, table: symtable.SymbolTable, scope_name: str, chain: List) -> None:
+        scope = self.scopes.get(scope_name)
+        folded = scope is not None  # an anonymous scope, or a second def of the same name
+        if scope is None:
+            kind = table.get_type() if table.get_type() in ('module', 'class') else 'function'
+            scope = self.scopes[scope_name] = Scope(scope_name, kind)
+
+        # inside a class, symtable keeps __names mangled (_Class__name); the walker sees them as written
+        classes = [t.get_name() for t, _ in chain + [(table, scope_name)] if t.get_type() == 'class']
+        mangled = f"_{classes[-1].lstrip('_')}__" if classes and classes[-1].lstrip('_') else None
+
+        params, bound, declared, nonlocals, frees = set(), set(), set(), set(), set()
+        for symbol in table.get_symbols():
+            name = symbol.get_name()
+            if name.startswith('.'):  # a comprehension's hidden iterator argument
+                continue
+            if mangled and name.startswith(mangled):
+                name = name[len(mangled) - 2:]
+            if table.get_type() == 'module':
+                where = GLOBAL_SCOPE
+                if symbol.is_local():
+                    bound.add(name)
+            elif symbol.is_global():
+                where = GLOBAL_SCOPE
+                if symbol.is_declared_global():
+                    declared.add(name)
+            elif symbol.is_free() or symbol.is_nonlocal():
+                where = self._enclosing_binder(symbol.get_name(), chain)
+                (nonlocals if symbol.is_nonlocal() else frees).add(name)
+            elif symbol.is_local():
+                where = scope_name
+                bound.add(name)
+                if symbol.is_parameter():
+                    params.add(name)
+            else:
+                continue
+            if folded:
+                scope._where.setdefault(name, where)
+            else:
+                scope._where[name] = where
+
+        if not _is_anonymous(table):
+            scope.params |= params
+            scope.locals |= bound
+            scope.globals |= declared
+            scope.nonlocals |= nonlocals
+            scope.frees |= frees
+
+    @staticmethod
+    def _enclosing_binder(name: str, chain: List) -> str:
+        """The nearest enclosing function scope that binds name (class bodies do not count)."""
+        for table, scope_name in reversed(chain):
+            if table.get_type() != 'function':
+                continue
+            try:
+                symbol = table.lookup(name)
+            except KeyError:
+                continue
+            if symbol.is_local():
+                return scope_name
+        return GLOBAL_SCOPE
+
+    def get(self, scope_name: str) -> Optional[Scope]:
+        return self.scopes.get(scope_name)
+
+    def resolve(self, scope_name: str, name: str) -> Optional[str]:
+        """The scope that name, used in scope_name, lives in; None if symtable did not see it there."""
+        while True:
+            scope = self.scopes.get(scope_name)
+            where = scope._where.get(name) if scope is not None else None
+            if where is not None or scope_name == GLOBAL_SCOPE:
+                return where
+            # in the def's header: evaluated in the enclosing scope
+            scope_name = scope_name.rpartition('.')[0] or GLOBAL_SCOPE
+
+    def is_builtin(self, scope_name: str, name: str) -> bool:
+        """True if name, used in scope_name, is not bound by the module: a builtin (or undefined)."""
+        return self.resolve(scope_name, name) == GLOBAL_SCOPE and name not in self.scopes[GLOBAL_SCOPE].locals
+
+
+def build_scope_model(source_code: str, filename: str = '<unknown>') -> Optional[ScopeModel]:
+    """ScopeModel for the source, or None (logged) if symtable rejects it."""
+    try:
+        return ScopeModel(source_code, filename)
+    except SyntaxError as e:
+        logger.info('No scope model for %s: %s', filename, e)
+        return None
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 2:
+        print("Usage: python cx_scope_model.py <example.py>")
+        sys.exit(1)
+
+    from cx_utils import read_source_file
+    model = ScopeModel(read_source_file(sys.argv[1]), sys.argv[1])
+    for scope in model.scopes.values():
+        print(f"{scope.name} ({scope.kind})")
+        for name, where in sorted(scope._where.items()):
+            print(f"    {name:24} -> {where}")
@@ -0,0 +1,140 @@
+# cx_stages.py
+# Runs the src2html pipeline as a graph of stages, one after the other or on a thread pool.
+#
+# A stage is a name, a function and the names of the stages whose outputs it reads. The function
+# gets the outputs gathered so far (a read-only mapping, stage name -> output) and returns its own.
+# Stages do not change their inputs: each returns new objects, so independent stages can run at
+# the same time, and outputs can be kept (the cache) or shared between requests.
+#
+#   workers <= 1   the stages run in the order given (which must list every stage after its inputs)
+#   workers  > 1   a stage starts on a ThreadPoolExecutor as soon as all of its inputs are ready;
+#                  with the GIL this mostly overlaps I/O, on a free-threaded build (3.13t) the
+#                  independent stages (tokens vs CFGs vs scope model, the flow generators, ...)
+#                  run on separate cores
+# With workers, the stats records come in completion order, and as stages overlap, their cpu_ms
+# (process CPU time) and memory figures include the work of the stages running alongside.
+# The first stage to fail stops the run: stages not yet started are dropped, and the exception is
+# raised to the caller as it is.
+#
+# freeze_outputs=True converts every plain-data output (dict, list, set, tuple) to a read-only copy before
+# the stages that read it see it: a stage that writes to its input then fails with a TypeError.
+# It costs a deep copy of each output, so it is meant for tests and debugging (CX_FREEZE_STAGES=1).
+#
+# Configuration:
+#   CX_STAGE_WORKERS   default thread count (default: 0, run in order)
+#   CX_FREEZE_STAGES   1/true: freeze the outputs
+
+import os
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from types import MappingProxyType
+from typing import Any, Callable, Dict, List, Mapping, NamedTuple, Optional, Tuple
+
+from cx_timing import NULL_STATS
+
+
+def _env_flag(name: str) -> bool:
+    return os.environ.get(name, '').strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def default_workers() -> int:
+    try:
+        return int(os.environ.get('CX_STAGE_WORKERS', '0'))
+    except ValueError:
+        return 0
+
+
+class Stage(NamedTuple):
+    name: str
+    fn: Callable[[Mapping[str, Any]], Any]
+    deps: Tuple[str, ...] = ()
+
+
+def _readonly(self, *args, **kwargs):
+    raise TypeError(f"{type(self).__name__} is read-only")
+
+
+class FrozenDict(dict):
+    """A dict that refuses changes; still a dict for json, isinstance() and reads."""
+
+    __setitem__ = __delitem__ = __ior__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+    def __reduce__(self):
+        return (FrozenDict, (dict(self),))
+
+
+class FrozenList(list):
+    """A list that refuses changes; still a list for json, isinstance() and reads (l + [x] is a new list)."""
+
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _readonly
+    append = extend = insert = remove = pop = clear = sort = reverse = _readonly
+
+    def __reduce__(self):
+        return (FrozenList, (list(self),))
+
+
+def freeze(value: Any) -> Any:
+    """A read-only deep copy of plain data (dicts, lists, sets, tuples); other objects are returned as they are."""
+    if isinstance(value, dict):
+        return FrozenDict((k, freeze(v)) for k, v in value.items())
+    if isinstance(value, list):
+        return FrozenList(freeze(v) for v in value)
+    if isinstance(value, (set, frozenset)):
+        return frozenset(value)
+    if type(value) is tuple:
+        return tuple(freeze(v) for v in value)
+    return value
+
+
+def run_stages(stages: List[Stage], stats=None, workers: Optional[int] = None,
+               freeze_outputs: Optional[bool] = None) -> Dict[str, Any]:
+    """Run the stages; returns stage name -> output."""
+    if stats is None:
+        stats = NULL_STATS
+    if workers is None:
+        workers = default_workers()
+    if freeze_outputs is None:
+        freeze_outputs = _env_flag('CX_FREEZE_STAGES')
+
+    outputs: Dict[str, Any] = {}
+    view = MappingProxyType(outputs)
+
+    def run_one(stage: Stage):
+        with stats.stage(stage.name):
+            result = stage.fn(view)
+        return freeze(result) if freeze_outputs else result
+
+    if workers <= 1:
+        for stage in stages:
+            missing = [dep for dep in stage.deps if dep not in outputs]
+            if missing:
+                raise ValueError(f"stage {stage.name!r} runs before its inputs {missing}")
+            outputs[stage.name] = run_one(stage)
+        return outputs
+
+    names = {stage.name for stage in stages}
+    for stage in stages:
+        unknown = [dep for dep in stage.deps if dep not in names]
+        if unknown:
+            raise ValueError(f"stage {stage.name!r} reads unknown stages {unknown}")
+    waiting = list(stages)
+    running = {}  # future -> stage
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='cx-stage') as pool:
+        try:
+            while waiting or running:
+                ready = [stage for stage in waiting if all(dep in outputs for dep in stage.deps)]
+                for stage in ready:
+                    waiting.remove(stage)
+                    running[pool.submit(run_one, stage)] = stage
+                if not running:
+                    raise ValueError(f"stages {[s.name for s in waiting]} wait on each other")
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    stage = running.pop(future)
+                    outputs[stage.name] = future.result()  # re-raises the stage's exception
+        except BaseException:
+            for future in running:
+                future.cancel()
+            raise
+    return outputs
+
@@ -0,0 +1,130 @@
+# cx_stmt_index.py
+# One index over the statement list from cx_gen_stmts, built once per request and queried by
+# every generator that needs to map source positions to statements.
+#
+# Statement ids are the statement's start line (as everywhere else in cx). Views:
+#   header  - line -> id, over start..end_header for compound statements and start..end otherwise
+#             (used by the var/io actions: a line in a block body belongs to its own statement)
+#   full    - line -> id, over start..end for every statement (used by the call flows)
+#   boundaries - (line, col) -> {"id", "start": True} / {"id", "end": True}, header-aware
+#             (used by the html emitter to open and close the statement spans)
+# Where statements overlap, the later one in the statement list wins, in every view.
+
+import sys
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+from cx_utils import load_json_file, derive_filename
+
+
+class LineView:
+    """Read-only line -> statement id lookup, backed by an array (0 = no statement)."""
+    __slots__ = ('_ids',)
+
+    def __init__(self, ids: array):
+        self._ids = ids
+
+    def get(self, line: int, default: Optional[int] = None) -> Optional[int]:
+        if 0 < line < len(self._ids):
+            stmt_id = self._ids[line]
+            if stmt_id:
+                return stmt_id
+        return default
+
+    def __getitem__(self, line: int) -> int:
+        stmt_id = self.get(line)
+        if stmt_id is None:
+            raise KeyError(line)
+        return stmt_id
+
+    def __contains__(self, line: int) -> bool:
+        return self.get(line) is not None
+
+    def __len__(self) -> int:
+        return sum(1 for stmt_id in self._ids if stmt_id)
+
+
+def _header_end(stmt: Dict) -> Dict:
+    return stmt["end_header"] if "end_header" in stmt else stmt["end"]
+
+
+class StatementIndex:
+    def __init__(self, stmts: List[Dict]):
+        self.stmts = stmts
+        self._header: Optional[LineView] = None
+        self._full: Optional[LineView] = None
+        self._boundaries: Optional[Dict[Tuple[int, int], Dict]] = None
+
+    def _build_lines(self, spans) -> LineView:
+        spans = list(spans)
+        max_line = max((end for _, end in spans), default=0)
+        ids = array('i', bytes(4 * (max_line + 1)))
+        for start, end in spans:
+            if end >= start:
+                ids[start:end + 1] = array('i', [start]) * (end - start + 1)
+        return LineView(ids)
+
+    @property
+    def header(self) -> LineView:
+        """line -> id; compound statements cover only their header lines."""
+        if self._header is None:
+            self._header = self._build_lines(
+                (stmt["start"]["line"],
+                 stmt["end_header"]["line"] if stmt.get("is_compound") else stmt["end"]["line"])
+                for stmt in self.stmts)
+        return self._header
+
+    @property
+    def full(self) -> LineView:
+        """line -> id; every statement covers start..end (compound statements include their body)."""
+        if self._full is None:
+            self._full = self._build_lines(
+                (stmt["start"]["line"], stmt.get("end", {}).get("line", stmt["start"]["line"]))
+                for stmt in self.stmts)
+        return self._full
+
+    @property
+    def boundaries(self) -> Dict[Tuple[int, int], Dict]:
+        """(line, col) -> {"id", "start": True} at statement starts, {"id", "end": True} at header/statement ends."""
+        if self._boundaries is None:
+            boundaries = {}
+            for stmt in self.stmts:
+                stmt_id = stmt["start"]["line"]
+                end = _header_end(stmt)
+                boundaries[(stmt["start"]["line"], stmt["start"]["col"])] = {"id": stmt_id, "start": True}
+                boundaries[(end["line"], end["col"])] = {"id": stmt_id, "end": True}
+            self._boundaries = boundaries
+        return self._boundaries
+
+    # --- queries ---
+
+    def stmt_at_line(self, line: int, default: Optional[int] = None) -> Optional[int]:
+        return self.header.get(line, default)
+
+    def stmt_at_line_full(self, line: int, default: Optional[int] = None) -> Optional[int]:
+        return self.full.get(line, default)
+
+    def starts_at(self, line: int, col: int) -> Optional[int]:
+        info = self.boundaries.get((line, col))
+        return info["id"] if info and info.get("start") else None
+
+    def ends_at(self, line: int, col: int) -> Optional[int]:
+        info = self.boundaries.get((line, col))
+        return info["id"] if info and info.get("end") else None
+
+
+def get_stmt_index(stmts: List[Dict], stmt_index: Optional[StatementIndex] = None) -> StatementIndex:
+    """Return the given index, or build one over stmts if none was passed in."""
+    if stmt_index is not None:
+        return stmt_index
+    return StatementIndex(stmts)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Usage: python cx_stmt_index.py <sourcefile.py>")
+        sys.exit(1)
+
+    index = StatementIndex(load_json_file(derive_filename(sys.argv[1], "stmts")))
+    print(f"{len(index.stmts)} statements, {len(index.header)} header-view lines, "
+          f"{len(index.full)} full-view lines, {len(index.boundaries)} boundaries")
@@ -0,0 +1,152 @@
+# cx_timing.py
+# Per-stage timing (wall + cpu) and, optionally, memory instrumentation for the src2html pipeline.
+#
+# Usage:
+#   stats = PipelineStats()
+#   with stats.stage('parse'):
+#       tree = parse_ast(source_code)
+#   ...
+#   stats.finish()
+#   logger.info(stats.to_json())                  # one JSON line per request
+#   response.headers['Server-Timing'] = stats.server_timing()
+#
+# Memory tracing uses tracemalloc, which slows the pipeline down noticeably; it is off unless
+# requested with trace_memory=True or the CX_TRACE_MEMORY=1 environment variable.
+# tracemalloc is process-wide, so traced runs are serialized (e.g. under the threaded Flask
+# server): a PipelineStats with trace_memory holds a module lock from its creation to finish(),
+# which must therefore always be called. Untraced requests running alongside are not held back,
+# and their allocations still count in the traced figures.
+
+import os
+import json
+import time
+import threading
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from typing import Dict, List, Optional
+
+
+# held by the PipelineStats that is tracing memory, from __init__ to finish()
+_TRACE_LOCK = threading.RLock()
+
+
+def _env_flag(name: str) -> bool:
+    return os.environ.get(name, '').strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+class PipelineStats:
+    def __init__(self, trace_memory: Optional[bool] = None, label: Optional[str] = None):
+        if trace_memory is None:
+            trace_memory = _env_flag('CX_TRACE_MEMORY')
+        self.trace_memory = trace_memory
+        self.label = label
+        self.stages: List[Dict] = []
+        self.total_wall_ms = 0.0
+        self.total_cpu_ms = 0.0
+        self.peak_bytes: Optional[int] = None
+        self.cache_hit: Optional[bool] = None  # set when the result came through a cache
+        self._started_tracing = False
+        self._holds_trace_lock = False
+        if self.trace_memory:
+            _TRACE_LOCK.acquire()
+            self._holds_trace_lock = True
+        self._wall0 = time.perf_counter()
+        self._cpu0 = time.process_time()
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time the enclosed block and record it as one stage."""
+        mem0 = None
+        if self.trace_memory and tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+            mem0 = tracemalloc.get_traced_memory()[0]
+        wall0 = time.perf_counter()
+        cpu0 = time.process_time()
+        try:
+            yield
+        finally:
+            rec = {
+                'name': name,
+                'wall_ms': (time.perf_counter() - wall0) * 1000.0,
+                'cpu_ms': (time.process_time() - cpu0) * 1000.0,
+            }
+            if mem0 is not None:
+                current, peak = tracemalloc.get_traced_memory()
+                rec['alloc_bytes'] = current - mem0   # retained by the stage
+                rec['peak_bytes'] = peak - mem0       # high-water mark during the stage
+            self.stages.append(rec)
+
+    def add(self, name: str, wall_ms: float, cpu_ms: float) -> None:
+        """Record a stage the caller timed itself (e.g. summed over interleaved runs); no memory figures."""
+        self.stages.append({'name': name, 'wall_ms': wall_ms, 'cpu_ms': cpu_ms})
+
+    def finish(self) -> "PipelineStats":
+        self.total_wall_ms = (time.perf_counter() - self._wall0) * 1000.0
+        self.total_cpu_ms = (time.process_time() - self._cpu0) * 1000.0
+        if self.trace_memory and tracemalloc.is_tracing():
+            self.peak_bytes = tracemalloc.get_traced_memory()[1]
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+        if self._holds_trace_lock:
+            self._holds_trace_lock = False
+            _TRACE_LOCK.release()
+        return self
+
+    def slowest(self, n: int = 3) -> List[Dict]:
+        return sorted(self.stages, key=lambda r: r['wall_ms'], reverse=True)[:n]
+
+    def to_dict(self) -> Dict:
+        d = {
+            'total_wall_ms': round(self.total_wall_ms, 3),
+            'total_cpu_ms': round(self.total_cpu_ms, 3),
+            'stages': [
+                {k: (round(v, 3) if isinstance(v, float) else v) for k, v in rec.items()}
+                for rec in self.stages
+            ],
+        }
+        if self.label is not None:
+            d['label'] = self.label
+        if self.peak_bytes is not None:
+            d['peak_bytes'] = self.peak_bytes
+        if self.cache_hit is not None:
+            d['cache_hit'] = self.cache_hit
+        return d
+
+    def to_json(self) -> str:
+        """The whole record as one JSON line, for logging."""
+        return json.dumps(self.to_dict(), separators=(',', ':'))
+
+    def server_timing(self) -> str:
+        """Value for an HTTP Server-Timing header (durations in ms)."""
+        parts = [f"{rec['name']};dur={rec['wall_ms']:.2f}" for rec in self.stages]
+        parts.append(f"total;dur={self.total_wall_ms:.2f}")
+        return ', '.join(parts)
+
+    def format_table(self) -> str:
+        lines = [f"{'stage':<24}{'wall ms':>10}{'cpu ms':>10}" + (f"{'alloc KB':>12}" if self.trace_memory else '')]
+        for rec in self.stages:
+            line = f"{rec['name']:<24}{rec['wall_ms']:>10.2f}{rec['cpu_ms']:>10.2f}"
+            if 'alloc_bytes' in rec:
+                line += f"{rec['alloc_bytes'] / 1024:>12.1f}"
+            lines.append(line)
+        lines.append(f"{'total':<24}{self.total_wall_ms:>10.2f}{self.total_cpu_ms:>10.2f}")
+        return '\n'.join(lines)
+
+
+class _NullStats:
+    """Stand-in used when the caller did not ask for stats: stage() costs nothing."""
+
+    _ctx = nullcontext()
+
+    def stage(self, name: str):
+        return self._ctx
+
+    def add(self, name: str, wall_ms: float, cpu_ms: float) -> None:
+        pass
+
+
+NULL_STATS = _NullStats()
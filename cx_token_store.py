@@ -0,0 +1,140 @@
+# cx_token_store.py
+# Tokenize the source once per request, and share the result with every generator that needs tokens.
+
+import io
+import sys
+import bisect
+import tokenize
+import keyword
+from typing import List, Dict, NamedTuple, Optional
+
+
+class Token(NamedTuple):
+    """
+    One source token (a compact, immutable record: no per-token dict, no nested start/end dicts).
+
+    line/col and end_line/end_col are the tokenizer positions; type is the tokenizer type name
+    (or NAME_KEYWORD); type_name is the NAME classification, which cx_gen_tokens_name fills in on
+    the new tokens it returns (None until then). Tokens are never changed in place, so a token
+    list can be shared between stages, threads and cached results.
+    to_dict()/from_dict() convert to and from the JSON form used by the generator CLIs.
+    """
+    line: int
+    col: int
+    end_line: int
+    end_col: int
+    text: str
+    type: str
+    type_name: Optional[str] = None
+
+    def to_dict(self) -> Dict:
+        d = {
+            "start": {"line": self.line, "col": self.col},
+            "end": {"line": self.end_line, "col": self.end_col},
+            "text": self.text,
+            "type": self.type
+        }
+        if self.type_name is not None:
+            d["type_name"] = self.type_name
+        return d
+
+    @classmethod
+    def from_dict(cls, d: Dict) -> "Token":
+        return cls(d["start"]["line"], d["start"]["col"], d["end"]["line"], d["end"]["col"],
+                   d["text"], d["type"], d.get("type_name"))
+
+    def __repr__(self):
+        return f"Token({self.line}:{self.col}-{self.end_line}:{self.end_col} {self.type} {self.text!r})"
+
+
+def tokens_to_dicts(tokens: List[Token]) -> List[Dict]:
+    """JSON form of a token list (as written to the .tokens*.json files)."""
+    return [tok.to_dict() for tok in tokens]
+
+
+def tokens_from_dicts(token_dicts: List[Dict]) -> List[Token]:
+    return [Token.from_dict(d) for d in token_dicts]
+
+
+class TokenStore:
+    """
+    Holds the single tokenization pass for one source string.
+
+    Views:
+      - raw:   list of tokenize.TokenInfo (as from tokenize.generate_tokens, no ENCODING token)
+      - core:  list of Token records, as emitted by cx_gen_tokens_core and consumed by cx_gen_html
+      - lines: physical source lines, with line endings preserved
+    """
+
+    def __init__(self, source_code: str):
+        self.source_code = source_code
+        self.raw: List[tokenize.TokenInfo] = []
+        self.token_error: Optional[tokenize.TokenError] = None
+        try:
+            for tok in tokenize.generate_tokens(io.StringIO(source_code).readline):
+                self.raw.append(tok)
+        except tokenize.TokenError as e:
+            # keep the tokens produced so far; consumers decide whether this is fatal
+            self.token_error = e
+        self._core: Optional[List[Token]] = None
+        self._lines: Optional[List[str]] = None
+        self._start_lines: Optional[List[int]] = None
+
+    @property
+    def core(self) -> List[Token]:
+        """The Token records (built on first access)."""
+        if self._core is None:
+            self._core = build_core_tokens(self.raw)
+        return self._core
+
+    @property
+    def lines(self) -> List[str]:
+        if self._lines is None:
+            self._lines = self.source_code.splitlines(keepends=True)
+        return self._lines
+
+    def index_at_line(self, line: int) -> int:
+        """Return the index of the first raw token that starts on or after `line`."""
+        if self._start_lines is None:
+            self._start_lines = [tok.start[0] for tok in self.raw]
+        return bisect.bisect_left(self._start_lines, line)
+
+    def check(self) -> None:
+        """Raise the tokenizer error, if tokenization did not complete."""
+        if self.token_error is not None:
+            raise self.token_error
+
+
+def build_core_tokens(raw_tokens) -> List[Token]:
+    token_list = []
+    append = token_list.append
+    tok_name = tokenize.tok_name
+    iskeyword = keyword.iskeyword
+    skip = (tokenize.ENCODING, tokenize.ENDMARKER)
+    for token in raw_tokens:
+        if token.type in skip:
+            continue
+        ttype = tok_name[token.type]
+        # vary from tokenizer - we can recognize keywords here
+        if iskeyword(token.string):
+            ttype = "NAME_KEYWORD" # this is not a pure tokenizer type
+        (line, col), (end_line, end_col) = token.start, token.end
+        append(Token(line, col, end_line, end_col, token.string, ttype))
+    return token_list
+
+
+def get_token_store(source_code: str, token_store: Optional[TokenStore] = None) -> TokenStore:
+    """Return the given store, or tokenize the source if none was passed in."""
+    if token_store is not None:
+        return token_store
+    return TokenStore(source_code)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Usage: python cx_token_store.py <sourcefile.py>")
+        sys.exit(1)
+
+    with open(sys.argv[1], "r", encoding="utf-8") as f:
+        store = TokenStore(f.read())
+    print(f"Tokenized {len(store.raw)} raw tokens, {len(store.core)} core tokens")
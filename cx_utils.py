@@ -1,6 +1,5 @@
 import sys
 import json
-import tokenize
 import token
 import ast
 
@@ -39,8 +38,11 @@ def parse_ast(source_code, filename="<unknown>"):
         #sys.exit(1)
 
 def get_token_stream(source_code):
-    from io import StringIO
-    return list(tokenize.generate_tokens(StringIO(source_code).readline))
+    # tokenize via the shared TokenStore (see cx_token_store.py)
+    from cx_token_store import TokenStore
+    store = TokenStore(source_code)
+    store.check()
+    return store.raw
 
 def location_dict(line, col):
     return {"line": line, "col": col}